@@ -1,4 +1,14 @@
 import os
+import sys
 
 
 PROJECT_PATH = os.path.abspath(os.path.dirname(__file__))
+
+
+def setup_path():
+    """Put the game directory on sys.path, so the game modules can import each
+    other by their bare names like they do under main.py. Only for command line
+    entry points, importing a module must never change sys.path.
+    """
+    if PROJECT_PATH not in sys.path:
+        sys.path.insert(0, PROJECT_PATH)
@@ -0,0 +1,306 @@
+"""Delta encoding of a live game for spectators, and the feed that sends it
+from the game to the spectator relay (meow_letters.spectator).
+
+A message is a little endian uint32 length followed by a sequence of
+operations, each a one byte code and a fixed size payload::
+
+    S  uint8 size, size * size cells, selection bitmap   full board
+    G  uint32 score, uint16 level                        score and level
+    P  uint16 cell, uint8 letter                         letter spawned
+    C  uint16 cell                                       cell cleared
+    L  uint16 cell                                       cell selected
+    U  uint16 cell                                       cell unselected
+
+Cells are x * size + y and letters are indexes in the game alphabet, like in
+letters.CompactGrid. Spawning or clearing a cell also unselects it. A new
+spectator gets one S and one G operation, then a few bytes per game event.
+"""
+import os
+import struct
+import socket
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+EMPTY_CELL = 0xFF  # letters.EMPTY_CELL, not imported so the relay runs on Python 3
+LENGTH = struct.Struct('<I')
+SCORE = struct.Struct('<cIH')
+CELL = struct.Struct('<cH')
+SPAWN = struct.Struct('<cHB')
+PUBLISHER = b'PUB\n'
+SPECTATOR = b'SUB\n'
+
+_STOP = object()
+_feed = None
+_lock = threading.Lock()
+
+
+def frame(body):
+    """Prefix a message body with its length
+
+    :param body: bytes
+    :return: bytes
+    """
+    return LENGTH.pack(len(body)) + body
+
+
+def encode_snapshot(size, cells, selection, score, level):
+    """Encode a full board, score and level
+
+    :return: bytes message body
+    """
+    if size > 0xFF:
+        raise ValueError("Spectators support grids up to 255 cells wide, "
+                         "received <{0}>".format(size))
+    return (b'S' + struct.pack('<B', size) + bytes(cells) + bytes(selection)
+            + SCORE.pack(b'G', score, level))
+
+
+class DeltaEncoder(object):
+    """Encodes the changes between consecutive states of a board
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the previous state, so the next message is a full snapshot
+        """
+        self.size = None
+        self.cells = None
+        self.selection = None
+        self.score = None
+        self.level = None
+
+    def encode(self, grid, score, level):
+        """Encode the state of a board compared to the previous one
+
+        :param grid: letters.CompactGrid object, or anything with size, cells
+                     and selection attributes laid out the same way
+        :param score: int score
+        :param level: int level
+        :return: bytes message body, empty if nothing changed
+        """
+        cells, selection = bytes(grid.cells), bytes(grid.selection)
+        if grid.size != self.size:
+            body = encode_snapshot(grid.size, cells, selection, score, level)
+        else:
+            ops = []
+            changed = set()
+            if cells != self.cells:
+                for i, (old, new) in enumerate(zip(bytearray(self.cells), bytearray(cells))):
+                    if old != new:
+                        changed.add(i)
+                        if new == EMPTY_CELL:
+                            ops.append(CELL.pack(b'C', i))
+                        else:
+                            ops.append(SPAWN.pack(b'P', i, new))
+            if selection != self.selection:
+                pairs = enumerate(zip(bytearray(self.selection), bytearray(selection)))
+                for byte, (old, new) in pairs:
+                    diff = old ^ new
+                    for bit in range(8):
+                        if diff & (1 << bit):
+                            i = byte * 8 + bit
+                            if new & (1 << bit):
+                                ops.append(CELL.pack(b'L', i))
+                            elif i not in changed:
+                                ops.append(CELL.pack(b'U', i))
+            if (score, level) != (self.score, self.level):
+                ops.append(SCORE.pack(b'G', score, level))
+            body = b''.join(ops)
+        self.size, self.cells, self.selection = grid.size, cells, selection
+        self.score, self.level = score, level
+        return body
+
+
+class SpectatorView(object):
+    """Board rebuilt from the messages of a feed
+    """
+    def __init__(self):
+        self.size = 0
+        self.cells = bytearray()
+        self.selection = bytearray()
+        self.score = 0
+        self.level = 1
+        self.buffer = b''
+
+    def feed(self, data):
+        """Apply the complete messages of a chunk of stream, keeping the rest
+
+        :param data: bytes received
+        :return: list of applied message bodies
+        """
+        self.buffer += data
+        bodies = []
+        while len(self.buffer) >= LENGTH.size:
+            length = LENGTH.unpack_from(self.buffer)[0]
+            end = LENGTH.size + length
+            if len(self.buffer) < end:
+                break
+            body = self.buffer[LENGTH.size:end]
+            self.buffer = self.buffer[end:]
+            self.apply(body)
+            bodies.append(body)
+        return bodies
+
+    def _select(self, i, selected):
+        if selected:
+            self.selection[i >> 3] |= 1 << (i & 7)
+        else:
+            self.selection[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def apply(self, body):
+        """Apply one message body
+
+        :param body: bytes
+        :return: the current instance
+        """
+        offset = 0
+        while offset < len(body):
+            op = body[offset:offset + 1]
+            if op == b'S':
+                size = bytearray(body[offset + 1:offset + 2])[0]
+                offset += 2
+                self.size = size
+                self.cells = bytearray(body[offset:offset + size * size])
+                offset += size * size
+                bitmap = (size * size + 7) // 8
+                self.selection = bytearray(body[offset:offset + bitmap])
+                offset += bitmap
+            elif op == b'G':
+                _, self.score, self.level = SCORE.unpack_from(body, offset)
+                offset += SCORE.size
+            elif op == b'P':
+                _, i, letter = SPAWN.unpack_from(body, offset)
+                self.cells[i] = letter
+                self._select(i, False)
+                offset += SPAWN.size
+            elif op in (b'C', b'L', b'U'):
+                _, i = CELL.unpack_from(body, offset)
+                if op == b'C':
+                    self.cells[i] = EMPTY_CELL
+                self._select(i, op == b'L')
+                offset += CELL.size
+            else:
+                raise ValueError("Unknown spectator operation <{0!r}>".format(op))
+        return self
+
+    def snapshot(self):
+        """Encode the current state as a full snapshot message body
+
+        :return: bytes
+        """
+        return encode_snapshot(self.size, self.cells, self.selection,
+                               self.score, self.level)
+
+    def is_selected(self, x, y):
+        i = x * self.size + y
+        return bool(self.selection[i >> 3] & (1 << (i & 7)))
+
+
+class SpectatorFeed(object):
+    """Sends the game state to the spectator relay from a background thread.
+    The game only encodes and queues; if the queue is full or the relay is
+    unreachable, messages are dropped and the next one is a full snapshot, so
+    the game never waits on the network.
+    """
+    def __init__(self, host='127.0.0.1', port=8766, timeout=2., max_pending=256):
+        """SpectatorFeed class initializer. Starts the sender thread.
+
+        :param host: string relay host
+        :param port: int relay port
+        :param timeout: float socket timeout in seconds
+        :param max_pending: int maximum number of messages waiting to be sent
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.encoder = DeltaEncoder()
+        self.pending = queue.Queue(max_pending)
+        self.dropped = 0
+        self.resync = False
+        self._thread = threading.Thread(target=self._send)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def publish(self, grid, score, level):
+        """Queue the changes of the board since the last call
+
+        :param grid: letters.CompactGrid object
+        :param score: int score
+        :param level: int level
+        """
+        if self.resync:
+            self.resync = False
+            self.encoder.reset()
+        body = self.encoder.encode(grid, score, level)
+        if not body:
+            return
+        try:
+            self.pending.put_nowait(frame(body))
+        except queue.Full:
+            self.dropped += 1
+            self.encoder.reset()
+
+    def _send(self):
+        sock = None
+        skip = False
+        while True:
+            message = self.pending.get()
+            if message is _STOP:
+                break
+            # after a failure, the deltas queued before the snapshot requested
+            # by resync don't apply to what the relay has
+            if skip and message[LENGTH.size:LENGTH.size + 1] != b'S':
+                continue
+            skip = False
+            try:
+                if sock is None:
+                    sock = socket.create_connection((self.host, self.port), self.timeout)
+                    sock.sendall(PUBLISHER)
+                sock.sendall(message)
+            except (socket.error, socket.timeout):
+                if sock is not None:
+                    sock.close()
+                    sock = None
+                self.dropped += 1
+                self.resync = True
+                skip = True
+        if sock is not None:
+            sock.close()
+
+    def close(self):
+        """Send the pending messages and stop the sender thread
+        """
+        self.pending.put(_STOP)
+        self._thread.join()
+
+
+def spectator_feed():
+    """Get the spectator feed of the process. It's only started if MEOW_SPECTATE
+    is set to the 'host:port' of a spectator relay.
+
+    :return: SpectatorFeed object or None
+    """
+    global _feed
+    with _lock:
+        if _feed is None:
+            address = os.environ.get('MEOW_SPECTATE')
+            if not address:
+                return None
+            host, _, port = address.rpartition(':')
+            _feed = SpectatorFeed(host, int(port))
+        return _feed
+
+
+def close_spectator_feed():
+    """Send the pending messages and stop the feed, if started
+    """
+    global _feed
+    with _lock:
+        if _feed is not None:
+            _feed.close()
+            _feed = None
@@ -0,0 +1,186 @@
+import os
+import struct
+import random
+import hashlib
+import datetime
+import tempfile
+import threading
+
+from constants.alphabets import ENGLISH_ALPHABET as ALPHABET
+from constants.misc import GRID_SIZE, DAILY_ROUNDS
+from letters import Letter, LetterGrid, EMPTY_CELL
+
+
+MAGIC = b'MLDC'
+VERSION = 1
+HEADER = struct.Struct('<4sBBH')
+
+
+def day_seed(day):
+    """Seed shared by every player of the challenge of a given day
+
+    :param day: datetime.date object
+    :return: int seed
+    """
+    digest = hashlib.sha1('meow-letters-daily-{0}'.format(day.isoformat())
+                          .encode('ascii')).hexdigest()
+    return int(digest[:16], 16)
+
+
+class DailyChallenge(object):
+    """Deterministic challenge of a day: the starting board and one seed per
+    round, so every player gets the same spawns for the same board
+    """
+    def __init__(self, day, grid, seeds):
+        """DailyChallenge class initializer
+
+        :param day: datetime.date object
+        :param grid: list of lists of string letters or None
+        :param seeds: list of int round seeds
+        """
+        self.day = day
+        self.grid = grid
+        self.seeds = seeds
+
+    @classmethod
+    def generate(cls, day, size=GRID_SIZE, rounds=DAILY_ROUNDS):
+        """Generate the challenge of a day
+
+        :param day: datetime.date object
+        :param size: int grid size
+        :param rounds: int number of pre-generated round seeds
+        :return: DailyChallenge object
+        """
+        rng = random.Random(day_seed(day))
+        letter_grid = LetterGrid(size, rng=rng).setup(3)
+        grid = [[l.letter if l is not None else None for l in row]
+                for row in letter_grid.grid]
+        seeds = [rng.getrandbits(32) for _ in range(rounds)]
+        return cls(day, grid, seeds)
+
+    def round_rng(self, i):
+        """Random generator of a round. Rounds past the pre-generated ones reuse
+        the seeds mixed with the round number.
+
+        :param i: int round number, starting at 0
+        :return: random.Random object
+        """
+        seed = self.seeds[i % len(self.seeds)]
+        if i >= len(self.seeds):
+            seed ^= i
+        return random.Random(seed)
+
+    def letter_grid(self):
+        """Build the starting LetterGrid of the challenge
+
+        :return: LetterGrid object
+        """
+        letter_grid = LetterGrid(len(self.grid), rng=self.round_rng(0))
+        return letter_grid.set_grid([[Letter(l) if l is not None else None for l in row]
+                                     for row in self.grid])
+
+    def dumps(self):
+        """Serialize to a compact binary format: header, one byte per cell and
+        four bytes per round seed
+
+        :return: bytes
+        """
+        cells = bytearray(ALPHABET.index(l) if l is not None else EMPTY_CELL
+                          for row in self.grid for l in row)
+        header = HEADER.pack(MAGIC, VERSION, len(self.grid), len(self.seeds))
+        ordinal = struct.pack('<I', self.day.toordinal())
+        seeds = struct.pack('<{0}I'.format(len(self.seeds)), *self.seeds)
+        return header + ordinal + bytes(cells) + seeds
+
+    @classmethod
+    def loads(cls, data):
+        """Deserialize a challenge serialized with dumps()
+
+        :param data: bytes
+        :return: DailyChallenge object
+        """
+        magic, version, size, rounds = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a daily challenge file")
+        offset = HEADER.size
+        day = datetime.date.fromordinal(struct.unpack_from('<I', data, offset)[0])
+        offset += 4
+        cells = bytearray(data[offset:offset + size * size])
+        offset += size * size
+        seeds = struct.unpack_from('<{0}I'.format(rounds), data, offset)
+        grid = [[ALPHABET[c] if c != EMPTY_CELL else None
+                 for c in cells[i * size:(i + 1) * size]] for i in range(size)]
+        return cls(day, grid, list(seeds))
+
+
+class ChallengeCache(object):
+    """Daily challenges cached on disk, one file per day
+    """
+    def __init__(self, directory):
+        """ChallengeCache class initializer
+
+        :param directory: string directory of the cached files
+        """
+        self.directory = directory
+
+    def path(self, day):
+        return os.path.join(self.directory, '{0}.bin'.format(day.isoformat()))
+
+    def get(self, day):
+        """Get the challenge of a day, from the cache if it's there
+
+        :param day: datetime.date object
+        :return: DailyChallenge object
+        """
+        path = self.path(day)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                try:
+                    return DailyChallenge.loads(f.read())
+                except (ValueError, struct.error):
+                    pass
+        challenge = DailyChallenge.generate(day)
+        self.save(challenge)
+        return challenge
+
+    def save(self, challenge):
+        """Write a challenge to the cache atomically. The prefetch thread and
+        the UI thread may save the same day at once, so each write goes through
+        a temporary file of its own.
+
+        :param challenge: DailyChallenge object
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError:
+            if not os.path.isdir(self.directory):
+                raise
+        path = self.path(challenge.day)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(challenge.dumps())
+            try:
+                # rename doesn't replace an existing file on Windows
+                os.remove(path)
+            except OSError:
+                pass
+            os.rename(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def prefetch(self, days):
+        """Generate and cache the challenges of some days on a background thread
+
+        :param days: list of datetime.date objects
+        :return: the started thread
+        """
+        def work():
+            for day in days:
+                self.get(day)
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+        return thread
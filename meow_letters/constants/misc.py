@@ -1,3 +1,5 @@
 GRID_SIZE = 5
 BACK_KEY = 27
-ROUND_SECONDS = 7
\ No newline at end of file
+ROUND_SECONDS = 7
+DAILY_ROUNDS = 512
+SPAWN_IDLE_SECONDS = .3
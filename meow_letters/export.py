@@ -0,0 +1,244 @@
+"""Streaming export of the highscores, ranked from the best, or of the score
+history, in the order the scores were saved. Rows are read with chunked
+fetches and written one by one, so memory use doesn't depend on the number of
+rows.
+
+Usage::
+
+    python -m meow_letters.export highscores scores.csv
+    python -m meow_letters.export history scores.jsonl --format jsonl \\
+        [--user NAME] [--since 2026-01-01] [--until 2026-03-31] [--db meowletters.db]
+
+Every --every rows, the output is flushed and a checkpoint is written next to
+it, in <output>.checkpoint. If the export stops, running the same command
+again resumes it after the last checkpoint; the checkpoint is removed once the
+export is complete.
+"""
+import os
+import sys
+import json
+import time
+import calendar
+import re
+import argparse
+import datetime
+from collections import OrderedDict
+
+from meow_letters.storage.meowdb import MeowDatabase, FETCH_SIZE
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+KINDS = ("highscores", "history")
+FORMATS = ("csv", "jsonl")
+FIELDS = ("id", "username", "highscore", "created")
+CHECKPOINT_EVERY = 10000
+DAY_SECONDS = 24 * 60 * 60
+QUOTED = re.compile(u'[,"\r\n]')
+
+
+def timestamp(day):
+    """Parse a day
+
+    :param day: string day, YYYY-MM-DD
+    :return: int seconds since the epoch of the start of the day, in UTC
+    """
+    try:
+        date = datetime.datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Days are written YYYY-MM-DD, got <{0}>".format(day))
+    return calendar.timegm(date.timetuple())
+
+
+def isoformat(created):
+    """Format the time a score was saved
+
+    :param created: int seconds since the epoch, or None
+    :return: string UTC time in ISO 8601, or None
+    """
+    if created is None:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created))
+
+
+def csv_field(value):
+    """Quote a csv field if needed, like the csv module does
+
+    :param value: field value or None
+    :return: unicode field
+    """
+    if value is None:
+        return u""
+    value = text_type(value)
+    if QUOTED.search(value):
+        return u'"{0}"'.format(value.replace(u'"', u'""'))
+    return value
+
+
+def encode_csv(values):
+    return (u",".join(csv_field(value) for value in values) + u"\r\n").encode('utf-8')
+
+
+def encode_row(row, format):
+    """Encode an exported row
+
+    :param row: (id, username, highscore, created) tuple
+    :param format: string output format - csv, jsonl
+    :return: bytes line
+    """
+    id, username, highscore, created = row
+    created = isoformat(created)
+    if format == "csv":
+        # only the username may need quoting
+        return u"{0},{1},{2},{3}\r\n".format(id, csv_field(username), highscore,
+                                             created or u"").encode('utf-8')
+    values = (id, username, highscore, created)
+    return (json.dumps(OrderedDict(zip(FIELDS, values))) + "\n").encode('utf-8')
+
+
+def resume_key(kind, row):
+    """Key to resume an export after a row
+
+    :param kind: string export - highscores, history
+    :param row: (id, username, highscore, created) tuple
+    :return: int id for the history, [highscore, id] for the highscores
+    """
+    if kind == "history":
+        return row[0]
+    return [row[2], row[0]]
+
+
+class Checkpoint(object):
+    """Progress of an export, stored as json next to its output
+    """
+    def __init__(self, filename, options):
+        """Checkpoint class initializer
+
+        :param filename: string checkpoint filename
+        :param options: dict of the export options, a checkpoint only resumes
+                        the export it was written for
+        """
+        self.filename = filename
+        self.options = options
+        self.after = None
+        self.rows = 0
+        self.offset = 0
+
+    def load(self):
+        """Read the checkpoint, if any
+
+        :return: True if an export is resumed, False otherwise
+        """
+        if not os.path.exists(self.filename):
+            return False
+        with open(self.filename) as f:
+            data = json.load(f)
+        if data["options"] != self.options:
+            raise ValueError("<{0}> is the checkpoint of another export, remove it "
+                             "to start over".format(self.filename))
+        self.after, self.rows, self.offset = data["after"], data["rows"], data["offset"]
+        return True
+
+    def save(self, after, rows, offset):
+        """Write the checkpoint, replacing the previous one in one step
+
+        :param after: resume key of the last written row
+        :param rows: int number of written rows
+        :param offset: int size of the output up to the last written row
+        """
+        self.after, self.rows, self.offset = after, rows, offset
+        data = {"options": self.options, "after": after, "rows": rows, "offset": offset}
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        os.rename(temporary, self.filename)
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+def export(database, kind, output, format="csv", username=None, since=None, until=None,
+           every=CHECKPOINT_EVERY, size=FETCH_SIZE):
+    """Export highscores or the score history to a file, resuming a stopped
+    export of the same rows if its checkpoint is found
+
+    :param database: MeowDatabase object
+    :param kind: string export - highscores, history
+    :param output: string output filename
+    :param format: string output format - csv, jsonl
+    :param username: optional string username to keep
+    :param since: optional int first second of the scores to keep
+    :param until: optional int second after the last scores to keep
+    :param every: int number of rows between checkpoints
+    :param size: int number of rows per fetch
+    :return: int number of rows in the output
+    """
+    if kind not in KINDS:
+        raise ValueError("Unknown export - {0}".format(kind))
+    if format not in FORMATS:
+        raise ValueError("Unknown format - {0}".format(format))
+    checkpoint = Checkpoint(output + ".checkpoint",
+                            {"kind": kind, "format": format, "username": username,
+                             "since": since, "until": until})
+    resumed = checkpoint.load()
+    after = checkpoint.after
+    if kind == "highscores" and after is not None:
+        after = tuple(after)
+    rows = checkpoint.rows
+    source = getattr(database, "iter_" + kind)(username, since, until, after, size)
+    with open(output, "r+b" if resumed else "wb") as f:
+        # rows written after the checkpoint are written again
+        f.seek(checkpoint.offset)
+        f.truncate()
+        if not resumed and format == "csv":
+            f.write(encode_csv(FIELDS))
+        for row in source:
+            f.write(encode_row(row, format))
+            rows += 1
+            if rows % every == 0:
+                f.flush()
+                os.fsync(f.fileno())
+                checkpoint.save(resume_key(kind, row), rows, f.tell())
+    checkpoint.remove()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Meow Letters highscores")
+    parser.add_argument("kind", choices=KINDS,
+                        help="highscores from the best, or every score as saved")
+    parser.add_argument("output", help="output file")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--user", default=None, help="only the scores of this user")
+    parser.add_argument("--since", default=None, help="first day, YYYY-MM-DD in UTC")
+    parser.add_argument("--until", default=None, help="last day, YYYY-MM-DD in UTC")
+    parser.add_argument("--db", default=None, help="database file (default: meowletters.db)")
+    parser.add_argument("--every", type=int, default=CHECKPOINT_EVERY,
+                        help="rows between checkpoints (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=FETCH_SIZE,
+                        help="rows per fetch (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        since = timestamp(args.since) if args.since else None
+        until = timestamp(args.until) + DAY_SECONDS if args.until else None
+    except ValueError as e:
+        parser.error(str(e))
+    database = MeowDatabase(args.db)
+    try:
+        rows = export(database, args.kind, args.output, args.format, args.user,
+                      since, until, args.every, args.chunk_size)
+    finally:
+        database.close()
+    print("Exported {0} rows to {1}".format(rows, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
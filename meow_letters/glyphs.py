@@ -0,0 +1,149 @@
+"""Shared textures: the image assets, loaded once, and the letter glyphs,
+rendered once per tile size into an atlas that every LetterCell draws from.
+"""
+import os
+from collections import OrderedDict
+
+from kivy.core.image import Image as CoreImage
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Fbo, Color, Rectangle, ClearColor, ClearBuffers
+
+from constants.alphabets import ENGLISH_ALPHABET as ALPHABET
+from meow_letters import PROJECT_PATH
+
+
+IMAGES = ('mask.png', 'mask_rounded_corners.png')
+MAX_ATLASES = 4
+
+
+class TextureCache(object):
+    """Textures of the image assets, loaded on first use or by preload()
+    """
+    def __init__(self, directory):
+        """TextureCache class initializer
+
+        :param directory: string directory of the images
+        """
+        self.directory = directory
+        self.textures = {}
+
+    def get(self, name):
+        """Get the texture of an image
+
+        :param name: string filename relative to the images directory
+        :return: Texture object
+        """
+        texture = self.textures.get(name)
+        if texture is None:
+            image = CoreImage(os.path.join(self.directory, name))
+            texture = self.textures[name] = image.texture
+        return texture
+
+    def preload(self, names=IMAGES):
+        """Load images ahead of their first use
+
+        :param names: iterable of filenames
+        :return: the current instance
+        """
+        for name in names:
+            self.get(name)
+        return self
+
+
+class GlyphAtlas(object):
+    """The letters of the alphabet rendered once, side by side, into a single
+    texture. Glyphs are white, so they take the color set before drawing them.
+    """
+    def __init__(self, font_size, letters=ALPHABET, bold=True):
+        """Render the atlas
+
+        :param font_size: float font size in pixels
+        :param letters: list of string letters
+        :param bold: True to render bold glyphs
+        """
+        self.font_size = font_size
+        self.letters = letters
+        self.bold = bold
+        # the fbo owns the atlas texture, so it's kept alive with the atlas
+        self.fbo = None
+        width, height = self.render()
+        self.texture = self.fbo.texture
+        self.glyphs = dict((letter, self.texture.get_region(i * width, 0, width, height))
+                           for i, letter in enumerate(letters))
+        # when the GL context is lost (i.e. Android pause and resume), the fbo
+        # comes back empty and the label textures are gone, so render again
+        self.fbo.add_reload_observer(self.reload)
+
+    def render(self):
+        """Render the glyphs into the fbo, creating it on the first call
+
+        :return: (width, height) tuple of the size of a glyph cell
+        """
+        textures = []
+        for letter in self.letters:
+            label = CoreLabel(text=letter, font_size=self.font_size, bold=self.bold)
+            label.refresh()
+            textures.append(label.texture)
+        width = max(t.width for t in textures)
+        height = max(t.height for t in textures)
+        if self.fbo is None:
+            self.fbo = Fbo(size=(width * len(textures), height))
+        self.fbo.clear()
+        with self.fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+            Color(1, 1, 1, 1)
+            for i, texture in enumerate(textures):
+                Rectangle(texture=texture, size=texture.size,
+                          pos=(i * width + (width - texture.width) // 2,
+                               (height - texture.height) // 2))
+        self.fbo.draw()
+        return width, height
+
+    def reload(self, fbo):
+        self.render()
+
+    def glyph(self, letter):
+        """Get the texture region of a letter
+
+        :param letter: string letter
+        :return: TextureRegion object
+        """
+        return self.glyphs[letter]
+
+
+class GlyphCache(object):
+    """Glyph atlases by tile size. Only a few sizes are kept, since the tile
+    size changes only when the window is resized.
+    """
+    def __init__(self, max_atlases=MAX_ATLASES):
+        self.max_atlases = max_atlases
+        self.atlases = OrderedDict()
+
+    def atlas(self, tile_size):
+        """Get the atlas for a tile size, rendering it on first use
+
+        :param tile_size: float tile size in pixels
+        :return: GlyphAtlas object
+        """
+        font_size = max(int(tile_size / 2.5), 1)
+        atlas = self.atlases.pop(font_size, None)
+        if atlas is None:
+            atlas = GlyphAtlas(font_size)
+            while len(self.atlases) >= self.max_atlases:
+                self.atlases.popitem(last=False)
+        self.atlases[font_size] = atlas
+        return atlas
+
+    def glyph(self, letter, tile_size):
+        """Get the glyph of a letter for a tile size
+
+        :param letter: string letter
+        :param tile_size: float tile size in pixels
+        :return: TextureRegion object
+        """
+        return self.atlas(tile_size).glyph(letter)
+
+
+TEXTURES = TextureCache(os.path.join(PROJECT_PATH, 'assets/img'))
+GLYPHS = GlyphCache()
@@ -0,0 +1,274 @@
+"""Game host for the hosted version: thousands of games in one asyncio
+process, on top of meow_letters.sessions.
+
+Clients talk to it over TCP with one json object per line and get one json
+response per request line, in order::
+
+    {"op": "new"}                                  ->  {"ok": true, "session": 1, ...}
+    {"op": "toggle", "session": 1, "x": 0, "y": 2} ->  {"ok": true, "event": "selected", ...}
+    {"op": "state", "session": 1}                  ->  {"ok": true, "board": "...", ...}
+    {"op": "close", "session": 1}                  ->  {"ok": true}
+    {"op": "stats"}                                ->  {"ok": true, "sessions": 1, ...}
+
+Finished games stay readable for a minute, then the host removes them.
+
+A game state has the board as a string of size * size letters, column after
+column with '.' for empty cells, the selected cells (x * size + y), the score,
+the level, the seconds left in the round and whether the game is over.
+
+The host needs Python 3 (asyncio).
+
+Usage::
+
+    python -m meow_letters.host [--host 127.0.0.1] [--port 8767]
+    python -m meow_letters.host --bench [--target-ms 10] [--think 1] [--seconds 3]
+"""
+import json
+import heapq
+import random
+import asyncio
+import argparse
+
+from meow_letters import setup_path
+if __name__ == '__main__':
+    setup_path()
+
+from meow_letters.sessions import SessionManager
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8767
+
+
+def session_state(manager, session):
+    """Json friendly state of a session
+
+    :param manager: SessionManager object
+    :param session: GameSession object
+    :return: dict
+    """
+    board, selected = session.board()
+    return {"session": session.id, "board": board, "selected": selected,
+            "size": session.record.size, "score": session.score.points,
+            "level": session.level.level, "remaining": manager.remaining(session),
+            "over": session.over}
+
+
+class GameHost(object):
+    """Asyncio server in front of a SessionManager. A single ticker task
+    advances the timer wheel of every game.
+    """
+    def __init__(self, manager, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """GameHost class initializer
+
+        :param manager: SessionManager object
+        :param host: string interface to listen on
+        :param port: int port, 0 to pick a free one
+        """
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.server = None
+        self._ticker_task = None
+
+    async def start(self, listen=True):
+        """Start the ticker task, and listening
+
+        :param listen: False to only run the ticker, for in-process clients
+        :return: the current instance
+        """
+        self._ticker_task = asyncio.ensure_future(self._ticker())
+        if listen:
+            self.server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                     backlog=4096)
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        """Stop accepting connections and the ticker task
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self._ticker_task.cancel()
+        try:
+            await self._ticker_task
+        except asyncio.CancelledError:
+            pass
+
+    async def _ticker(self):
+        while True:
+            await asyncio.sleep(self.manager.wheel.tick)
+            self.manager.advance()
+
+    def dispatch(self, request):
+        """Run a request
+
+        :param request: dict decoded request
+        :return: dict response
+        """
+        try:
+            op = request.get("op")
+            if op == "new":
+                response = session_state(self.manager, self.manager.create())
+            elif op == "toggle":
+                session_id = int(request.get("session"))
+                event = self.manager.toggle(session_id, int(request.get("x")),
+                                            int(request.get("y")))
+                response = session_state(self.manager, self.manager.get(session_id))
+                response["event"] = event
+            elif op == "state":
+                response = session_state(self.manager,
+                                         self.manager.get(int(request.get("session"))))
+            elif op == "close":
+                self.manager.remove(int(request.get("session")))
+                response = {}
+            elif op == "stats":
+                response = self.manager.stats()
+            else:
+                raise ValueError("Unknown operation - {0}".format(op))
+        except (ValueError, TypeError, AttributeError) as e:
+            return {"ok": False, "error": str(e)}
+        response["ok"] = True
+        return response
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = self.dispatch(json.loads(line.decode('utf-8')))
+                except ValueError as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode('utf-8') + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentile(values, p):
+    """Nearest rank percentile
+
+    :param values: sorted list of numbers
+    :param p: float percentile, between 0 and 100
+    :return: number or None if there are no values
+    """
+    if not values:
+        return None
+    return values[min(int(len(values) * p / 100.), len(values) - 1)]
+
+
+async def load(manager, sessions, seconds, think, rng):
+    """Play random moves in a number of sessions, each one moving every think
+    seconds on average, while the ticker of a host ends their rounds. Sessions
+    start at their first move, so their rounds are spread like real players',
+    and a game that ends is replaced by a new one.
+
+    :param manager: SessionManager object
+    :param sessions: int number of concurrent sessions
+    :param seconds: float length of the run
+    :param think: float average seconds between two moves of a session
+    :param rng: random.Random object choosing the moves
+    :return: sorted list of move latencies in seconds, measured from the time
+             each move was due, so event loop delays are included
+    """
+    host = await GameHost(manager).start(listen=False)
+    clock = manager.clock
+    start = clock()
+    # session 0 is one that hasn't started yet
+    due = [(start + rng.uniform(0, think), 0) for _ in range(sessions)]
+    heapq.heapify(due)
+    latencies = []
+    size = manager.size
+    try:
+        while True:
+            now = clock()
+            if now - start >= seconds:
+                break
+            while due and due[0][0] <= now:
+                when, session_id = heapq.heappop(due)
+                if not session_id:
+                    session_id = manager.create().id
+                try:
+                    manager.toggle(session_id, rng.randrange(size), rng.randrange(size))
+                except ValueError:
+                    # an empty cell, or the game is over or already removed
+                    if session_id not in manager.sessions:
+                        session_id = manager.create().id
+                    elif manager.get(session_id).over:
+                        manager.remove(session_id)
+                        session_id = manager.create().id
+                latencies.append(clock() - when)
+                heapq.heappush(due, (when + rng.expovariate(1. / think), session_id))
+            delay = due[0][0] - clock() if due else manager.wheel.tick
+            await asyncio.sleep(min(max(delay, 0), manager.wheel.tick))
+    finally:
+        await host.close()
+    latencies.sort()
+    return latencies
+
+
+async def bench(target_ms=10., think=1., seconds=3., max_sessions=65536, seed=None):
+    """Double the number of sessions until the p99 move latency misses the
+    target, on one core
+
+    :return: tuple (list of result dicts, int most sessions within the target)
+    """
+    rng = random.Random(seed)
+    results, best, sessions = [], 0, 256
+    while sessions <= max_sessions:
+        manager = SessionManager(seed=rng.getrandbits(32))
+        latencies = await load(manager, sessions, seconds, think, rng)
+        stats = manager.stats()
+        result = {"sessions": sessions, "moves": len(latencies),
+                  "moves_per_second": len(latencies) / seconds,
+                  "p50_ms": percentile(latencies, 50) * 1000,
+                  "p99_ms": percentile(latencies, 99) * 1000,
+                  "bytes_per_session": stats["bytes"] // max(stats["sessions"], 1),
+                  "rounds": stats["rounds"]}
+        results.append(result)
+        print("{sessions:>7} sessions {moves_per_second:>9.0f} moves/s  "
+              "p50 {p50_ms:7.2f} ms  p99 {p99_ms:7.2f} ms  "
+              "{bytes_per_session:>6} B/session".format(**result))
+        if result["p99_ms"] > target_ms:
+            break
+        best = sessions
+        sessions *= 2
+    return results, best
+
+
+async def serve(args):
+    host = await GameHost(SessionManager(), args.host, args.port).start()
+    print("Game host listening on {0}:{1}".format(host.host, host.port))
+    await host.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meow Letters game host")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bench", action="store_true",
+                        help="find how many sessions one core runs within the target latency")
+    parser.add_argument("--target-ms", type=float, default=10.,
+                        help="p99 move latency target of the benchmark (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=1.,
+                        help="average seconds between the moves of a session (default: %(default)s)")
+    parser.add_argument("--seconds", type=float, default=3.,
+                        help="length of each benchmark step (default: %(default)s)")
+    parser.add_argument("--max-sessions", type=int, default=65536)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.bench:
+        results, best = asyncio.run(bench(args.target_ms, args.think, args.seconds,
+                                          args.max_sessions, args.seed))
+        print("{0} sessions per core within a p99 of {1} ms".format(best, args.target_ms))
+    else:
+        asyncio.run(serve(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Local highscore service for arcade cabinets and kiosks.
+
+Clients talk to it over TCP with one json object per line and get one json
+response per request line, in order, so requests can be pipelined::
+
+    {"op": "insert", "rows": [["ana", 120], ["foo", 95]]}  ->  {"ok": true, "count": 2}
+    {"op": "top", "limit": 10}                               ->  {"ok": true, "rows": [...]}
+
+Inserts from all connections are grouped and written in one transaction per
+batch. The service needs Python 3 (asyncio); the game talks to it through
+storage.meowremote.RemoteDatabase, which runs on Python 2 too.
+
+Usage::
+
+    python -m meow_letters.leaderboard [--host 127.0.0.1] [--port 8765] [--db leaderboard.db]
+    python -m meow_letters.leaderboard --bench 1000
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+
+from meow_letters import PROJECT_PATH
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH = 1000
+MAX_LIMIT = 100
+
+
+class HighscoreStore(object):
+    """Sqlite store of the service. Keeps every submitted score.
+    """
+    def __init__(self, dbname):
+        """Open the database and create the schema if needed. The connection may
+        be opened on another thread than the event loop that uses it.
+
+        :param dbname: string database filename or ':memory:'
+        """
+        self.conn = sqlite3.connect(dbname, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS highscores (
+                             id integer primary key autoincrement,
+                             username text, highscore integer)""")
+        self.conn.execute("""CREATE INDEX IF NOT EXISTS highscores_highscore
+                             ON highscores (highscore DESC)""")
+        self.conn.commit()
+
+    def insert_many(self, rows):
+        """Insert (username, highscore) rows in a single transaction
+
+        :param rows: list of (username, highscore) pairs
+        :return: int number of inserted rows
+        """
+        with self.conn:
+            self.conn.executemany("INSERT INTO highscores VALUES (Null, ?, ?)", rows)
+        return len(rows)
+
+    def top(self, limit=10):
+        """Get the best highscores
+
+        :param limit: int number of rows
+        :return: list of (username, highscore)
+        """
+        query = "SELECT username, highscore FROM highscores ORDER BY highscore DESC LIMIT ?"
+        return self.conn.execute(query, (limit,)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _validate_rows(rows):
+    if not isinstance(rows, list):
+        raise ValueError("rows must be a list, received <{0}>".format(type(rows)))
+    valid = []
+    for row in rows:
+        if not isinstance(row, list) or len(row) != 2:
+            raise ValueError("Each row must be [username, highscore], received <{0}>".format(row))
+        username, highscore = row
+        if not isinstance(username, str) or not isinstance(highscore, int) or highscore < 0:
+            raise ValueError("Invalid highscore row <{0}>".format(row))
+        valid.append((username, highscore))
+    return valid
+
+
+class LeaderboardServer(object):
+    """Asyncio server in front of a HighscoreStore. A single writer task drains
+    the submissions of every connection, so concurrent submitters share commits.
+    """
+    def __init__(self, store, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=MAX_BATCH):
+        """LeaderboardServer class initializer
+
+        :param store: HighscoreStore object
+        :param host: string interface to listen on
+        :param port: int port, 0 to pick a free one
+        :param max_batch: int maximum number of submissions per transaction
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.server = None
+        self._queue = None
+        self._writer_task = None
+
+    async def start(self):
+        """Start listening and the writer task
+
+        :return: the current instance
+        """
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._writer())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                 backlog=4096)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        """Stop accepting connections and the writer task
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        self._writer_task.cancel()
+        try:
+            await self._writer_task
+        except asyncio.CancelledError:
+            pass
+
+    async def _writer(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            rows = [row for rows, future in batch for row in rows]
+            try:
+                self.store.insert_many(rows)
+            except sqlite3.Error as e:
+                for rows, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(len(rows))
+
+    async def _insert(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((rows, future))
+        return await future
+
+    async def _dispatch(self, line):
+        try:
+            request = json.loads(line.decode('utf-8'))
+            op = request.get("op")
+            if op == "insert":
+                count = await self._insert(_validate_rows(request.get("rows")))
+                return {"ok": True, "count": count}
+            elif op == "top":
+                limit = min(int(request.get("limit", 10)), MAX_LIMIT)
+                return {"ok": True, "rows": self.store.top(limit)}
+            else:
+                raise ValueError("Unknown operation - {0}".format(op))
+        except (ValueError, TypeError, AttributeError, sqlite3.Error) as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._dispatch(line)
+                writer.write(json.dumps(response).encode('utf-8') + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def bench(host, port, clients=1000, submissions=5):
+    """Open many concurrent connections and submit scores from all of them
+
+    :param host: string server host
+    :param port: int server port
+    :param clients: int number of concurrent submitters
+    :param submissions: int number of single-row inserts each client pipelines
+    :return: float seconds taken
+    """
+    async def submitter(i):
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in range(submissions):
+            request = {"op": "insert", "rows": [["user{0}".format(i), random.randint(0, 10000)]]}
+            writer.write(json.dumps(request).encode('utf-8') + b"\n")
+        await writer.drain()
+        for _ in range(submissions):
+            response = json.loads((await reader.readline()).decode('utf-8'))
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error"))
+        writer.close()
+
+    start = time.time()
+    await asyncio.gather(*[submitter(i) for i in range(clients)])
+    return time.time() - start
+
+
+async def serve(args):
+    server = await LeaderboardServer(HighscoreStore(args.db), args.host, args.port).start()
+    print("Leaderboard listening on {0}:{1}".format(server.host, server.port))
+    if args.bench:
+        seconds = await bench(server.host, server.port, args.bench)
+        print("{0} clients x 5 submissions in {1:.2f} s".format(args.bench, seconds))
+        await server.close()
+        return
+    await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meow Letters leaderboard service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=os.path.join(PROJECT_PATH, "leaderboard.db"))
+    parser.add_argument("--bench", type=int, default=0, metavar="CLIENTS",
+                        help="run a local benchmark with this many concurrent clients")
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
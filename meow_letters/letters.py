@@ -4,6 +4,11 @@ import collections
 
 from constants.alphabets import ENGLISH_ALPHABET as ALPHABET
 
+try:
+    basestring, xrange
+except NameError:  # Python 3, for the hosted games (meow_letters.host)
+    basestring, xrange = str, range
+
 
 class Letter(object):
     """Represents a single letter from the game
@@ -30,6 +35,27 @@ class Letter(object):
         else:
             return 1
 
+    # Python 3 ignores __cmp__. Letters still hash by identity, like on Python 2.
+    __hash__ = object.__hash__
+
+    def __eq__(self, other):
+        return self.__cmp__(other) == 0
+
+    def __ne__(self, other):
+        return self.__cmp__(other) != 0
+
+    def __lt__(self, other):
+        return self.__cmp__(other) < 0
+
+    def __le__(self, other):
+        return self.__cmp__(other) <= 0
+
+    def __gt__(self, other):
+        return self.__cmp__(other) > 0
+
+    def __ge__(self, other):
+        return self.__cmp__(other) >= 0
+
     def select(self):
         """Mark a letter as being selected
         """
@@ -86,9 +112,17 @@ class Letter(object):
 
         :return: Letter object that si adjacent to the current instance
         """
+        return self.choose_adjacent()
+
+    def choose_adjacent(self, rng=random):
+        """Return one of the adjacent letters from the alphabet
+
+        :param rng: random.Random-like object to choose with
+        :return: Letter object that is adjacent to the current instance
+        """
         adjacent = [self.previous, self.next]
         adjacent_filtered = [l for l in adjacent if l is not None]
-        return random.choice(adjacent_filtered)
+        return rng.choice(adjacent_filtered)
 
     def is_first(self):
         """Check if the letter is the first in the alphabet
@@ -118,10 +152,11 @@ class Letter(object):
             return None
         return [Letter(l) for l in ALPHABET[i+1:i+n+1]]
 
-    def get_adjacent_letters(self, n=1):
+    def get_adjacent_letters(self, n=1, rng=random):
         """Return adjacent letters in respect to the available letters
 
         :param n: int length of the required final chain to form
+        :param rng: random.Random-like object to choose with
         :return: list of adjacent letter objects ordered consecutively
         """
         if n < 1:
@@ -140,7 +175,7 @@ class Letter(object):
                 chosen_letter = letters[0]
                 adjacent = chosen_letter.previous
             else:
-                chosen_letter = random.choice([letters[0], letters[-1]])
+                chosen_letter = rng.choice([letters[0], letters[-1]])
                 if chosen_letter == letters[0]:
                     adjacent = chosen_letter.previous
                 else:
@@ -218,6 +253,21 @@ class LetterChain(object):
         self.chain.append(letter)
         return self
 
+    def can_extend(self, letter):
+        """Check in constant time if appending a letter keeps a valid chain
+        valid, that is if it's the letter following the last one
+
+        :param letter: Letter object
+        :return: True if the chain would stay valid, False otherwise
+        """
+        if letter.is_selected():
+            return False
+        last = self.last
+        if last is None:
+            return True
+        following = last.next
+        return following is not None and following.letter == letter.letter
+
     def remove(self, letter):
         """Remove letter from the chain. All consecutive following letter will be
         removed from the chain too.
@@ -263,9 +313,17 @@ class LetterChain(object):
 
 
 class LetterGrid(object):
-    def __init__(self, size):
+    def __init__(self, size, rng=None):
+        """LetterGrid class initializer
+
+        :param size: int number of cells on each side of the square grid
+        :param rng: optional random.Random object, so a grid can be replayed
+                    from a seed; defaults to the random module
+        """
         self.end = False
         self.size = size
+        self.rng = rng or random
+        self.version = 0
         self.create_grid()
         self.chain = LetterChain()
 
@@ -276,6 +334,19 @@ class LetterGrid(object):
         """Initializes the grid with None values
         """
         self.grid = [[None for i in range(self.size)] for j in range(self.size)]
+        self.version += 1
+
+    def set_grid(self, grid):
+        """Replace the board, i.e. with a saved or a challenge board. Always
+        use it instead of assigning grid, so a prepared spawn isn't used on
+        another board.
+
+        :param grid: size x size list of lists of Letter objects or None
+        :return: the current instance
+        """
+        self.grid = grid
+        self.version += 1
+        return self
 
     def setup(self, n):
         """Initializes the board with n random letters with a precomputed
@@ -287,47 +358,62 @@ class LetterGrid(object):
         self.create_grid()
         random_letters = []
         for i in xrange(n-1):
-            letter = Letter(random.choice(ALPHABET))
+            letter = Letter(self.rng.choice(ALPHABET))
             random_letters.append(letter)
-        chosen_letter = random.choice(random_letters)
-        random_letters.append(chosen_letter.any_adjacent)
+        chosen_letter = self.rng.choice(random_letters)
+        random_letters.append(chosen_letter.choose_adjacent(self.rng))
         self.place_randomly(random_letters)
         return self
 
-    def place_randomly(self, letters):
+    def place_randomly(self, letters, order=None):
         """Place randomly on the board a list of letters
 
         :param letters: iterable data structure of Letter objects
-        """
-        free_cells = []
-        for i in xrange(self.size):
-            for j in xrange(self.size):
-                if self.grid[i][j] is None:
-                    free_cells.append([i, j])
-
+        :param order: optional list of all (x, y) cells in a random order; the
+                      letters go to the first free ones, which is as random as
+                      shuffling the free cells but can be prepared in advance
+        """
+        self.version += 1
+        if order is None:
+            free_cells = [(i, j) for i, j in self.iterate_empty()]
+            self.rng.shuffle(free_cells)
+        else:
+            free_cells = order
+        # one pass over the cells for all the letters
+        free = ((i, j) for i, j in free_cells if self.grid[i][j] is None)
         for letter in letters:
-            if not free_cells:
+            cell = next(free, None)
+            if cell is None:
                 self.end = True
                 return
-            random.shuffle(free_cells)
-            i, j = free_cells.pop()
+            i, j = cell
             self.grid[i][j] = letter
 
+    def shuffled_cells(self, rng=None):
+        """Get all the cells of the grid in a random order
+
+        :param rng: optional random.Random object, defaults to the grid's one
+        :return: list of (x, y) tuples
+        """
+        cells = list(self.iterate_pos())
+        (rng or self.rng).shuffle(cells)
+        return cells
+
     def iterate(self):
         """Helper iterator. Iterates through all cells.
         """
-        for ix, iy in self.iterate_pos():
-            child = self.grid[ix][iy]
-            if child:
-                yield ix, iy, child
+        for ix, column in enumerate(self.grid):
+            for iy, child in enumerate(column):
+                if child is not None:
+                    yield ix, iy, child
 
     def iterate_empty(self):
         """Helper iterator. Iterates through empty cells.
         """
-        for ix, iy in self.iterate_pos():
-            child = self.grid[ix][iy]
-            if not child:
-                yield ix, iy
+        for ix, column in enumerate(self.grid):
+            for iy, child in enumerate(column):
+                if child is None:
+                    yield ix, iy
 
     def iterate_pos(self):
         """Helper iterator through a square grid from left to right, top to bottom
@@ -338,18 +424,46 @@ class LetterGrid(object):
             for iy in range(self.size):
                 yield ix, iy
 
-    def cycle_end(self, level):
-        valid_chain = True
-        if self.chain.chain.__len__() == 1:
-            valid_chain = False
+    def chain_positions(self):
+        """Find the cells of the letters of the chain
 
-        for x, y, letter in self.iterate():
+        :return: list of (x, y, letter) tuples
+        """
+        chain = set(id(l) for l in self.chain.chain)
+        return [(x, y, l) for x, y, l in self.iterate() if id(l) in chain]
+
+    def remaining_letters(self):
+        """Letters left on the board once the current chain is cleared
+
+        :return: list of Letter objects
+        """
+        if self.chain.length == 1:
+            return [l for x, y, l in self.iterate()]
+        chain = set(id(l) for l in self.chain.chain)
+        return [l for x, y, l in self.iterate() if id(l) not in chain]
+
+    def cycle_end(self, level, pool=None):
+        """End a round: clear the chain from the board, unless it's a single
+        letter, and spawn new letters
+
+        :param level: int user game level
+        :param pool: optional SpawnPool holding a prepared spawn for this board
+        """
+        prepared = pool.take(self, level) if pool is not None else None
+        if prepared is not None:
+            positions, letters, order = prepared
+        else:
+            positions = self.chain_positions()
+        valid_chain = self.chain.length != 1
+        for x, y, letter in positions:
             letter.unselect()
-            if letter in self.chain.chain:
-                if valid_chain:
-                    self.grid[x][y] = None
-                self.chain.chain.remove(letter)
-        self.add_random_letters(level)
+            if valid_chain:
+                self.grid[x][y] = None
+        self.chain.chain = []
+        if prepared is not None:
+            self.place_randomly(letters, order)
+        else:
+            self.add_random_letters(level)
 
     def add_random_letters(self, level):
         """Add some "random" letters according to the level
@@ -357,24 +471,37 @@ class LetterGrid(object):
         :param level: int user game level
         :return: set of new random letters added to the board
         """
+        random_letters = self.spawn_letters(level, [l for x, y, l in self.iterate()])
+        self.place_randomly(random_letters, self.shuffled_cells())
+        return random_letters
+
+    def spawn_letters(self, level, board, rng=None):
+        """Choose the letters to spawn for a board, without placing them. If the
+        board has no chain long enough for the level, one is made possible.
+
+        :param level: int user game level
+        :param board: list of Letter objects on the board
+        :param rng: optional random.Random object, defaults to the grid's one
+        :return: list of new Letter objects
+        """
         if level < 0:
             raise ValueError("The user level must be at least 1, received <{0}>".format(level))
+        rng = rng or self.rng
 
         random_letters = list()
-        letters_qtty = (level + 1) / 2 + 1
+        letters_qtty = (level + 1) // 2 + 1
 
-        if self.find_consecutive_combinations(letters_qtty):
+        if self.find_consecutive_combinations(letters_qtty, board):
             for _ in xrange(letters_qtty):
-                letter = Letter(random.choice(ALPHABET))
+                letter = Letter(rng.choice(ALPHABET))
                 random_letters.append(letter)
         else:
-            chosen_letter = self.random_choice()
-            letters = chosen_letter.get_adjacent_letters(letters_qtty)
+            chosen_letter = rng.choice(board)
+            letters = chosen_letter.get_adjacent_letters(letters_qtty, rng)
             letters.remove(chosen_letter)
             random_letters += list(letters)
-            letter = Letter(random.choice(ALPHABET))
+            letter = Letter(rng.choice(ALPHABET))
             random_letters.append(letter)
-        self.place_randomly(random_letters)
         return random_letters
 
     def random_choice(self):
@@ -388,14 +515,16 @@ class LetterGrid(object):
         if not letters_pos:
             return None
         else:
-            x, y = random.choice(letters_pos)
+            x, y = self.rng.choice(letters_pos)
             return self.grid[x][y]
 
-    def find_consecutive_combinations(self, n):
+    def find_consecutive_combinations(self, n, board=None):
         """Find n number of consecutive letters on the board
         For instance, 3 consecutive letters are 'X', 'Y' and 'Z'.
 
         :param n: int number of consecutive letters to be found on the board
+        :param board: optional list of Letter objects to search instead of the
+                      letters on the grid
         :return: list of non-duplicate lists with consecutive ordered letter strings
         """
         if n < 2:
@@ -403,8 +532,10 @@ class LetterGrid(object):
                              received <{0}>".format(n))
 
         adjacent_combinations = []
-        text_letters = {l.letter for x, y, l in self.iterate()}
-        letters = [l for x, y, l in self.iterate()]
+        if board is None:
+            board = [l for x, y, l in self.iterate()]
+        text_letters = {l.letter for l in board}
+        letters = list(board)
         if not letters:
             return True
         letters.sort()
@@ -446,3 +577,267 @@ class LetterGrid(object):
                 return True
         else:
             return False
+
+
+class SpawnPool(object):
+    """Holds the next round's spawn, prepared ahead of the round boundary (in
+    an idle frame) so ending a round only clears the chain and fills a few
+    cells. The prepared spawn is used only if the grid, its chain and the
+    level haven't changed since.
+    """
+    def __init__(self):
+        self.letter_grid = None
+        self.key = None
+        self.prepared = None
+
+    @staticmethod
+    def _key(letter_grid, level):
+        return (letter_grid.version, level,
+                tuple(id(l) for l in letter_grid.chain.chain))
+
+    def is_ready(self, letter_grid, level):
+        """Check if the prepared spawn is still valid for the grid
+
+        :param letter_grid: LetterGrid object
+        :param level: int level the round will end with
+        :return: True if a valid spawn is prepared, False otherwise
+        """
+        return (self.prepared is not None and self.letter_grid is letter_grid
+                and self.key == self._key(letter_grid, level))
+
+    def prepare(self, letter_grid, level, rng=None):
+        """Compute the spawn of the end of the current round, unless the
+        prepared one is still valid
+
+        :param letter_grid: LetterGrid object
+        :param level: int level the round will end with
+        :param rng: optional random.Random object, defaults to the grid's one
+        :return: the current instance
+        """
+        if self.is_ready(letter_grid, level):
+            return self
+        rng = rng or letter_grid.rng
+        letters = letter_grid.spawn_letters(level, letter_grid.remaining_letters(), rng)
+        order = letter_grid.shuffled_cells(rng)
+        self.prepared = (letter_grid.chain_positions(), letters, order)
+        self.letter_grid = letter_grid
+        self.key = self._key(letter_grid, level)
+        return self
+
+    def take(self, letter_grid, level):
+        """Get the prepared spawn if it's still valid for the grid. A spawn is
+        used only once.
+
+        :param letter_grid: LetterGrid object
+        :param level: int level the round ends with
+        :return: (chain positions, letters, cell order) or None
+        """
+        ready, prepared = self.is_ready(letter_grid, level), self.prepared
+        self.letter_grid = self.key = self.prepared = None
+        return prepared if ready else None
+
+
+EMPTY_CELL = 0xFF
+EMPTY = bytearray([EMPTY_CELL])
+
+
+class CompactGrid(object):
+    """Compact storage of a board for large grids and simulations taking many
+    snapshots: one byte per cell holding the index of the letter in the
+    alphabet (EMPTY_CELL when empty), cells stored column after column, and one
+    bit per cell for the selection. grid[x][y] goes through lightweight views,
+    so the board reads like a LetterGrid.
+    """
+    def __init__(self, size, alphabet=None):
+        """CompactGrid class initializer
+
+        :param size: int number of cells on each side of the square grid
+        :param alphabet: optional list of string letters, defaults to the game
+                         alphabet; at most 255 letters
+        """
+        self.size = size
+        self.alphabet = alphabet or ALPHABET
+        if len(self.alphabet) >= EMPTY_CELL:
+            raise ValueError("A compact grid holds at most {0} letters, received "
+                             "<{1}>".format(EMPTY_CELL - 1, len(self.alphabet)))
+        self.indexes = dict((l, i) for i, l in enumerate(self.alphabet))
+        self.cells = EMPTY * (size * size)
+        self.selection = bytearray((size * size + 7) // 8)
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.size:
+            raise IndexError("Column out of the grid <{0}>".format(x))
+        return CompactColumn(self, x)
+
+    def get(self, x, y):
+        """Get the letter of a cell
+
+        :return: string letter or None if the cell is empty
+        """
+        value = self.cells[x * self.size + y]
+        return None if value == EMPTY_CELL else self.alphabet[value]
+
+    def set(self, x, y, letter):
+        """Put a letter in a cell, unselected
+
+        :param letter: string letter, Letter object or None to empty the cell
+        """
+        i = x * self.size + y
+        if letter is None:
+            self.cells[i] = EMPTY_CELL
+        else:
+            if isinstance(letter, Letter):
+                letter = letter.letter
+            try:
+                self.cells[i] = self.indexes[letter]
+            except KeyError:
+                raise ValueError("Letter not in the alphabet <{0}>".format(letter))
+        self.selection[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def is_selected(self, x, y):
+        i = x * self.size + y
+        return bool(self.selection[i >> 3] & (1 << (i & 7)))
+
+    def select(self, x, y):
+        i = x * self.size + y
+        self.selection[i >> 3] |= 1 << (i & 7)
+
+    def unselect(self, x, y):
+        i = x * self.size + y
+        self.selection[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def iterate(self):
+        """Helper iterator. Iterates through all cells holding a letter.
+
+        :return: iterator with tuple (x, y, string letter)
+        """
+        size, alphabet, cells = self.size, self.alphabet, self.cells
+        for x in xrange(size):
+            for y, value in enumerate(cells[x * size:(x + 1) * size]):
+                if value != EMPTY_CELL:
+                    yield x, y, alphabet[value]
+
+    def iterate_empty(self):
+        """Helper iterator. Iterates through empty cells.
+
+        :return: iterator with tuple (x, y)
+        """
+        size, cells = self.size, self.cells
+        for x in xrange(size):
+            for y, value in enumerate(cells[x * size:(x + 1) * size]):
+                if value == EMPTY_CELL:
+                    yield x, y
+
+    def count(self):
+        """Number of letters on the board
+
+        :return: int
+        """
+        return len(self.cells) - self.cells.count(EMPTY)
+
+    def snapshot(self):
+        """Copy the state of the board
+
+        :return: tuple of bytes (cells, selection)
+        """
+        return bytes(self.cells), bytes(self.selection)
+
+    def restore(self, snapshot):
+        """Go back to a state taken with snapshot()
+
+        :return: the current instance
+        """
+        self.cells[:] = snapshot[0]
+        self.selection[:] = snapshot[1]
+        return self
+
+    @classmethod
+    def from_letter_grid(cls, letter_grid, alphabet=None):
+        """Store a LetterGrid compactly
+
+        :param letter_grid: LetterGrid object
+        :param alphabet: optional list of string letters
+        :return: CompactGrid object
+        """
+        compact = cls(letter_grid.size, alphabet)
+        for x, y, letter in letter_grid.iterate():
+            compact.set(x, y, letter.letter)
+            if letter.is_selected():
+                compact.select(x, y)
+        return compact
+
+    def to_letter_grid(self, rng=None):
+        """Expand into a LetterGrid. A valid chain is always in alphabetical
+        order, so the selected letters are chained in that order.
+
+        :param rng: optional random.Random object of the new grid
+        :return: LetterGrid object
+        """
+        letter_grid = LetterGrid(self.size, rng)
+        grid = [[None] * self.size for x in xrange(self.size)]
+        selected = []
+        for x, y, value in self.iterate():
+            letter = grid[x][y] = Letter(value)
+            if self.is_selected(x, y):
+                selected.append((self.indexes[value], letter))
+        letter_grid.set_grid(grid)
+        for _, letter in sorted(selected, key=lambda s: s[0]):
+            letter_grid.chain.add(letter)
+        return letter_grid
+
+
+class CompactColumn(object):
+    """Column view of a CompactGrid, so grid[x][y] works
+    """
+    __slots__ = ("grid", "x")
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __len__(self):
+        return self.grid.size
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.grid.size:
+            raise IndexError("Row out of the grid <{0}>".format(y))
+        if self.grid.cells[self.x * self.grid.size + y] == EMPTY_CELL:
+            return None
+        return CompactCell(self.grid, self.x, y)
+
+    def __setitem__(self, y, letter):
+        if not 0 <= y < self.grid.size:
+            raise IndexError("Row out of the grid <{0}>".format(y))
+        self.grid.set(self.x, y, letter)
+
+    def __iter__(self):
+        for y in xrange(self.grid.size):
+            yield self[y]
+
+
+class CompactCell(object):
+    """View of a non empty cell of a CompactGrid with the reading and selection
+    methods of a Letter
+    """
+    __slots__ = ("grid", "x", "y")
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return "<CompactCell '{0}' at ({1}, {2})>".format(self.letter, self.x, self.y)
+
+    @property
+    def letter(self):
+        return self.grid.get(self.x, self.y)
+
+    def select(self):
+        self.grid.select(self.x, self.y)
+
+    def unselect(self):
+        self.grid.unselect(self.x, self.y)
+
+    def is_selected(self):
+        return self.grid.is_selected(self.x, self.y)
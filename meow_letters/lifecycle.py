@@ -0,0 +1,279 @@
+"""Lifecycle instrumentation, to catch objects that outlive their game.
+
+Instances of the tracked classes are counted through weak references, so the
+counts drop as soon as the objects are freed and tracking keeps nothing alive.
+A checkpoint after every game records the live counts; a count that keeps
+rising from game to game is a leak. Start the app with MEOW_LIFECYCLE=1 to log
+the growth after each restart and write lifecycle.json on exit.
+"""
+import gc
+import json
+import weakref
+from collections import defaultdict, deque
+from functools import wraps
+
+
+HISTORY = 256
+WINDOW = 5
+SETTLE_SECONDS = 1.
+
+
+class LeakError(AssertionError):
+    """Live objects keep growing from game to game
+    """
+
+
+class LiveObjects(object):
+    """Live instance counts of tracked classes, plus gauges computed on
+    demand, and their history over checkpoints
+    """
+    def __init__(self, history=HISTORY):
+        """LiveObjects class initializer
+
+        :param history: int number of checkpoints kept
+        """
+        self.live = defaultdict(dict)
+        self.created = defaultdict(int)
+        self.gauges = {}
+        self.history = deque(maxlen=history)
+        self._patched = []
+
+    def add(self, obj, name):
+        """Count an object until it's freed
+
+        :param obj: object supporting weak references
+        :param name: string name it's counted under
+        """
+        refs = self.live[name]
+        key = id(obj)
+        ref = refs.get(key)
+        if ref is not None and ref() is obj:
+            return
+
+        def freed(ref):
+            if refs.get(key) is ref:
+                del refs[key]
+        refs[key] = weakref.ref(obj, freed)
+        self.created[name] += 1
+
+    def _patch(self, cls, method, wrapper):
+        original = cls.__dict__.get(method)
+        setattr(cls, method, wraps(getattr(cls, method))(wrapper))
+        self._patched.append((cls, method, original))
+
+    def track(self, cls, name=None):
+        """Count every instance of a class created from now on
+
+        :param cls: class whose instances support weak references
+        :param name: string name, defaults to the class name
+        :return: the current instance
+        """
+        name = name or cls.__name__
+        init = cls.__init__
+
+        def __init__(obj, *args, **kwargs):
+            init(obj, *args, **kwargs)
+            self.add(obj, name)
+        self._patch(cls, '__init__', __init__)
+        return self
+
+    def after(self, cls, method, callback):
+        """Call a callback with the instance after each call of a method
+
+        :param cls: class owning the method
+        :param method: string method name
+        :param callback: callable taking the instance
+        :return: the current instance
+        """
+        original = getattr(cls, method)
+
+        def wrapper(obj, *args, **kwargs):
+            try:
+                return original(obj, *args, **kwargs)
+            finally:
+                callback(obj)
+        self._patch(cls, method, wrapper)
+        return self
+
+    def untrack(self):
+        """Restore every class patched by track() and after()
+
+        :return: the current instance
+        """
+        while self._patched:
+            cls, method, original = self._patched.pop()
+            if original is None:
+                delattr(cls, method)
+            else:
+                setattr(cls, method, original)
+        return self
+
+    def gauge(self, name, func):
+        """Add a count computed at each checkpoint
+
+        :param name: string name
+        :param func: callable returning an int
+        :return: the current instance
+        """
+        self.gauges[name] = func
+        return self
+
+    def counts(self, collect=True):
+        """Current counts
+
+        :param collect: True to run the garbage collector first, so objects
+                        only held by reference cycles aren't counted
+        :return: dict of string name to int
+        """
+        if collect:
+            gc.collect()
+        counts = dict((name, len(refs)) for name, refs in self.live.items())
+        for name, func in self.gauges.items():
+            counts[name] = func()
+        return counts
+
+    def checkpoint(self, label=None):
+        """Record the current counts
+
+        :param label: optional label of the checkpoint, i.e. the game number
+        :return: dict of string name to int growth since the previous checkpoint
+        """
+        counts = self.counts()
+        previous = self.history[-1][1] if self.history else {}
+        self.history.append((label, counts))
+        return dict((name, count - previous.get(name, 0)) for name, count in counts.items())
+
+    def rising(self, window=WINDOW):
+        """Names whose count grew at each of the last window checkpoints
+
+        :param window: int number of consecutive growths
+        :return: sorted list of names
+        """
+        if window < 1:
+            raise ValueError("The window must be at least one checkpoint, "
+                             "got <{0}>".format(window))
+        if len(self.history) <= window:
+            return []
+        recent = [counts for label, counts in list(self.history)[-window - 1:]]
+        return sorted(name for name in recent[-1]
+                      if all(b.get(name, 0) > a.get(name, 0)
+                             for a, b in zip(recent, recent[1:])))
+
+    def check(self, window=WINDOW):
+        """Fail if some counts keep rising
+
+        :param window: int number of consecutive growths making a leak
+        """
+        rising = self.rising(window)
+        if rising:
+            counts = self.history[-1][1]
+            raise LeakError("Still growing after {0} checkpoints: {1}".format(
+                window, ", ".join("{0} ({1})".format(name, counts[name]) for name in rising)))
+
+    def format(self, growth=None):
+        """Format the last counts, one name per line
+
+        :param growth: optional dict of growths to show next to the counts
+        :return: string
+        """
+        if not self.history:
+            return ""
+        counts = self.history[-1][1]
+        growth = growth or {}
+        return "\n".join("{0}: {1} ({2:+d})".format(name, counts[name], growth.get(name, 0))
+                         for name in sorted(counts))
+
+    def dump(self, filename):
+        """Write the checkpoints and the number of created objects as json
+
+        :param filename: string path of the output file
+        """
+        data = {"created": dict(self.created),
+                "checkpoints": [{"label": label, "counts": counts}
+                                for label, counts in self.history]}
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+
+
+def soak(play, games, tracker, window=WINDOW, warmup=2):
+    """Play games one after the other and fail as soon as a count has grown
+    after each of the last window games. The first games are left out, while
+    caches fill up.
+
+    :param play: callable taking the game number
+    :param games: int number of games
+    :param tracker: LiveObjects object
+    :param window: int number of consecutive growths making a leak
+    :param warmup: int number of games before the first checkpoint
+    :return: the tracker
+    """
+    for i in range(games):
+        play(i)
+        if i >= warmup:
+            tracker.checkpoint(i)
+            tracker.check(window)
+    return tracker
+
+
+def count_instructions(widget):
+    """Number of canvas instructions of a widget and its children
+
+    :param widget: Widget object
+    :return: int
+    """
+    def count(group):
+        children = getattr(group, 'children', None) or []
+        return len(children) + sum(count(child) for child in children)
+
+    total = 0
+    for child in widget.walk():
+        canvas = child.canvas
+        total += count(canvas)
+        if getattr(canvas, 'has_before', False):
+            total += count(canvas.before)
+        if getattr(canvas, 'has_after', False):
+            total += count(canvas.after)
+    return total
+
+
+def install(app, window=WINDOW):
+    """Track the objects of the running Kivy app: letters, letter cells,
+    animations, highscore rows, widgets and canvas instructions, with a
+    checkpoint once the board settles after every restart and resume. The
+    classes are taken from the module of the app, which is __main__ when
+    main.py is run.
+
+    :param app: MeowLettersApp object
+    :param window: int number of consecutive growths logged as a leak
+    :return: LiveObjects object
+    """
+    from kivy.animation import Animation
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    from kivy.logger import Logger
+    from letters import Letter
+    from screens import HighscoreRow
+    from telemetry import app_module
+
+    main = app_module(app)
+    tracker = LiveObjects()
+    for cls in (Letter, main.LetterCell, Animation, HighscoreRow):
+        tracker.track(cls)
+    tracker.gauge("widgets", lambda: sum(1 for child in EventLoop.window.children
+                                         for _ in child.walk()))
+    tracker.gauge("canvas", lambda: sum(count_instructions(child)
+                                        for child in EventLoop.window.children))
+    games = [0]
+
+    def report(dt):
+        games[0] += 1
+        growth = tracker.checkpoint(games[0])
+        Logger.info("Lifecycle: game {0}\n{1}".format(games[0], tracker.format(growth)))
+        rising = tracker.rising(window)
+        if rising:
+            Logger.warning("Lifecycle: still growing after {0} games: {1}".format(
+                window, ", ".join(rising)))
+
+    for method in ("restart", "resume"):
+        tracker.after(main.Game, method, lambda game: Clock.schedule_once(report, SETTLE_SECONDS))
+    return tracker
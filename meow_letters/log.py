@@ -1,11 +1,137 @@
+import os
+import atexit
 import logging
 import logging.config
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    QueueHandler = QueueListener = None
 
 
-def getLogger(name):
+CONFIG_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                           'configs', 'logging.conf')
+
+_lock = threading.Lock()
+_listener = None
+
+
+if QueueHandler is None:
+    class QueueHandler(logging.Handler):
+        """Minimal backport of logging.handlers.QueueHandler: puts formatted
+        records on a queue instead of writing them
+        """
+        def __init__(self, queue):
+            logging.Handler.__init__(self)
+            self.queue = queue
+
+        def prepare(self, record):
+            """Merge args and exception info into the message, so the record can
+            be handled on another thread
+
+            :param record: LogRecord object
+            :return: the prepared record
+            """
+            self.format(record)
+            record.msg = record.message
+            record.args = None
+            record.exc_info = None
+            return record
+
+        def emit(self, record):
+            try:
+                self.queue.put_nowait(self.prepare(record))
+            except Exception:
+                self.handleError(record)
+
+    class QueueListener(object):
+        """Minimal backport of logging.handlers.QueueListener: passes records
+        from a queue to the real handlers on a background thread
+        """
+        _sentinel = None
+
+        def __init__(self, queue, *handlers, **kwargs):
+            self.queue = queue
+            self.handlers = handlers
+            self.respect_handler_level = kwargs.get('respect_handler_level', False)
+            self._thread = None
+
+        def start(self):
+            self._thread = threading.Thread(target=self._monitor)
+            self._thread.daemon = True
+            self._thread.start()
+
+        def handle(self, record):
+            for handler in self.handlers:
+                if self.respect_handler_level and record.levelno < handler.level:
+                    continue
+                handler.handle(record)
+
+        def _monitor(self):
+            while True:
+                record = self.queue.get()
+                if record is self._sentinel:
+                    break
+                self.handle(record)
+
+        def stop(self):
+            self.queue.put_nowait(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+
+def _configure():
+    """Load the config file once and move the configured root handlers behind a
+    QueueHandler, so the caller never waits on log I/O.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        logging.config.fileConfig(CONFIG_PATH, disable_existing_loggers=False)
+        root = logging.getLogger()
+        handlers = root.handlers[:]
+        for handler in handlers:
+            root.removeHandler(handler)
+        records = queue.Queue(-1)
+        root.addHandler(QueueHandler(records))
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Flush the pending records and stop the background listener.
+    """
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def set_level(name, level):
+    """Override the level of a single logger, without touching the config file
+
+    :param name: string logger name, i.e. module __name__
+    :param level: int level or string level name, i.e. 'DEBUG'
+    :return: logger object
+    """
+    _configure()
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    return logger
+
+
+def getLogger(name, level=None):
     """ Override logging.getLogger() to load the log config.
-    If you want to change logging configuration, make changes to the config file 
-    from configs folder.
+    If you want to change logging configuration, make changes to the config file
+    from configs folder. The config is read only once, on the first call.
 
     Usage in other files::
 
@@ -13,10 +139,13 @@ def getLogger(name):
         logging = log.getLogger(__name__)
 
     :param name: filename origin of logging
+    :param level: optional level override for this logger only
     :return: logger object
     """
-    logging.config.fileConfig('configs/logging.conf')
+    _configure()
     logger = logging.getLogger(name)
+    if level is not None:
+        logger.setLevel(level)
     return logger
 
 
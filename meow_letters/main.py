@@ -1,5 +1,7 @@
 import os
 import copy
+import datetime
+from timeit import default_timer
 from random import choice
 from string import letters
 
@@ -10,18 +12,21 @@ from kivy.config import Config
 from kivy.clock import Clock
 from kivy.graphics import Color, BorderImage
 from kivy.properties import StringProperty, NumericProperty, ObjectProperty
-from kivy.uix.screenmanager import ScreenManager, NoTransition
+from kivy.uix.screenmanager import NoTransition
 from kivy.uix.widget import Widget
 
 from constants.colors import *
 from constants.misc import *
-from letters import LetterGrid, Letter
+from letters import LetterGrid, Letter, SpawnPool, CompactGrid
 from level import Level
 from score import Score
-from screens import (MenuScreen, GameScreen, GameOverScreen, HighscoresScreen,
-                     SettingsScreen)
-from storage.meowjson import SettingsJson
-from storage.meowdb import MeowDatabase
+from replay import GameRecord
+from broadcast import spectator_feed, close_spectator_feed
+from glyphs import TEXTURES, GLYPHS
+from screens import (LazyScreenManager, MenuScreen, GameScreen, GameOverScreen,
+                     HighscoresScreen, SettingsScreen, run_in_background,
+                     CHALLENGES, WORKER)
+from storage import finish_game, analytics_recorder, close_analytics_recorder
 from meow_letters import PROJECT_PATH
 
 
@@ -40,7 +45,13 @@ class Game(Widget):
         self.letter_grid = LetterGrid(GRID_SIZE)
         self.score = Score()
         self.level = Level()
-        self.io = MeowDatabase()
+        self.challenge = None
+        self.record = None
+        self.round = 0
+        self.spawn_pool = SpawnPool()
+        self.trigger_prepare_spawn = Clock.create_trigger(self.prepare_spawn,
+                                                          SPAWN_IDLE_SECONDS)
+        self.trigger_publish = Clock.create_trigger(self.publish_state)
 
     def rebuild_background(self):
         """Rebuilds the canvas background and the elements
@@ -48,16 +59,13 @@ class Game(Widget):
         self.canvas.before.clear()
         with self.canvas.before:
             Color(*BLUE)
-            BorderImage(pos=self.pos,
-                        size=self.size,
-                        source=os.path.join(PROJECT_PATH,
-                                            'assets/img/mask.png'))
+            mask = TEXTURES.get('mask.png')
+            BorderImage(pos=self.pos, size=self.size, texture=mask)
             Color(*LIGHTER_BLUE)
             for ix, iy in self.letter_grid.iterate_pos():
                 BorderImage(pos=self.index_to_pos(ix, iy),
                             size=(self.tile_size, self.tile_size),
-                            source=os.path.join(PROJECT_PATH,
-                                                'assets/img/mask.png'))
+                            texture=mask)
 
     def reposition(self, *args):
         self.rebuild_background()
@@ -68,9 +76,11 @@ class Game(Widget):
         self.tile_size = tile_size
         self.tile_padding = padding
 
+        atlas = GLYPHS.atlas(tile_size)
         for ix, iy, letter in self.iterate():
             letter.size = tile_size, tile_size
             letter.pos = self.index_to_pos(ix, iy)
+            letter.glyph = atlas.glyph(letter.letter)
 
     def iterate(self):
         """Helper iterator. Iterates through all cells.
@@ -140,38 +150,107 @@ class Game(Widget):
             letter = LetterCell(
                 size=(self.tile_size, self.tile_size),
                 pos=self.index_to_pos(x, y),
-                letter=str(value))
+                letter=str(value),
+                glyph=GLYPHS.glyph(str(value), self.tile_size))
             self.remove_widget(self.grid[x][y])
             self.grid[x][y] = letter
             self.add_widget(letter)
 
     def on_touch_down(self, touch):
-        """Catches the touch event on the grid.
+        """Catches the touch event on the grid. The touch is grabbed so
+        dragging it over the next letters extends the chain.
         """
         relative_coordinates = self.to_widget(touch.pos[0], touch.pos[1], True)
         x, y = self.pos_to_index(relative_coordinates)
         if x is not None and y is not None:
+            touch.grab(self)
             self.toggle(x, y)
+            letter = self.letter_grid[x][y]
+            touch.ud['meow_cell'] = (x, y)
+            touch.ud['meow_path'] = [(x, y)] if letter is not None \
+                and letter is self.letter_grid.chain.last else []
 
         super(Game, self).on_touch_down(touch)
         return True
 
+    def on_touch_move(self, touch):
+        """Swipe selection. Move events staying in the same cell are dropped
+        before any other work, so high rate touch panels cost one comparison
+        per event.
+        """
+        if touch.grab_current is not self:
+            return super(Game, self).on_touch_move(touch)
+        relative_coordinates = self.to_widget(touch.pos[0], touch.pos[1], True)
+        cell = self.pos_to_index(relative_coordinates)
+        if cell == touch.ud.get('meow_cell') or cell[0] is None \
+                or not (0 <= cell[0] < GRID_SIZE and 0 <= cell[1] < GRID_SIZE):
+            return True
+        touch.ud['meow_cell'] = cell
+        self.swipe(cell[0], cell[1], touch.ud['meow_path'])
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is self:
+            touch.ungrab(self)
+            return True
+        return super(Game, self).on_touch_up(touch)
+
+    def swipe(self, x, y, path):
+        """Extend the chain with the letter of a cell entered by a swipe, or
+        take back the last letter when the swipe goes back to the previous cell.
+        Letters that don't fit are passed over without a penalty. Only the
+        changed cell is redrawn.
+
+        :param x: index on X axis
+        :param y: index on Y axis
+        :param path: list of the cells chained by the current swipe
+        """
+        letter = self.letter_grid[x][y]
+        if letter is None:
+            return
+        chain = self.letter_grid.chain
+        if len(path) >= 2 and (x, y) == path[-2]:
+            lx, ly = path.pop()
+            last = self.letter_grid[lx][ly]
+            if last is None or last is not chain.last:
+                return
+            if self.record is not None:
+                self.record.toggle(lx, ly)
+            chain.remove(last)
+            self.grid[lx][ly].unselect()
+        elif chain.can_extend(letter):
+            if self.record is not None:
+                self.record.toggle(x, y)
+            chain.add(letter)
+            path.append((x, y))
+            self.grid[x][y].select()
+            if self.letter_grid.is_complete_chain():
+                self.parent.parent.parent.ids.timer.reset()
+        else:
+            return
+        self.prepare_spawn_when_idle()
+        self.trigger_publish()
+
     def toggle(self, x, y):
         game_screen = self.parent.parent.parent
-        decrement = Clock.create_trigger(game_screen.ids.timer.decrement)
         letter = self.letter_grid[x][y]
         if letter is not None:
+            if self.record is not None:
+                self.record.toggle(x, y)
             if letter.is_selected():
                 self.letter_grid.chain.remove(letter)
             else:
                 self.letter_grid.chain.add(letter)
                 if not self.letter_grid.chain.is_valid():
-                    decrement()
+                    game_screen.ids.timer.decrement()
+                    analytics_recorder().penalty()
                     self.letter_grid.chain.clear()
 
             if self.letter_grid.is_complete_chain():
                 game_screen.ids.timer.reset()
             self.update_grid()
+            self.prepare_spawn_when_idle()
+            self.trigger_publish()
 
     def update_grid(self):
         for x, y, letter in self.letter_grid.iterate():
@@ -193,8 +272,11 @@ class Game(Widget):
         self.ids.end_label.text = text
         Animation(opacity=1., d=.5).start(end)
 
-    def restart(self):
-        """Restarts the game. Puts three random letters on the board.
+    def restart(self, challenge=None):
+        """Restarts the game. Puts three random letters on the board, or the
+        starting board of a daily challenge.
+
+        :param challenge: optional DailyChallenge object
         """
         self.score.reset()
         self.level.reset()
@@ -202,17 +284,19 @@ class Game(Widget):
             self.remove_widget(child)
         self.grid = [[None for i in range(GRID_SIZE)] for j in range(GRID_SIZE)]
         self.reposition()
-        self.letter_grid = LetterGrid(GRID_SIZE)
-        self.letter_grid.setup(3)
+        self.challenge = challenge
+        self.round = 0
+        self.record = GameRecord.new(challenge)
+        self.letter_grid = self.record.letter_grid()
+        analytics_recorder().start_game()
         Clock.schedule_once(self.redraw)
+        self.prepare_spawn_when_idle()
+        self.trigger_publish()
         self.ids.end.opacity = 0
         if self.parent:
             game_screen = self.parent.parent.parent
             if game_screen.end == True:
                 game_screen.ids.timer.restart()
-                Clock.unschedule(game_screen.tick)
-                Clock.schedule_interval(game_screen.tick,
-                                        game_screen.ids.timer.interval)
                 game_screen.end = False
 
     def resume(self, score, level, grid):
@@ -225,9 +309,12 @@ class Game(Widget):
         letter_grid = copy.deepcopy(grid)
         for i, row in enumerate(grid):
             letter_grid[i] = [Letter(l) if l is not None else None for l in row]
-        self.letter_grid = LetterGrid(GRID_SIZE)
-        self.letter_grid.grid = letter_grid
+        self.challenge = None
+        self.record = None
+        self.letter_grid = LetterGrid(GRID_SIZE).set_grid(letter_grid)
         Clock.schedule_once(self.redraw)
+        self.prepare_spawn_when_idle()
+        self.trigger_publish()
         self.ids.end.opacity = 0
 
     def redraw(self, *args):
@@ -240,53 +327,149 @@ class Game(Widget):
                 self.spawn_letter_at(x, y, self.letter_grid[x][y].letter)
 
     def cycle_end(self):
-        self.score.update(self.letter_grid.chain.length)
+        chain_length = self.letter_grid.chain.length
+        self.score.update(chain_length)
         self.level.set_level(self.score.points)
-        self.letter_grid.cycle_end(self.level.level)
+        analytics_recorder().end_round(chain_length, self.level.level,
+                                       self.score.points)
+        self.round += 1
+        if self.record is not None:
+            self.record.end_round()
+            self.letter_grid.rng = self.record.round_rng(self.round)
+        self.letter_grid.cycle_end(self.level.level, self.spawn_pool)
         self.redraw()
         self.update_grid()
+        self.prepare_spawn_when_idle()
+        self.trigger_publish()
+
+    def publish_state(self, *args):
+        """Send the board to the spectators, if a spectator relay is configured.
+        Runs at most once per frame.
+        """
+        feed = spectator_feed()
+        if feed is not None:
+            feed.publish(CompactGrid.from_letter_grid(self.letter_grid),
+                         self.score.points, self.level.level)
+
+    def prepare_spawn_when_idle(self):
+        """Prepare the spawn once no letter was selected for SPAWN_IDLE_SECONDS,
+        so it's usually computed once per round, while the player looks for the
+        next letter, instead of after every selection
+        """
+        self.trigger_prepare_spawn.cancel()
+        self.trigger_prepare_spawn()
+
+    def prepare_spawn(self, *args):
+        """Prepare the spawn of the end of the round for the current chain, so
+        the round end doesn't have to compute it
+        """
+        points = Score(self.score.points).update(self.letter_grid.chain.length)
+        level = Level().set_level(points)
+        rng = None
+        if self.record is not None:
+            rng = self.record.round_rng(self.round + 1)
+        self.spawn_pool.prepare(self.letter_grid, level, rng)
 
     def save_highscore(self):
-        settings = SettingsJson(
-            os.path.join(PROJECT_PATH, "data/settings.json"))
-        self.io.insert_highscore(settings.get_username(), self.score.points)
+        run_in_background(finish_game, None, self.score.points)
+        if self.record is not None:
+            self.record.finish(self.score.points, self.level.level)
+            run_in_background(self.record.append_to, None,
+                              os.path.join(PROJECT_PATH, "games.jsonl"))
 
 
 class Timer(Widget):
+    """Round timer bar. The end of the round is a single Clock event at the
+    deadline, moved when time is taken off; the bar width is interpolated from
+    the deadline once per frame and only redrawn when it changes.
+    """
+    __events__ = ('on_finish',)
+
     def __init__(self, **kwargs):
         super(Timer, self).__init__()
-        self.redraw()
-        self.interval = 0.05
+        self.deadline = None
         self.finished = False
+        self.bar = None
+        self.bar_width = None
+        self.redraw()
 
     def redraw(self):
-        self.opacity = 1
         self.canvas.before.clear()
         with self.canvas.before:
             Color(*PINK)
-            BorderImage(pos=self.pos, size=self.size,
-                        source=os.path.join(PROJECT_PATH,
-                                            'assets/img/mask.png'))
+            self.bar = BorderImage(pos=self.pos, size=self.size,
+                                   texture=TEXTURES.get('mask.png'))
+        self.bar_width = None
+        self.update_bar()
 
-    def tick(self, *args):
-        if self.size[0] < 0:
-            self.finished = True
+    @property
+    def remaining(self):
+        """Seconds left in the round
 
-        width = self.parent.size[0]
-        self.size[0] -= width / (ROUND_SECONDS / self.interval)
-        self.redraw()
+        :return: float seconds, 0 if the timer isn't running
+        """
+        if self.deadline is None:
+            return 0.
+        return max(self.deadline - default_timer(), 0.)
+
+    def update_bar(self, *args):
+        if self.deadline is None:
+            return
+        width = int(self.width * self.remaining / ROUND_SECONDS)
+        if width != self.bar_width:
+            self.bar_width = width
+            self.bar.size = (width, self.height)
+
+    def _schedule(self):
+        Clock.unschedule(self._finish)
+        Clock.schedule_once(self._finish, self.remaining)
+
+    def _finish(self, *args):
+        self.stop()
+        self.finished = True
+        self.dispatch('on_finish')
 
-    def restart(self):
+    def on_finish(self):
+        pass
+
+    def start(self, seconds=ROUND_SECONDS):
+        """Start a round
+
+        :param seconds: float length of the round
+        """
+        self.opacity = 1
         self.finished = False
-        self.size[0] = self.parent.size[0]
+        self.deadline = default_timer() + seconds
+        self.bar_width = None
+        self._schedule()
+        Clock.unschedule(self.update_bar)
+        Clock.schedule_interval(self.update_bar, 0)
+
+    def stop(self):
+        """Stop the timer without finishing the round
+        """
+        Clock.unschedule(self._finish)
+        Clock.unschedule(self.update_bar)
+        self.deadline = None
+
+    def restart(self):
+        self.start(ROUND_SECONDS)
 
     def decrement(self, seconds=1):
-        width = self.parent.size[0]
-        self.size[0] -= width / ROUND_SECONDS
+        """Take time off the current round
+
+        :param seconds: float seconds to take off
+        """
+        if self.deadline is not None:
+            self.deadline -= seconds
+            self._schedule()
 
     def reset(self):
-        self.finished = True
-        self.size[0] = self.parent.size[0]
+        """Finish the current round right away
+        """
+        if self.deadline is not None:
+            self.deadline = default_timer()
+            self._schedule()
 
 
 class LetterCell(Widget):
@@ -294,6 +477,7 @@ class LetterCell(Widget):
     (WOW! The grid. So much TRON. Very Cycle. Such ISO.)
     """
     letter = StringProperty('A')
+    glyph = ObjectProperty(None, allownone=True)
     scale = NumericProperty(.1)
     bg_color = ObjectProperty(LIGHT_BROWN)
 
@@ -317,16 +501,39 @@ class LetterCell(Widget):
 
 
 class MeowLettersApp(App):
+    recorder = None
+    lifecycle = None
+
     def on_start(self):
         EventLoop.window.bind(on_keyboard=self.hook_keyboard)
+        today = datetime.date.today()
+        CHALLENGES.prefetch([today, today + datetime.timedelta(days=1)])
+        if os.environ.get('MEOW_TELEMETRY'):
+            import telemetry
+            self.recorder = telemetry.install(
+                self, overlay=bool(os.environ.get('MEOW_TELEMETRY_OVERLAY')))
+        if os.environ.get('MEOW_LIFECYCLE'):
+            import lifecycle
+            self.lifecycle = lifecycle.install(self)
+
+    def on_stop(self):
+        # the highscore of a game that just ended may still be queued
+        WORKER.close(timeout=5)
+        close_analytics_recorder()
+        close_spectator_feed()
+        if self.recorder is not None:
+            self.recorder.dump(os.path.join(PROJECT_PATH, 'telemetry.json'))
+        if self.lifecycle is not None:
+            self.lifecycle.dump(os.path.join(PROJECT_PATH, 'lifecycle.json'))
 
     def build(self):
-        self.manager = ScreenManager(transition=NoTransition())
+        TEXTURES.preload()
+        self.manager = LazyScreenManager(transition=NoTransition())
         self.manager.add_widget(MenuScreen(name='menu'))
-        self.manager.add_widget(GameScreen(name='game'))
-        self.manager.add_widget(GameOverScreen(name='gameover'))
-        self.manager.add_widget(HighscoresScreen(name='highscores'))
-        self.manager.add_widget(SettingsScreen(name='settings'))
+        self.manager.register('game', GameScreen)
+        self.manager.register('gameover', GameOverScreen)
+        self.manager.register('highscores', HighscoresScreen)
+        self.manager.register('settings', SettingsScreen)
         return self.manager
 
     def hook_keyboard(self, window, key, *args):
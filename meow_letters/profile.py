@@ -0,0 +1,526 @@
+"""Reproducible profile of scripted or seeded games.
+
+Usage::
+
+    python -m meow_letters.profile [--seed 1] [--games 20] [--script games.jsonl]
+        [--widget] [--profiler cprofile|sample] [--output profile]
+
+Games are played by a bot from seeds, or replayed from the records of a
+games.jsonl file. By default they run through the game core: the sessions of
+a SessionManager, timed by its wheel on a simulated clock, with each finished
+game stored in a temporary highscores database. With --widget they are
+played through the Kivy Game widget of the app, in a window placed off the
+screen.
+
+cprofile writes <output>.pstats, to read with pstats or snakeviz. sample
+polls the stack of the game thread and writes <output>.collapsed, one
+'frame;frame;frame count' line per stack, for flamegraph.pl or speedscope.
+Both print the time spent in each subsystem: letters, storage, rendering,
+timer and other. The time of library code is charged to the subsystem that
+called it.
+"""
+import os
+import sys
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from timeit import default_timer
+
+# cProfile imports the standard profile module, which this module shadows when
+# the game directory is on the path
+_path = sys.path[:]
+sys.path[:] = [p for p in _path if os.path.abspath(p or os.curdir) !=
+               os.path.dirname(os.path.abspath(__file__))]
+try:
+    import cProfile
+    import pstats
+finally:
+    sys.path[:] = _path
+
+from meow_letters import PROJECT_PATH
+sys.path.insert(0, PROJECT_PATH)
+
+from constants.alphabets import ENGLISH_ALPHABET as ALPHABET
+from constants.misc import ROUND_SECONDS
+from replay import GameRecord
+from sessions import SessionManager, TimerWheel
+
+
+MAX_ROUNDS = 1000
+SAMPLE_INTERVAL = .001
+
+# Subsystems by path fragment of the source file, first match wins
+SUBSYSTEMS = (
+    ("storage", ("/storage/", "/sqlite3/", "/json/")),
+    ("rendering", ("/glyphs.py", "/kivy/graphics/", "/kivy/core/", "/kivy/uix/",
+                   "/kivy/lang.py", "/kivy/animation.py")),
+    ("timer", ("/kivy/clock.py",)),
+    ("letters", ("/letters.py", "/level.py", "/score.py", "/replay.py",
+                 "/challenge.py", "/sessions.py")),
+)
+
+
+def code_of(function):
+    """Code object of a function or method
+
+    :return: code object
+    """
+    function = getattr(function, '__func__', function)
+    return function.__code__
+
+
+def overrides(widget=False):
+    """Subsystems of the functions living in the modules of another subsystem
+
+    :param widget: True to include the classes of the Kivy app
+    :return: dict of (filename, first line) to string subsystem
+    """
+    functions = {"timer": [TimerWheel.schedule, TimerWheel.cancel, TimerWheel.advance,
+                           SessionManager.advance]}
+    if widget:
+        import main
+        functions["timer"] += [f for f in vars(main.Timer).values() if callable(f)]
+        functions["rendering"] = [f for f in vars(main.LetterCell).values() if callable(f)]
+        functions["rendering"] += [main.Game.rebuild_background, main.Game.reposition,
+                                   main.Game.redraw, main.Game.spawn_letter_at,
+                                   main.Game.update_grid]
+    found = {}
+    for subsystem, members in functions.items():
+        for function in members:
+            try:
+                code = code_of(function)
+            except AttributeError:
+                continue
+            found[(os.path.normcase(code.co_filename), code.co_firstlineno)] = subsystem
+    return found
+
+
+class Classifier(object):
+    """Maps source locations to subsystems
+    """
+    def __init__(self, overrides=None):
+        """Classifier class initializer
+
+        :param overrides: optional dict of (filename, first line) to subsystem
+        """
+        self.overrides = overrides or {}
+        self.cache = {}
+
+    def __call__(self, filename, lineno):
+        """Subsystem of a function
+
+        :param filename: string source file
+        :param lineno: int first line of the function
+        :return: string subsystem, or None for library code and builtins
+        """
+        key = (filename, lineno)
+        if key not in self.cache:
+            normalized = os.path.normcase(filename)
+            subsystem = self.overrides.get((normalized, lineno))
+            if subsystem is None:
+                path = normalized.replace(os.sep, "/")
+                for name, fragments in SUBSYSTEMS:
+                    if any(fragment in path for fragment in fragments):
+                        subsystem = name
+                        break
+                else:
+                    if path.startswith(os.path.normcase(PROJECT_PATH).replace(os.sep, "/")):
+                        subsystem = "other"
+            self.cache[key] = subsystem
+        return self.cache[key]
+
+
+def pstats_subsystems(stats, classify):
+    """Self time of the functions of a cProfile run, by subsystem. The time
+    of library functions and builtins goes to their callers, in proportion
+    of the time spent under each caller.
+
+    :param stats: pstats.Stats object
+    :param classify: Classifier object
+    :return: dict of string subsystem to float seconds
+    """
+    entries = stats.stats
+    totals = defaultdict(float)
+
+    def charge(function, seconds, visiting):
+        subsystem = classify(function[0], function[1])
+        if subsystem is not None:
+            totals[subsystem] += seconds
+            return
+        callers = dict((caller, value) for caller, value in entries[function][4].items()
+                       if caller not in visiting)
+        weights = dict((caller, value[2]) for caller, value in callers.items())
+        total = sum(weights.values())
+        if not total:
+            weights = dict((caller, value[0]) for caller, value in callers.items())
+            total = sum(weights.values())
+        if not total:
+            totals["other"] += seconds
+            return
+        visiting = visiting | {function}
+        for caller, weight in weights.items():
+            charge(caller, seconds * weight / total, visiting)
+
+    for function, (cc, nc, tt, ct, callers) in entries.items():
+        if tt:
+            charge(function, tt, frozenset())
+    return dict(totals)
+
+
+class Sampler(object):
+    """Sampling profiler: a thread records the stack of another thread at a
+    fixed interval. A sample stands for the time since the previous one, as
+    the sampling thread waits for the interpreter lock.
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        """Sampler class initializer
+
+        :param interval: float seconds between two samples
+        :param thread_id: optional identifier of the sampled thread, defaults
+                          to the thread creating the sampler
+        """
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.current_thread().ident
+        self.stacks = Counter()
+        self.seconds = defaultdict(float)
+        self._stop = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self):
+        """Start sampling
+
+        :return: the current instance
+        """
+        self._stop.clear()
+        if hasattr(sys, 'setswitchinterval'):
+            # let the sampling thread take the lock as often as it samples
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self.interval, self._switch_interval))
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling
+
+        :return: the current instance
+        """
+        self._stop.set()
+        self._thread.join()
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+        return self
+
+    def _run(self):
+        last = default_timer()
+        while not self._stop.wait(self.interval):
+            now = default_timer()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                stack = tuple(reversed(stack))
+                self.stacks[stack] += 1
+                self.seconds[stack] += elapsed
+
+    def collapsed(self):
+        """Samples in the collapsed stack format of flamegraph.pl
+
+        :return: list of strings, one per distinct stack
+        """
+        lines = []
+        for stack, count in sorted(self.stacks.items()):
+            frames = ["{0} ({1}:{2})".format(name, os.path.basename(filename), lineno)
+                      for filename, lineno, name in stack]
+            lines.append("{0} {1}".format(";".join(frames), count))
+        return lines
+
+    def subsystems(self, classify):
+        """Time spent in each subsystem, from the innermost classified frame of
+        every sample
+
+        :param classify: Classifier object
+        :return: dict of string subsystem to float seconds
+        """
+        totals = defaultdict(float)
+        for stack, seconds in self.seconds.items():
+            subsystem = "other"
+            for filename, lineno, name in reversed(stack):
+                found = classify(filename, lineno)
+                if found is not None:
+                    subsystem = found
+                    break
+            totals[subsystem] += seconds
+        return dict(totals)
+
+
+def chain_cells(letter_grid):
+    """Cells of the longest run of consecutive letters on the board, the move
+    of the bot
+
+    :param letter_grid: LetterGrid object
+    :return: list of (x, y), empty if no two letters follow each other
+    """
+    positions = {}
+    for x, y, letter in letter_grid.iterate():
+        positions.setdefault(letter.letter, (x, y))
+    best, run = [], []
+    for letter in ALPHABET:
+        if letter in positions:
+            run.append(positions[letter])
+            if len(run) > len(best):
+                best = list(run)
+        else:
+            run = []
+    return best if len(best) > 1 else []
+
+
+class SeededPlayer(object):
+    """Bot playing the longest chain of the board, skipping some rounds so
+    games end
+    """
+    def __init__(self, seed, skill=.7):
+        """SeededPlayer class initializer
+
+        :param seed: int seed of the game and of the bot
+        :param skill: float probability of playing a round
+        """
+        self.record = GameRecord(seed=seed)
+        self.rng = random.Random(seed)
+        self.skill = skill
+
+    def moves(self, i, letter_grid):
+        """Cells to select in a round
+
+        :param i: int round number
+        :param letter_grid: LetterGrid object of the game
+        :return: list of (x, y), or None to stop playing
+        """
+        if self.rng.random() >= self.skill:
+            return []
+        return chain_cells(letter_grid)
+
+
+class ScriptedPlayer(object):
+    """Replays the selections of a recorded game
+    """
+    def __init__(self, record):
+        self.record = record
+
+    def moves(self, i, letter_grid):
+        if i >= len(self.record.rounds):
+            return None
+        size = self.record.size
+        return [(cell // size, cell % size) for cell in self.record.rounds[i]]
+
+
+def play_core(players, directory, max_rounds=MAX_ROUNDS):
+    """Play games through the sessions of a SessionManager on a simulated
+    clock, and store the finished ones
+
+    :param players: list of SeededPlayer or ScriptedPlayer objects
+    :param directory: string directory of the highscores database and records
+    :return: int number of rounds played
+    """
+    from storage.meowdb import MeowDatabase
+    database = MeowDatabase(os.path.join(directory, "highscores.db"))
+    clock = [0.]
+    manager = SessionManager(clock=lambda: clock[0], idle_seconds=10 ** 9)
+    rounds = 0
+    try:
+        for player in players:
+            session = manager.create()
+            # the game of the player, seeded or a daily challenge, instead of
+            # the manager's
+            session.record = GameRecord(seed=player.record.seed, day=player.record.day,
+                                        size=player.record.size)
+            session.letter_grid = session.record.letter_grid()
+            i = 0
+            while not session.over and i < max_rounds:
+                cells = player.moves(i, session.letter_grid)
+                if cells is None:
+                    break
+                ended = False
+                for x, y in cells:
+                    try:
+                        ended = manager.toggle(session.id, x, y) == "complete"
+                    except ValueError:
+                        pass
+                    if ended:
+                        break
+                if not ended:
+                    clock[0] += ROUND_SECONDS
+                    manager.advance()
+                i += 1
+            rounds += i
+            database.insert_highscore("profile", session.score.points)
+            session.record.finish(session.score.points, session.level.level)
+            session.record.append_to(os.path.join(directory, "games.jsonl"))
+            manager.remove(session.id)
+    finally:
+        database.close()
+    return rounds
+
+
+class WidgetDriver(object):
+    """Plays games through the Game widget of a running app, one move per
+    frame, ending each round as soon as its moves are made
+    """
+    def __init__(self, app, players, max_rounds=MAX_ROUNDS):
+        self.app = app
+        self.players = list(players)
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self.player = None
+        self.pending = []
+        self.round = 0
+
+    @property
+    def screen(self):
+        return self.app.manager.get_screen('game')
+
+    def start(self, *args):
+        self.app.manager.current = 'game'
+        self.next_game()
+
+    def next_game(self, *args):
+        from kivy.clock import Clock
+        if not self.players:
+            self.app.stop()
+            return
+        self.player = self.players.pop(0)
+        game = self.screen.ids.game
+        game.restart()
+        record = self.player.record
+        game.record = GameRecord(seed=record.seed, day=record.day, size=record.size)
+        game.letter_grid = game.record.letter_grid()
+        self.round = 0
+        self.pending = None
+        Clock.schedule_once(self.step)
+
+    def step(self, *args):
+        from kivy.clock import Clock
+        game = self.screen.ids.game
+        if self.pending is None:
+            if game.letter_grid.end or self.round >= self.max_rounds:
+                Clock.schedule_once(self.next_game)
+                return
+            self.pending = self.player.moves(self.round, game.letter_grid)
+            if self.pending is None:
+                Clock.schedule_once(self.next_game)
+                return
+        if self.pending:
+            x, y = self.pending.pop(0)
+            game.toggle(x, y)
+        else:
+            self.screen.round_end()
+            self.round += 1
+            self.rounds += 1
+            self.pending = None
+        Clock.schedule_once(self.step)
+
+
+def play_widget(players, directory, max_rounds=MAX_ROUNDS):
+    """Play games through the Kivy app, in a window off the screen. Scores
+    and analytics go to databases in a temporary directory.
+
+    :return: int number of rounds played
+    """
+    from kivy.config import Config
+    Config.set('graphics', 'width', '320')
+    Config.set('graphics', 'height', '480')
+    Config.set('graphics', 'position', 'custom')
+    Config.set('graphics', 'left', '-10000')
+    Config.set('graphics', 'top', '-10000')
+    from kivy.clock import Clock
+    import storage
+    from storage.meowdb import MeowDatabase
+    from storage.meowanalytics import AnalyticsStore, AnalyticsRecorder
+    from main import MeowLettersApp
+    # the singletons are set up front, so the profile doesn't touch the
+    # player's settings, saved game, highscores and analytics
+    storage._store = storage._highscores = MeowDatabase(os.path.join(directory, "highscores.db"))
+    storage._analytics = AnalyticsRecorder(AnalyticsStore(os.path.join(directory, "analytics.db")))
+    app = MeowLettersApp()
+    driver = WidgetDriver(app, players, max_rounds)
+    Clock.schedule_once(driver.start, .5)
+    app.run()
+    return driver.rounds
+
+
+def report(totals, elapsed):
+    lines = ["{0:<10} {1:>9} {2:>6}".format("subsystem", "seconds", "%")]
+    total = sum(totals.values()) or 1.
+    for subsystem, seconds in sorted(totals.items(), key=lambda t: -t[1]):
+        lines.append("{0:<10} {1:>9.3f} {2:>5.1f}%".format(subsystem, seconds,
+                                                          100. * seconds / total))
+    lines.append("{0:<10} {1:>9.3f}".format("wall", elapsed))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile Meow Letters games")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed of the first bot game (default: %(default)s)")
+    parser.add_argument("--games", type=int, default=20,
+                        help="number of bot games (default: %(default)s)")
+    parser.add_argument("--script", help="replay the records of a games.jsonl file instead")
+    parser.add_argument("--widget", action="store_true",
+                        help="play through the Kivy Game widget instead of the game core")
+    parser.add_argument("--profiler", choices=("cprofile", "sample"), default="cprofile")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL,
+                        help="seconds between samples (default: %(default)s)")
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--output", default="profile",
+                        help="output path without extension (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        with open(args.script) as f:
+            players = [ScriptedPlayer(GameRecord.loads(line)) for line in f if line.strip()]
+    else:
+        players = [SeededPlayer(args.seed + i) for i in range(args.games)]
+    play = play_widget if args.widget else play_core
+    directory = tempfile.mkdtemp(prefix="meow-profile-")
+    profiler = cProfile.Profile() if args.profiler == "cprofile" else Sampler(args.interval)
+    start = default_timer()
+    try:
+        if args.profiler == "cprofile":
+            rounds = profiler.runcall(play, players, directory, args.max_rounds)
+        else:
+            profiler.start()
+            try:
+                rounds = play(players, directory, args.max_rounds)
+            finally:
+                profiler.stop()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    elapsed = default_timer() - start
+
+    classify = Classifier(overrides(args.widget))
+    if args.profiler == "cprofile":
+        output = args.output + ".pstats"
+        profiler.dump_stats(output)
+        totals = pstats_subsystems(pstats.Stats(output), classify)
+    else:
+        output = args.output + ".collapsed"
+        with open(output, "w") as f:
+            f.write("\n".join(profiler.collapsed()) + "\n")
+        totals = profiler.subsystems(classify)
+    print("{0} games, {1} rounds".format(len(players), rounds))
+    print(report(totals, elapsed))
+    print("Wrote {0}".format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Offline verifier of recorded games. A game is replayed from its seed and
+selections through LetterGrid, Score and Level, without Kivy, and the submitted
+score and level are checked against the replayed ones.
+
+Usage::
+
+    python -m meow_letters.replay games.jsonl --processes 4
+
+Each line of the input is a GameRecord serialized with dumps().
+"""
+import sys
+import json
+import random
+import numbers
+import datetime
+from collections import OrderedDict
+from timeit import default_timer
+# multiprocessing and argparse are only imported by the batch verifier, the
+# game imports this module too
+
+from meow_letters import setup_path
+if __name__ == '__main__':
+    setup_path()
+
+from constants.misc import GRID_SIZE
+from challenge import DailyChallenge
+from letters import LetterGrid
+from level import Level
+from score import Score
+
+
+MAX_CHALLENGES = 8
+MIN_SIZE = 3
+MAX_SIZE = GRID_SIZE * 4
+_challenges = OrderedDict()
+
+
+class ReplayError(ValueError):
+    """A recorded game that can't be replayed, or doesn't match its submission
+    """
+
+
+def daily_challenge(day):
+    """Challenge of a day, generated once per process. Only the last
+    MAX_CHALLENGES used days are kept, so verifying games of many days doesn't
+    hold all their challenges.
+
+    :param day: datetime.date object
+    :return: DailyChallenge object
+    """
+    challenge = _challenges.pop(day, None)
+    if challenge is None:
+        challenge = DailyChallenge.generate(day)
+    remember_challenge(challenge)
+    return challenge
+
+
+def remember_challenge(challenge):
+    """Keep a challenge as the most recently used one
+
+    :param challenge: DailyChallenge object
+    """
+    _challenges.pop(challenge.day, None)
+    _challenges[challenge.day] = challenge
+    while len(_challenges) > MAX_CHALLENGES:
+        _challenges.popitem(last=False)
+
+
+class GameRecord(object):
+    """Everything needed to replay a game: the seed of the board, or the day of
+    a daily challenge, and the cells selected in each round
+    """
+    def __init__(self, seed=None, day=None, size=GRID_SIZE, rounds=None,
+                 score=0, level=1):
+        """GameRecord class initializer
+
+        :param seed: int seed of the game, unused for daily challenges
+        :param day: optional datetime.date of a daily challenge
+        :param size: int grid size
+        :param rounds: list of lists of selected cells, one list per round, a
+                       cell being x * size + y
+        :param score: int submitted score
+        :param level: int submitted level
+        """
+        self.seed = seed
+        self.day = day
+        self.size = size
+        self.rounds = rounds if rounds is not None else []
+        self.current = []
+        self.score = score
+        self.level = level
+
+    @classmethod
+    def new(cls, challenge=None):
+        """Start recording a game with a fresh seed, or a daily challenge
+
+        :param challenge: optional DailyChallenge object
+        :return: GameRecord object
+        """
+        if challenge is not None:
+            remember_challenge(challenge)
+            return cls(day=challenge.day, size=len(challenge.grid))
+        return cls(seed=random.getrandbits(32))
+
+    def round_rng(self, i):
+        """Random generator of a round, the same in the game and in the replay
+
+        :param i: int round number, starting at 0
+        :return: random.Random object
+        """
+        if self.day is not None:
+            return daily_challenge(self.day).round_rng(i)
+        return random.Random(self.seed * 100003 + i)
+
+    def letter_grid(self):
+        """Build the starting LetterGrid of the game
+
+        :return: LetterGrid object
+        """
+        if self.day is not None:
+            return daily_challenge(self.day).letter_grid()
+        return LetterGrid(self.size, rng=self.round_rng(0)).setup(3)
+
+    def toggle(self, x, y):
+        """Record the selection of a cell in the current round
+
+        :return: the current instance
+        """
+        self.current.append(x * self.size + y)
+        return self
+
+    def end_round(self):
+        """Close the current round
+
+        :return: the current instance
+        """
+        self.rounds.append(self.current)
+        self.current = []
+        return self
+
+    def finish(self, score, level):
+        """Set the submitted result of the game
+
+        :return: the current instance
+        """
+        self.score = score
+        self.level = level
+        return self
+
+    def dumps(self):
+        """Serialize to a single json line
+
+        :return: string
+        """
+        return json.dumps({"seed": self.seed,
+                           "day": self.day.isoformat() if self.day else None,
+                           "size": self.size, "rounds": self.rounds,
+                           "score": self.score, "level": self.level},
+                          separators=(',', ':'))
+
+    def append_to(self, filename):
+        """Append the serialized record as a line of a file
+
+        :param filename: string path of the file
+        """
+        with open(filename, "a") as f:
+            f.write(self.dumps() + "\n")
+
+    @classmethod
+    def loads(cls, data):
+        """Deserialize a record serialized with dumps(). The seed must be an int
+        or None and the size an int from MIN_SIZE to MAX_SIZE.
+
+        :param data: string
+        :return: GameRecord object
+        """
+        try:
+            d = json.loads(data)
+            day = d.get("day")
+            if day is not None:
+                day = datetime.datetime.strptime(day, "%Y-%m-%d").date()
+            seed, size = d.get("seed"), d["size"]
+            rounds = [[int(cell) for cell in cells] for cells in d["rounds"]]
+            record = cls(seed, day, size, rounds, int(d["score"]), int(d["level"]))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ReplayError("Malformed game record: {0}".format(e))
+        if seed is not None and not is_int(seed):
+            raise ReplayError("Malformed game record: invalid seed <{0!r}>".format(seed))
+        if not is_int(size) or not MIN_SIZE <= size <= MAX_SIZE:
+            raise ReplayError("Malformed game record: invalid size <{0!r}>".format(size))
+        return record
+
+
+def is_int(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def replay(record):
+    """Replay a recorded game with the rules of the Game widget
+
+    :param record: GameRecord object
+    :return: tuple (score, level, True if the game is over)
+    """
+    if record.day is None and record.seed is None:
+        raise ReplayError("Game record without a seed")
+    letter_grid = record.letter_grid()
+    size = letter_grid.size
+    score = Score()
+    level = Level()
+    for i, cells in enumerate(record.rounds):
+        if letter_grid.end:
+            raise ReplayError("Round {0} played after the end of the game".format(i))
+        for cell in cells:
+            if not 0 <= cell < size * size:
+                raise ReplayError("Round {0} selects a cell out of the grid <{1}>".format(i, cell))
+            letter = letter_grid[cell // size][cell % size]
+            if letter is None:
+                raise ReplayError("Round {0} selects an empty cell <{1}>".format(i, cell))
+            if letter.is_selected():
+                letter_grid.chain.remove(letter)
+            else:
+                letter_grid.chain.add(letter)
+                if not letter_grid.chain.is_valid():
+                    letter_grid.chain.clear()
+        score.update(letter_grid.chain.length)
+        level.set_level(score.points)
+        letter_grid.rng = record.round_rng(i + 1)
+        letter_grid.cycle_end(level.level)
+    return score.points, level.level, letter_grid.end
+
+
+def verify(record):
+    """Check a finished game against its submitted score and level
+
+    :param record: GameRecord object
+    :return: None if the submission matches, the string reason otherwise
+    """
+    try:
+        points, level, over = replay(record)
+    except ReplayError as e:
+        return str(e)
+    if not over:
+        return "The game isn't over"
+    if (points, level) != (record.score, record.level):
+        return "Submitted score {0} level {1}, replayed score {2} level {3}".format(
+            record.score, record.level, points, level)
+    return None
+
+
+def verify_line(line):
+    try:
+        return verify(GameRecord.loads(line))
+    except ReplayError as e:
+        return str(e)
+
+
+def verify_many(lines, processes=None, chunksize=64):
+    """Verify serialized records across a process pool
+
+    :param lines: iterable of GameRecord.dumps() strings
+    :param processes: int number of worker processes, defaults to the CPU count
+    :param chunksize: int number of records sent to a worker at once
+    :return: list of verify() results, in the order of the input
+    """
+    import multiprocessing
+    pool = multiprocessing.Pool(processes)
+    try:
+        return list(pool.imap(verify_line, lines, chunksize))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Verify recorded Meow Letters games")
+    parser.add_argument("games", help="file with one recorded game per line")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes, defaults to the CPU count")
+    parser.add_argument("--chunksize", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    with open(args.games) as f:
+        lines = [line for line in f if line.strip()]
+    start = default_timer()
+    results = verify_many(lines, args.processes, args.chunksize)
+    elapsed = default_timer() - start
+    rejected = 0
+    for i, reason in enumerate(results):
+        if reason is not None:
+            rejected += 1
+            print("line {0}: {1}".format(i + 1, reason))
+    print("{0} games, {1} rejected, {2:.0f} games/s".format(
+        len(results), rejected, len(results) / max(elapsed, 1e-9)))
+    return 1 if rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,71 @@
 import os
 import copy
+import datetime
 from kivy.clock import Clock
-from kivy.properties import ObjectProperty
+from kivy.metrics import dp
+from kivy.properties import ObjectProperty, NumericProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
-from kivy.uix.screenmanager import Screen
-from kivy.uix.label import Label
+from kivy.uix.relativelayout import RelativeLayout
+from kivy.uix.screenmanager import Screen, ScreenManager
+from kivy.uix.scrollview import ScrollView
 
+from challenge import ChallengeCache
 from constants.colors import *
-from storage.meowjson import SettingsJson, StateJson
-from storage.meowdb import MeowDatabase
+from constants.misc import ROUND_SECONDS
+from storage import highscores_database, game_store
+from storage.pager import HighscorePager, TopHighscores
 from meow_letters import PROJECT_PATH
+from meow_letters.worker import Worker
+
+
+CHALLENGES = ChallengeCache(os.path.join(PROJECT_PATH, "data/daily"))
+WORKER = Worker(lambda func: Clock.schedule_once(lambda dt: func()))
+
+
+def run_in_background(func, callback=None, *args):
+    """Call func(*args) on the background worker, then callback(result) on the
+    main thread with the next frame. Calls run one at a time, in order; if func
+    raises, the error is logged and callback receives None.
+
+    :param func: callable to run in the background
+    :param callback: optional callable receiving the result
+    """
+    WORKER.submit(func, callback, *args)
+
+
+class LazyScreenManager(ScreenManager):
+    """Screen manager that builds registered screens on first access, so only
+    the menu has to be built before the app becomes interactive
+    """
+    def __init__(self, **kwargs):
+        super(LazyScreenManager, self).__init__(**kwargs)
+        self.factories = {}
+
+    def register(self, name, factory):
+        """Register a screen to be built when it's first requested
+
+        :param name: string screen name
+        :param factory: callable accepting a name keyword, i.e. a Screen subclass
+        :return: the current instance
+        """
+        self.factories[name] = factory
+        return self
+
+    def has_screen(self, name):
+        return name in self.factories or \
+            super(LazyScreenManager, self).has_screen(name)
+
+    def get_screen(self, name):
+        """Return the screen with the given name, building it if needed
+
+        :param name: string screen name
+        :return: Screen object
+        """
+        factory = self.factories.pop(name, None)
+        if factory is not None:
+            self.add_widget(factory(name=name))
+        return super(LazyScreenManager, self).get_screen(name)
 
 
 class MenuButton(Button):
@@ -23,14 +79,14 @@ class MenuScreen(Screen):
     """
     def __init__(self, **kwargs):
         super(MenuScreen, self).__init__(**kwargs)
-        self.state = StateJson(os.path.join(PROJECT_PATH, "data/state.json"))
+        self.store = game_store()
         self.button = MenuButton(text="Continue")
 
     def on_enter(self, *args):
         self.ids.new_game_btn.bind(on_press=self.new_game)
-        if not self.state.empty:
+        if self.store.saved_state() is not None:
             self.button.bind(on_press=self.continue_game)
-            self.ids.menu.add_widget(self.button, index=3)
+            self.ids.menu.add_widget(self.button, index=4)
 
     def on_leave(self, *args):
         self.ids.menu.remove_widget(self.button)
@@ -38,11 +94,19 @@ class MenuScreen(Screen):
     def continue_game(self, *args):
         game_screen = self.parent.get_screen('game')
         game_screen.resume = True
+        game_screen.challenge = False
         self.parent.current = 'game'
 
     def new_game(self, *args):
         game_screen = self.parent.get_screen('game')
         game_screen.resume = False
+        game_screen.challenge = False
+        self.parent.current = 'game'
+
+    def daily_challenge(self, *args):
+        game_screen = self.parent.get_screen('game')
+        game_screen.resume = False
+        game_screen.challenge = True
         self.parent.current = 'game'
 
 
@@ -51,60 +115,57 @@ class GameScreen(Screen):
     """
     def __init__(self, **kwargs):
         super(GameScreen, self).__init__(**kwargs)
-        self.state = StateJson(os.path.join(PROJECT_PATH, "data/state.json"))
+        self.store = game_store()
         self.resume = False
+        self.challenge = False
         self.end = False
 
-    def tick(self, *args):
+    def round_end(self, *args):
+        """Called by the timer when a round is over
+        """
         timer = self.ids.timer
-        timer.tick()
-        if timer.finished:
-            self.ids.game.cycle_end()
-            self.ids.score.text = "Score {0}".format(self.ids.game.score.points)
-            self.ids.level.text = "Level {0}".format(self.ids.game.level.level)
-            if self.ids.game.letter_grid.end:
-                self.ids.game.end()
-                self.timer_stop()
-                timer.opacity = 0
-            else:
-                timer.restart()
+        self.ids.game.cycle_end()
+        self.ids.score.text = "Score {0}".format(self.ids.game.score.points)
+        self.ids.level.text = "Level {0}".format(self.ids.game.level.level)
+        if self.ids.game.letter_grid.end:
+            self.ids.game.end()
+            self.timer_stop()
+            timer.opacity = 0
+        else:
+            timer.restart()
 
     def timer_stop(self):
-        Clock.unschedule(self.tick)
+        self.ids.timer.stop()
 
     def on_pre_enter(self, *args):
         self.end = False
         if self.resume:
-            self.state.restore()
-            self.state.clear()
-
-            score = self.state.get_score()
-            level = self.state.get_level()
-            grid = self.state.get_grid()
-            self.ids.score.text = "Score {0}".format(score)
-            self.ids.level.text = "Level {0}".format(level)
-            self.ids.timer.size[0] = self.state.get_timer()
-            self.ids.game.resume(score, level, grid)
+            state = self.store.saved_state()
+            self.store.clear_state()
+
+            self.ids.score.text = "Score {0}".format(state["score"])
+            self.ids.level.text = "Level {0}".format(state["level"])
+            self.ids.game.resume(state["score"], state["level"], state["grid"])
+            self.ids.timer.start(min(state["timer"], ROUND_SECONDS))
         else:
-            self.state.clear()
-            self.ids.game.restart()
+            self.store.clear_state()
+            if self.challenge:
+                self.ids.game.restart(CHALLENGES.get(datetime.date.today()))
+            else:
+                self.ids.game.restart()
             self.ids.timer.restart()
             self.ids.score.text = "Score {0}".format(self.ids.game.score.points)
             self.ids.level.text = "Level {0}".format(self.ids.game.level.level)
-        Clock.unschedule(self.tick)
-        Clock.schedule_interval(self.tick, self.ids.timer.interval)
 
     def on_pre_leave(self, *args):
         if not self.end:
             score = self.ids.game.score
             level = self.ids.game.level
-            timer = self.ids.timer.size[0]
+            timer = self.ids.timer.remaining
             grid = copy.deepcopy(self.ids.game.letter_grid.grid)
             for i, row in enumerate(grid):
                 grid[i] = [l.letter if l is not None else None for l in row]
-            self.state.save(level.level, score.points, timer, grid)
-        else:
-            self.state.clear()
+            self.store.save_state(level.level, score.points, timer, grid)
         self.timer_stop()
 
 
@@ -114,57 +175,125 @@ class GameOverScreen(Screen):
     pass
 
 
-class HighscoreLabel(Label):
-    """Custom label widget for representing highscores
+class HighscoreRow(BoxLayout):
+    """One row of the highscores list, declared in the kv file
     """
-    def __init__(self, root, text, halign):
-        super(HighscoreLabel, self).__init__()
-        self.text = text
-        self.halign = halign
-        self.color = DARK_BLUE
-        self.font_size = min(root.height, root.width) / 18.
-        self.width = root.width / 2.5
-        self.height = min(root.height, root.width) / 16.
-        self.text_size = (root.width / 2.5, None)
-        self.size_hint = (None, None)
+    rank = StringProperty("")
+    username = StringProperty("")
+    highscore = StringProperty("")
+    index = None
+
+
+class HighscoreList(ScrollView):
+    """Scrollable highscores that only draws the visible rows. A fixed pool of
+    rows is moved and relabelled as the list scrolls, and the highscores are
+    loaded page by page around them.
+    """
+    row_height = NumericProperty(dp(36))
+    pager = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super(HighscoreList, self).__init__(**kwargs)
+        self.content = RelativeLayout(size_hint_y=None, height=0)
+        self.add_widget(self.content)
+        self.rows = []
+        self.bind(size=self.layout_rows, row_height=self.layout_rows,
+                  scroll_y=self.refresh)
+
+    def on_pager(self, instance, pager):
+        self.scroll_y = 1
+        self.layout_rows()
+
+    def layout_rows(self, *args):
+        """Create enough rows to cover the visible height, and size the
+        content after the number of highscores
+        """
+        needed = int(self.height // self.row_height) + 2
+        while len(self.rows) < needed:
+            row = HighscoreRow(size_hint=(None, None))
+            self.rows.append(row)
+            self.content.add_widget(row)
+        while len(self.rows) > needed:
+            self.content.remove_widget(self.rows.pop())
+        for row in self.rows:
+            row.size = (self.width, self.row_height)
+            row.index = None
+        total = self.pager.total if self.pager is not None else None
+        self.content.height = max((total or 0) * self.row_height, self.height)
+        self.refresh()
+
+    def refresh(self, *args):
+        """Show the rows under the current scroll position
+        """
+        if self.pager is None or self.pager.total is None:
+            for row in self.rows:
+                row.opacity = 0
+            return
+        total, height = self.pager.total, self.content.height
+        if height != max(total * self.row_height, self.height):
+            # the count just arrived
+            return self.layout_rows()
+        top = height - (height - self.height) * (1 - self.scroll_y)
+        first = max(int((height - top) // self.row_height), 0)
+        last = min(first + len(self.rows), total)
+        self.pager.prefetch(first, last)
+        for slot, row in enumerate(self.rows):
+            index = first + slot
+            entry = self.pager.get(index) if index < total else None
+            if index >= total:
+                row.opacity = 0
+                continue
+            row.opacity = 1
+            row.y = height - (index + 1) * self.row_height
+            if row.index == index and (entry is None) == (row.highscore == ""):
+                continue
+            row.index = index
+            row.rank = "{0}.".format(index + 1)
+            row.username = entry[0] if entry is not None else ""
+            row.highscore = str(entry[1]) if entry is not None else ""
 
 
 class HighscoresScreen(Screen):
     """Represents game highscores screen
     """
-    highscores_layout = ObjectProperty(None)
-    io = MeowDatabase()
+    highscores_list = ObjectProperty(None)
+    _io = None
+
+    @property
+    def io(self):
+        """Highscores database, opened on first use and shared by all instances
+
+        :return: MeowDatabase or RemoteDatabase object
+        """
+        if HighscoresScreen._io is None:
+            HighscoresScreen._io = highscores_database()
+        return HighscoresScreen._io
 
     def on_enter(self):
-        self.highscores_layout.clear_widgets()
-        self.append_title()
-        highscores = self.io.get_top_highscores()
-        for i, entry in enumerate(highscores):
-            i += 1
-            username = "{0}.  {1}".format(i, entry[0])
-            self.highscores_layout.add_widget(
-                HighscoreLabel(self.highscores_layout, username, "left"))
-            highscore = str(entry[1])
-            self.highscores_layout.add_widget(
-                HighscoreLabel(self.highscores_layout, highscore, "right"))
-
-    def append_title(self):
-        self.highscores_layout.add_widget(
-            Label(text="Highscores",
-                  color=DARK_BROWN,
-                  font_size=min(self.highscores_layout.height,
-                                self.highscores_layout.width) / 10.,
-                  width=self.highscores_layout.width,
-                  size_hint_y=None,
-                  height=min(self.highscores_layout.height,
-                             self.highscores_layout.width) / 4.))
+        """Show the list from the top, with the highscores saved since the
+        last visit
+        """
+        if self.highscores_list.pager is None:
+            source = self.io if hasattr(self.io, 'page') else TopHighscores(self.io)
+            self.highscores_list.pager = HighscorePager(
+                source, on_change=self.highscores_list.refresh, run=run_in_background)
+        self.highscores_list.pager.reset()
+        self.highscores_list.scroll_y = 1
+        self.highscores_list.refresh()
 
 
 class SettingsScreen(Screen):
     """Represents game settings screen
     """
     username_input = ObjectProperty(None)
-    io = SettingsJson(os.path.join(PROJECT_PATH, "data/settings.json"))
+
+    @property
+    def io(self):
+        """Settings storage, the game database
+
+        :return: MeowDatabase object
+        """
+        return game_store()
 
     def on_leave(self):
         self.io.save_username(self.username_input.text)
@@ -1,7 +1,6 @@
 from meow_letters.storage.meowdb import MeowDatabase
 
 
+# MeowDatabase creates the highscores tables, indexes and triggers if missing
 database = MeowDatabase()
-database.db.execute("""CREATE TABLE highscores (id integer primary key autoincrement,
-                       username text, highscore integer)""")
-database.db.close()
+database.close()
@@ -0,0 +1,97 @@
+"""Report how long the app startup path takes to import and check it against a
+budget, in the spirit of ``python -X importtime`` (which Python 2 doesn't have).
+
+Usage::
+
+    python meow_letters/scripts/import_budget.py [--module main] [--budget 1500]
+
+Exits with status 1 when the total import time exceeds the budget.
+"""
+import sys
+import time
+import argparse
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+from meow_letters import PROJECT_PATH
+
+
+IMPORT_BUDGET_MS = 1500
+
+
+class ImportTimer(object):
+    """Wraps the builtin __import__ and records self and cumulative time of every
+    module imported for the first time
+    """
+    def __init__(self):
+        self.records = []
+        self._stack = []
+        self._import = builtins.__import__
+
+    def __call__(self, name, *args, **kwargs):
+        if name in sys.modules:
+            return self._import(name, *args, **kwargs)
+        self._stack.append(0)
+        depth = len(self._stack)
+        start = time.time()
+        try:
+            return self._import(name, *args, **kwargs)
+        finally:
+            cumulative = time.time() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.records.append((depth, name, cumulative - children, cumulative))
+
+    def __enter__(self):
+        builtins.__import__ = self
+        return self
+
+    def __exit__(self, *args):
+        builtins.__import__ = self._import
+
+    @property
+    def total(self):
+        """Total import time in seconds
+
+        :return: float sum of the cumulative time of the top level imports
+        """
+        return sum(r[3] for r in self.records if r[0] == 1)
+
+    def report(self, stream=sys.stderr):
+        """Write the records in the same layout as -X importtime
+
+        :param stream: file-like object to write to
+        """
+        stream.write("import time: self [us] | cumulative | imported package\n")
+        for depth, name, self_time, cumulative in self.records:
+            stream.write("import time: {0:>9} | {1:>10} | {2}{3}\n".format(
+                int(self_time * 1e6), int(cumulative * 1e6), "  " * (depth - 1), name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--module", default="main",
+                        help="module that starts the app (default: main)")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS,
+                        help="allowed import time in ms (default: %(default)s)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_PATH)
+    with ImportTimer() as timer:
+        __import__(args.module)
+    timer.report()
+
+    total_ms = timer.total * 1000
+    print("Total import time of '{0}': {1:.1f} ms (budget {2:.1f} ms)".format(
+        args.module, total_ms, args.budget))
+    if total_ms > args.budget:
+        print("Import time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
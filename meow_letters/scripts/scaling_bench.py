@@ -0,0 +1,310 @@
+"""Measure how the LetterGrid and LetterChain paths scale with the grid size,
+the alphabet length and the level, and flag the ones that grow faster than
+expected.
+
+Usage::
+
+    python meow_letters/scripts/scaling_bench.py [--max-size 512]
+        [--max-alphabet 1024] [--max-level 64] [--csv scaling.csv] [--seed 1]
+
+Each sweep varies one parameter and keeps the others at their defaults. For
+every operation and value the CSV has the time per operation and, where
+tracemalloc is available, the peak memory and the number of memory blocks
+still allocated after one operation. The growth exponent of each operation is
+fitted on a log-log scale; the script exits with status 1 when one exceeds its
+expected big-O.
+"""
+import sys
+import csv
+import math
+import random
+import argparse
+from contextlib import contextmanager
+from timeit import default_timer
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from meow_letters import setup_path
+if __name__ == '__main__':
+    setup_path()
+
+import letters
+from constants.alphabets import ENGLISH_ALPHABET
+from letters import Letter, LetterChain, LetterGrid, CompactGrid
+
+
+DEFAULT_SIZE = 32
+DEFAULT_ALPHABET = len(ENGLISH_ALPHABET)
+DEFAULT_LEVEL = 1
+MIN_SECONDS = .05
+TOLERANCE = .35
+
+# Expected growth exponent of each operation in the swept variable: the number
+# of cells for the grid size sweep, the chain length for the alphabet sweep and
+# the number of spawned letters for the level sweep.
+EXPECTED = {
+    ("size", "iterate"): 1,
+    ("size", "place_randomly"): 1,
+    ("size", "find_consecutive_combinations"): 1,
+    ("size", "cycle_end"): 1,
+    ("size", "round"): 1,
+    ("size", "compact_iterate"): 1,
+    ("size", "compact_snapshot"): 1,
+    ("alphabet", "chain_add"): 1,
+    ("alphabet", "chain_is_valid"): 1,
+    ("alphabet", "chain_remove"): 1,
+    ("alphabet", "find_consecutive_combinations"): 1,
+    ("level", "place_randomly"): 1,
+    ("level", "cycle_end"): 1,
+}
+
+
+@contextmanager
+def alphabet(length):
+    """Temporarily replace the alphabet of the letters module. Letters past the
+    English ones are zero padded numbers, so they still sort in order.
+
+    :param length: int number of letters
+    """
+    if length <= len(ENGLISH_ALPHABET):
+        replacement = ENGLISH_ALPHABET[:length]
+    else:
+        replacement = ["{0:05d}".format(i) for i in range(length)]
+    original = letters.ALPHABET
+    letters.ALPHABET = replacement
+    try:
+        yield replacement
+    finally:
+        letters.ALPHABET = original
+
+
+def spawn_count(level):
+    return (level + 1) // 2 + 1
+
+
+def filled_grid(size, rng, fill=.5):
+    """A grid with about fill of its cells taken by random letters
+
+    :return: LetterGrid object
+    """
+    letter_grid = LetterGrid(size, rng=rng)
+    count = max(int(size * size * fill), 2)
+    letter_grid.place_randomly([Letter(rng.choice(letters.ALPHABET)) for _ in range(count)])
+    return letter_grid
+
+
+def selected_grid(size, rng):
+    """A half full grid with a chain of two letters selected
+
+    :return: LetterGrid object
+    """
+    letter_grid = filled_grid(size, rng)
+    select_pair(letter_grid)
+    return letter_grid
+
+
+def select_pair(letter_grid):
+    """Select two consecutive letters of the board, if there are any, like a
+    player would
+    """
+    positions = dict((l.letter, l) for x, y, l in letter_grid.iterate())
+    alphabet_index = dict((l, i) for i, l in enumerate(letters.ALPHABET))
+    for letter in positions:
+        i = alphabet_index[letter] + 1
+        if i < len(letters.ALPHABET) and letters.ALPHABET[i] in positions:
+            letter_grid.chain.add(positions[letter]).add(positions[letters.ALPHABET[i]])
+            return
+
+
+def measure(setup, func, mutates=True):
+    """Time an operation until MIN_SECONDS have been spent, then run it once
+    more under tracemalloc
+
+    :param setup: callable returning the argument of func, not timed
+    :param func: callable taking the result of setup
+    :param mutates: False if func leaves its argument unchanged, so the same
+                    state is reused instead of set up again for every call
+    :return: tuple (seconds per call, peak bytes or None, retained blocks or None)
+    """
+    elapsed, calls = 0., 0
+    state = setup()
+    while elapsed < MIN_SECONDS:
+        if mutates and calls:
+            state = setup()
+        start = default_timer()
+        func(state)
+        elapsed += default_timer() - start
+        calls += 1
+    peak = blocks = None
+    if tracemalloc is not None:
+        state = setup()
+        tracemalloc.start()
+        func(state)
+        peak = tracemalloc.get_traced_memory()[1]
+        blocks = sum(stat.count for stat in
+                     tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.stop()
+    return elapsed / calls, peak, blocks
+
+
+def grid_operations(size, level, rng):
+    """Operations of a round on a half full grid
+
+    :return: list of (name, setup, func, mutates)
+    """
+    spawned = spawn_count(level)
+    return [
+        ("iterate", lambda: filled_grid(size, rng),
+         lambda g: sum(1 for _ in g.iterate()), False),
+        ("place_randomly", lambda: (filled_grid(size, rng),
+                                    [Letter(rng.choice(letters.ALPHABET)) for _ in range(spawned)]),
+         lambda s: s[0].place_randomly(s[1]), True),
+        ("find_consecutive_combinations", lambda: filled_grid(size, rng),
+         lambda g: g.find_consecutive_combinations(min(spawned, len(letters.ALPHABET) - 1) + 1),
+         False),
+        ("cycle_end", lambda: selected_grid(size, rng),
+         lambda g: g.cycle_end(level), True),
+        ("round", lambda: filled_grid(size, rng),
+         lambda g: (select_pair(g), g.cycle_end(level)), True),
+        ("compact_iterate", lambda: CompactGrid.from_letter_grid(filled_grid(size, rng)),
+         lambda g: sum(1 for _ in g.iterate()), False),
+        ("compact_snapshot", lambda: CompactGrid.from_letter_grid(filled_grid(size, rng)),
+         lambda g: g.restore(g.snapshot()), False),
+    ]
+
+
+def chain_operations(length):
+    """Operations on a chain as long as the alphabet
+
+    :return: list of (name, setup, func, mutates)
+    """
+    def chain():
+        return LetterChain([Letter(l) for l in letters.ALPHABET[:length]])
+
+    def add_all(l):
+        c = LetterChain([])
+        for letter in l:
+            c.add(letter)
+    return [
+        ("chain_add", lambda: [Letter(l) for l in letters.ALPHABET[:length]], add_all, True),
+        ("chain_is_valid", chain, lambda c: c.is_valid(), False),
+        ("chain_remove", chain, lambda c: c.remove(c.chain[0]), True),
+    ]
+
+
+def run_operations(sweep, value, x, operations, rows, **params):
+    for name, setup, func, mutates in operations:
+        seconds, peak, blocks = measure(setup, func, mutates)
+        row = {"sweep": sweep, "operation": name, "x": x, "seconds": seconds,
+               "peak_bytes": peak, "retained_blocks": blocks, "value": value}
+        row.update(params)
+        rows.append(row)
+        print("{0:<9} {1:<30} {2:>7} {3:>12.1f} us".format(sweep, name, value, seconds * 1e6))
+
+
+def sweep_values(start, stop):
+    values, value = [], start
+    while value < stop:
+        values.append(value)
+        value *= 2
+    return values + [stop]
+
+
+def run(max_size, max_alphabet, max_level, rng):
+    """Run the three sweeps
+
+    :return: list of dict rows
+    """
+    rows = []
+    for size in sweep_values(5, max_size):
+        run_operations("size", size, size * size,
+                       grid_operations(size, DEFAULT_LEVEL, rng), rows,
+                       size=size, alphabet=DEFAULT_ALPHABET, level=DEFAULT_LEVEL)
+    for length in sweep_values(4, max_alphabet):
+        with alphabet(length):
+            operations = chain_operations(length)
+            operations += [op for op in grid_operations(DEFAULT_SIZE, DEFAULT_LEVEL, rng)
+                           if op[0] == "find_consecutive_combinations"]
+            run_operations("alphabet", length, length, operations, rows,
+                           size=DEFAULT_SIZE, alphabet=length, level=DEFAULT_LEVEL)
+    for level in sweep_values(1, max_level):
+        operations = [op for op in grid_operations(DEFAULT_SIZE, level, rng)
+                      if op[0] in ("place_randomly", "cycle_end")]
+        run_operations("level", level, spawn_count(level), operations, rows,
+                       size=DEFAULT_SIZE, alphabet=DEFAULT_ALPHABET, level=level)
+    return rows
+
+
+def fit_exponent(points):
+    """Least squares slope of log(seconds) over log(x)
+
+    :param points: list of (x, seconds)
+    :return: float exponent or None if there are too few distinct points
+    """
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(set(x for x, _ in points)) < 2:
+        return None
+    n = float(len(points))
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    return cov / var
+
+
+def check(rows, tolerance=TOLERANCE):
+    """Fit the growth of every operation of every sweep and compare it to the
+    expected one
+
+    :return: list of (sweep, operation, exponent, expected, flagged)
+    """
+    series = {}
+    for row in rows:
+        series.setdefault((row["sweep"], row["operation"]), []).append(
+            (row["x"], row["seconds"]))
+    results = []
+    for key in sorted(series):
+        exponent = fit_exponent(series[key])
+        expected = EXPECTED.get(key)
+        flagged = None not in (exponent, expected) and exponent > expected + tolerance
+        results.append(key + (exponent, expected, flagged))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--max-size", type=int, default=512)
+    parser.add_argument("--max-alphabet", type=int, default=1024)
+    parser.add_argument("--max-level", type=int, default=64)
+    parser.add_argument("--csv", default="scaling.csv", help="output file (default: scaling.csv)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed excess of the fitted exponent (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if tracemalloc is None:
+        print("tracemalloc isn't available, memory columns are left empty")
+    rows = run(args.max_size, args.max_alphabet, args.max_level, random.Random(args.seed))
+    fields = ["sweep", "operation", "value", "x", "size", "alphabet", "level",
+              "seconds", "peak_bytes", "retained_blocks"]
+    with open(args.csv, "w") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote {0} rows to {1}".format(len(rows), args.csv))
+
+    flagged = False
+    for sweep, operation, exponent, expected, flag in check(rows, args.tolerance):
+        if exponent is None:
+            continue
+        print("{0:<9} {1:<30} O(n^{2:.2f}) expected O(n^{3}){4}".format(
+            sweep, operation, exponent, expected if expected is not None else "?",
+            "  <-- FLAG" if flag else ""))
+        flagged = flagged or flag
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
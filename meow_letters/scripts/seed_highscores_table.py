@@ -1,27 +1,127 @@
-from random import randint
+"""Seed the highscores table with realistic volumes and benchmark the queries
+the game runs against it.
+
+Usage::
+
+    python meow_letters/scripts/seed_highscores_table.py [--rows 20] [--users 4]
+        [--distribution exponential] [--mean 300] --db seeded.db
+        [--no-bench] [--seed 1]
+
+Rows are generated lazily and written with one executemany in a single
+transaction, so memory use doesn't depend on --rows. The insert benchmark
+writes to a temporary copy of the database, --db only keeps the seeded rows.
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from bisect import bisect_left
+from timeit import default_timer
 
 from meow_letters.storage.meowdb import MeowDatabase
 
+try:
+    xrange
+except NameError:
+    xrange = range
+
+
+DISTRIBUTIONS = ("uniform", "exponential", "normal")
+
+
+def generate_highscores(rows, users, distribution="exponential", mean=300, rng=random):
+    """Generate (username, highscore) entries. A few users play a lot (Zipf-like
+    activity) and scores are multiples of 5, like the game awards them.
+
+    :param rows: int number of entries
+    :param users: int number of distinct users
+    :param distribution: string score distribution - uniform, exponential, normal
+    :param mean: int mean score
+    :param rng: random.Random-like object
+    :return: generator of (username, highscore)
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError("Unknown distribution - {0}".format(distribution))
+    weights = [1. / (i + 1) for i in range(users)]
+    total = sum(weights)
+    cumulative, acc = [], 0.
+    for w in weights:
+        acc += w / total
+        cumulative.append(acc)
+
+    for _ in xrange(rows):
+        # rounding can leave the last cumulative weight just under 1
+        user = min(bisect_left(cumulative, rng.random()), users - 1)
+        if distribution == "uniform":
+            score = rng.uniform(0, 2 * mean)
+        elif distribution == "exponential":
+            score = rng.expovariate(1. / mean)
+        else:
+            score = rng.gauss(mean, mean / 3.)
+        yield "user{0}".format(user), max(0, int(score) // 5 * 5)
+
+
+def bench(name, func, repeat):
+    """Time a callable and print the mean duration
+
+    :param name: string label
+    :param func: callable without arguments
+    :param repeat: int number of calls
+    """
+    start = default_timer()
+    for _ in range(repeat):
+        func()
+    elapsed = (default_timer() - start) / repeat
+    print("{0:<28} {1:>10.3f} ms".format(name, elapsed * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="exponential")
+    parser.add_argument("--mean", type=int, default=300)
+    parser.add_argument("--db", required=True,
+                        help="database file, use a scratch file rather than the game's")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-bench", dest="bench", action="store_false")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    database = MeowDatabase(args.db)
+    start = time.time()
+    database.insert_highscores(generate_highscores(args.rows, args.users,
+                                                   args.distribution, args.mean, rng))
+    print("Inserted {0} rows in {1:.2f} s, {2} rows in total".format(
+        args.rows, time.time() - start, database.count()))
+
+    if args.bench:
+        total = database.count()
+        bench("get_top_highscores", database.get_top_highscores, 100)
+        bench("rank_of", lambda: database.rank_of(rng.randint(0, 4 * args.mean)), 100)
+        bench("page (deep offset)",
+              lambda: database.page(rng.randint(0, max(total - 10, 0)), 10), 100)
+        bench("user_best", lambda: database.user_best(
+            "user{0}".format(rng.randint(0, args.users - 1))), 100)
+    database.close()
+
+    if args.bench:
+        # closing the last connection checkpoints the WAL, the copy is complete
+        scratch = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(scratch, os.path.basename(args.db))
+            shutil.copy(args.db, filename)
+            copy = MeowDatabase(filename)
+            bench("insert_highscore", lambda: copy.insert_highscore(
+                "bench", rng.randint(0, 4 * args.mean)), 20)
+            copy.close()
+        finally:
+            shutil.rmtree(scratch)
+    return 0
+
 
-database = MeowDatabase()
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("FooBar", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("FooBar", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("FooBar", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.insert_highscore("Foo", randint(1, 10000))
-database.insert_highscore("FooBar", randint(1, 10000))
-database.insert_highscore("Bar", randint(1, 10000))
-database.db.close()
+if __name__ == '__main__':
+    sys.exit(main())
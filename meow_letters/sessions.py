@@ -0,0 +1,424 @@
+"""Many independent games in one process, for the hosted version (see
+meow_letters.host). Each session has its own board, score, level and seeded
+GameRecord, so it never touches the global random generator, and finished
+games can be checked with meow_letters.replay.
+
+Round deadlines and idle timeouts of all the sessions live in a single
+TimerWheel, advanced by the host, instead of one timer per game. Sessions
+without a move for idle_seconds are paused and packed into the bytes of a
+CompactGrid; the next move unpacks them and resumes their round. Finished
+games are kept finished_seconds for their players to read the result, then
+removed.
+"""
+import sys
+import random
+from operator import itemgetter
+from timeit import default_timer
+
+from constants.misc import GRID_SIZE, ROUND_SECONDS
+from letters import CompactGrid
+from level import Level
+from replay import GameRecord
+from score import Score
+
+try:
+    xrange
+except NameError:
+    xrange = range
+
+
+TICK = .05
+SLOTS = 512
+IDLE_SECONDS = 30
+FINISHED_SECONDS = 60
+PENALTY_SECONDS = 1
+
+ROUND = 'round'
+IDLE = 'idle'
+FINISHED = 'finished'
+
+SELECTED = 'selected'
+UNSELECTED = 'unselected'
+INVALID = 'invalid'
+COMPLETE = 'complete'
+
+
+class TimerWheel(object):
+    """Hashed timing wheel holding at most one deadline per key. Deadlines are
+    dropped in the slot of their tick, so scheduling is constant time and
+    advancing only looks at the slots of the ticks that passed. Rescheduled
+    and cancelled entries are left in their slot and skipped when reached.
+    """
+    def __init__(self, tick=TICK, slots=SLOTS, now=0.):
+        """TimerWheel class initializer
+
+        :param tick: float resolution in seconds
+        :param slots: int number of slots, a turn of the wheel being
+                      tick * slots seconds
+        :param now: float current time in seconds
+        """
+        if tick <= 0 or slots < 1:
+            raise ValueError("A timer wheel needs a positive tick and at least one "
+                             "slot, got <{0}> and <{1}>".format(tick, slots))
+        self.tick = tick
+        self.slots = [[] for _ in xrange(slots)]
+        self.deadlines = {}
+        self.current = int(now // tick)
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def schedule(self, key, deadline):
+        """Set the deadline of a key, replacing its previous one
+
+        :param key: hashable key
+        :param deadline: float time in seconds
+        :return: the current instance
+        """
+        self.deadlines[key] = deadline
+        tick = max(int(deadline // self.tick), self.current)
+        self.slots[tick % len(self.slots)].append((deadline, key))
+        return self
+
+    def cancel(self, key):
+        """Remove the deadline of a key, if it has one
+
+        :return: the current instance
+        """
+        self.deadlines.pop(key, None)
+        return self
+
+    def advance(self, now):
+        """Move the wheel to a time and remove the deadlines that passed
+
+        :param now: float current time in seconds
+        :return: list of the expired keys, earliest deadline first
+        """
+        expired = []
+        target = int(now // self.tick)
+        slots = len(self.slots)
+        for tick in xrange(self.current, min(target, self.current + slots - 1) + 1):
+            slot = self.slots[tick % slots]
+            if not slot:
+                continue
+            kept = []
+            for entry in slot:
+                deadline, key = entry
+                if self.deadlines.get(key) != deadline:
+                    continue
+                if deadline <= now:
+                    expired.append(entry)
+                    del self.deadlines[key]
+                else:
+                    kept.append(entry)
+            self.slots[tick % slots] = kept
+        self.current = max(target, self.current)
+        expired.sort(key=itemgetter(0))
+        return [key for deadline, key in expired]
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate memory used by an object and everything it references, each
+    object counted once. Classes, modules, functions and the one character
+    strings the interpreter shares are left out, and so are attribute names.
+
+    :param obj: object to measure
+    :param seen: optional set of ids of objects already counted
+    :return: int bytes
+    """
+    seen = set() if seen is None else seen
+    size, stack = 0, [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (type, type(sys), type(deep_sizeof))):
+            continue
+        if isinstance(o, (str, bytes, type(u''))) and len(o) <= 1:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            attributes = getattr(o, '__dict__', None)
+            if attributes is not None:
+                seen.add(id(attributes))
+                size += sys.getsizeof(attributes)
+                stack.extend(attributes.values())
+            for name in getattr(type(o), '__slots__', ()):
+                stack.append(getattr(o, name, None))
+    return size
+
+
+class GameSession(object):
+    """One hosted game, with the rules of tui.TerminalGame. Its timing is left
+    to the SessionManager.
+    """
+    def __init__(self, session_id, seed, size=GRID_SIZE):
+        """GameSession class initializer
+
+        :param session_id: int session identifier
+        :param seed: int seed of the game
+        :param size: int grid size
+        """
+        self.id = session_id
+        self.record = GameRecord(seed=seed, size=size)
+        self.letter_grid = self.record.letter_grid()
+        self.score = Score()
+        self.level = Level()
+        self.over = False
+        self.deadline = None
+        self.remaining = None
+        self.packed = None
+
+    def toggle(self, x, y):
+        """Select or unselect the letter of a cell
+
+        :param x: int column
+        :param y: int row
+        :return: string event, SELECTED, UNSELECTED, INVALID if the chain was
+                 broken and cleared, or COMPLETE if the round can end
+        """
+        if self.over:
+            raise ValueError("The game is over")
+        if self.packed is not None:
+            raise ValueError("The session is packed")
+        size = self.letter_grid.size
+        if not (0 <= x < size and 0 <= y < size):
+            raise ValueError("Cell out of the grid <{0}, {1}>".format(x, y))
+        letter = self.letter_grid[x][y]
+        if letter is None:
+            raise ValueError("Empty cell <{0}, {1}>".format(x, y))
+        self.record.toggle(x, y)
+        if letter.is_selected():
+            self.letter_grid.chain.remove(letter)
+            return UNSELECTED
+        self.letter_grid.chain.add(letter)
+        if not self.letter_grid.chain.is_valid():
+            self.letter_grid.chain.clear()
+            return INVALID
+        if self.letter_grid.is_complete_chain():
+            return COMPLETE
+        return SELECTED
+
+    def end_round(self):
+        """Score the chain and spawn the letters of the next round, like
+        replay.replay() does
+
+        :return: True if the game is over, False otherwise
+        """
+        self.score.update(self.letter_grid.chain.length)
+        self.level.set_level(self.score.points)
+        self.record.end_round()
+        self.letter_grid.rng = self.record.round_rng(len(self.record.rounds))
+        self.letter_grid.cycle_end(self.level.level)
+        if self.letter_grid.end:
+            self.over = True
+            self.record.finish(self.score.points, self.level.level)
+        return self.over
+
+    def pack(self):
+        """Replace the board by its compact snapshot
+
+        :return: the current instance
+        """
+        if self.packed is None:
+            self.packed = CompactGrid.from_letter_grid(self.letter_grid).snapshot()
+            self.letter_grid = None
+        return self
+
+    def unpack(self):
+        """Rebuild the board from its compact snapshot
+
+        :return: the current instance
+        """
+        if self.packed is not None:
+            compact = CompactGrid(self.record.size).restore(self.packed)
+            self.letter_grid = compact.to_letter_grid()
+            self.letter_grid.end = self.over
+            self.packed = None
+        return self
+
+    def board(self):
+        """The board as text, column after column, '.' for empty cells
+
+        :return: tuple (string board, list of selected cells)
+        """
+        if self.packed is not None:
+            compact = CompactGrid(self.record.size).restore(self.packed)
+        else:
+            compact = CompactGrid.from_letter_grid(self.letter_grid)
+        cells = [compact.get(x, y) or '.' for x in xrange(compact.size)
+                 for y in xrange(compact.size)]
+        selected = [x * compact.size + y for x, y, _ in compact.iterate()
+                    if compact.is_selected(x, y)]
+        return ''.join(cells), selected
+
+
+class SessionManager(object):
+    """Creates, times, packs and removes the sessions of a host
+    """
+    def __init__(self, size=GRID_SIZE, round_seconds=ROUND_SECONDS,
+                 idle_seconds=IDLE_SECONDS, finished_seconds=FINISHED_SECONDS,
+                 tick=TICK, clock=default_timer, seed=None):
+        """SessionManager class initializer
+
+        :param size: int grid size of the games
+        :param round_seconds: float length of a round
+        :param idle_seconds: float time without a move before a session is packed
+        :param finished_seconds: float time a finished game is kept
+        :param tick: float resolution of the timer wheel
+        :param clock: callable returning the current time in seconds
+        :param seed: optional int seed of the game seeds
+        """
+        self.size = size
+        self.round_seconds = round_seconds
+        self.idle_seconds = idle_seconds
+        self.finished_seconds = finished_seconds
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.wheel = TimerWheel(tick, now=clock())
+        self.sessions = {}
+        self.next_id = 1
+        self.rounds = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def create(self):
+        """Start a new game
+
+        :return: GameSession object
+        """
+        now = self.clock()
+        session = GameSession(self.next_id, self.rng.getrandbits(32), self.size)
+        self.next_id += 1
+        self.sessions[session.id] = session
+        self._start_round(session, now)
+        self._touch(session, now)
+        return session
+
+    def get(self, session_id):
+        """Get a session by its identifier
+
+        :return: GameSession object
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError("Unknown session <{0}>".format(session_id))
+        return session
+
+    def remove(self, session_id):
+        """Forget a session and its timers
+
+        :return: the removed GameSession object
+        """
+        session = self.get(session_id)
+        del self.sessions[session_id]
+        self.wheel.cancel((session_id, ROUND)).cancel((session_id, IDLE))
+        self.wheel.cancel((session_id, FINISHED))
+        return session
+
+    def toggle(self, session_id, x, y):
+        """Play a move, resuming the session first if it was packed
+
+        :return: string event of GameSession.toggle()
+        """
+        now = self.clock()
+        session = self.get(session_id)
+        if session.packed is not None and not session.over:
+            session.unpack()
+            self._start_round(session, now, session.remaining)
+        event = session.toggle(x, y)
+        if event == INVALID:
+            session.deadline -= PENALTY_SECONDS
+            self.wheel.schedule((session.id, ROUND), session.deadline)
+        elif event == COMPLETE:
+            self._end_round(session, now)
+        self._touch(session, now)
+        return event
+
+    def remaining(self, session):
+        """Time left in the round of a session
+
+        :param session: GameSession object
+        :return: float seconds, None if the game is over
+        """
+        if session.over:
+            return None
+        if session.deadline is None:
+            return session.remaining
+        return max(session.deadline - self.clock(), 0)
+
+    def advance(self, now=None):
+        """End the rounds whose deadline passed, pack the idle sessions and
+        remove the games finished for finished_seconds
+
+        :param now: optional float time, defaults to the clock
+        :return: int number of rounds ended
+        """
+        now = self.clock() if now is None else now
+        ended = 0
+        for session_id, kind in self.wheel.advance(now):
+            session = self.sessions[session_id]
+            if kind == ROUND:
+                # packed by an idle timeout expiring in the same batch
+                if session.deadline is None:
+                    continue
+                self._end_round(session, now)
+                ended += 1
+            elif kind == FINISHED:
+                self.remove(session_id)
+            else:
+                self._pack(session, now)
+        return ended
+
+    def memory(self):
+        """Memory used by each session
+
+        :return: dict of session id to int bytes
+        """
+        return dict((session_id, deep_sizeof(session))
+                    for session_id, session in self.sessions.items())
+
+    def stats(self):
+        """Summary of the host state
+
+        :return: dict
+        """
+        memory = self.memory()
+        packed = [s for s in self.sessions.values() if s.packed is not None]
+        packed_bytes = sum(memory[s.id] for s in packed)
+        return {"sessions": len(self.sessions),
+                "packed": len(packed),
+                "over": sum(1 for s in self.sessions.values() if s.over),
+                "timers": len(self.wheel),
+                "rounds": self.rounds,
+                "bytes": sum(memory.values()),
+                "packed_bytes": packed_bytes}
+
+    def _start_round(self, session, now, seconds=None):
+        session.deadline = now + (self.round_seconds if seconds is None else seconds)
+        session.remaining = None
+        self.wheel.schedule((session.id, ROUND), session.deadline)
+
+    def _end_round(self, session, now):
+        self.rounds += 1
+        if session.end_round():
+            session.deadline = None
+            self.wheel.cancel((session.id, ROUND)).cancel((session.id, IDLE))
+            self.wheel.schedule((session.id, FINISHED), now + self.finished_seconds)
+        else:
+            self._start_round(session, now)
+
+    def _touch(self, session, now):
+        self.wheel.schedule((session.id, IDLE), now + self.idle_seconds)
+
+    def _pack(self, session, now):
+        if not session.over:
+            session.remaining = max(session.deadline - now, 0)
+            session.deadline = None
+            self.wheel.cancel((session.id, ROUND))
+        session.pack()
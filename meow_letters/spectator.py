@@ -0,0 +1,194 @@
+"""Spectator relay for tournaments. The game connects as the publisher and
+streams delta encoded events (see meow_letters.broadcast); every spectator
+gets a snapshot of the current board on connection, then the same events.
+
+Each spectator has its own bounded queue. When a spectator reads slower than
+the game plays, its queue is replaced by a single fresh snapshot instead of
+growing, so slow viewers never hold back the publisher or the other viewers.
+The relay needs Python 3 (asyncio); the game side runs on Python 2 too.
+
+Usage::
+
+    python -m meow_letters.spectator [--host 127.0.0.1] [--port 8766]
+    python -m meow_letters.spectator --watch [--host 127.0.0.1] [--port 8766]
+
+and start the game with MEOW_SPECTATE=127.0.0.1:8766.
+"""
+import sys
+import struct
+import asyncio
+import argparse
+
+from meow_letters.broadcast import (LENGTH, PUBLISHER, SPECTATOR, SpectatorView,
+                                    frame)
+from meow_letters.constants.alphabets import ENGLISH_ALPHABET as ALPHABET
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+MAX_PENDING = 64
+
+
+class Spectator(object):
+    """Queue of the messages waiting to be sent to one spectator
+    """
+    def __init__(self, max_pending):
+        self.queue = asyncio.Queue(max_pending)
+        self.resyncs = 0
+
+
+class SpectatorServer(object):
+    """Asyncio relay from one publishing game to many spectators
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_pending=MAX_PENDING):
+        """SpectatorServer class initializer
+
+        :param host: string interface to listen on
+        :param port: int port, 0 to pick a free one
+        :param max_pending: int maximum number of messages queued per spectator
+        """
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.view = SpectatorView()
+        self.spectators = set()
+        self.published = 0
+        self.server = None
+
+    async def start(self):
+        """Start listening
+
+        :return: the current instance
+        """
+        self.server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                 backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def broadcast(self, body):
+        """Apply a message to the relay's board and queue it for every spectator
+
+        :param body: bytes message body
+        """
+        self.view.apply(body)
+        self.published += 1
+        message = frame(body)
+        for spectator in self.spectators:
+            try:
+                spectator.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._resync(spectator)
+
+    def _resync(self, spectator):
+        while not spectator.queue.empty():
+            spectator.queue.get_nowait()
+        spectator.queue.put_nowait(frame(self.view.snapshot()))
+        spectator.resyncs += 1
+
+    async def _publish(self, reader):
+        while True:
+            length = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+            body = await reader.readexactly(length)
+            try:
+                self.broadcast(body)
+            except (ValueError, IndexError, struct.error):
+                # a truncated message, or a delta for a board the relay
+                # doesn't have: wait for the snapshot the game sends after a
+                # reconnection
+                pass
+
+    async def _spectate(self, reader, writer):
+        spectator = Spectator(self.max_pending)
+        if self.view.size:
+            spectator.queue.put_nowait(frame(self.view.snapshot()))
+        self.spectators.add(spectator)
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            while True:
+                get = asyncio.ensure_future(spectator.queue.get())
+                done, _ = await asyncio.wait([get, closed],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    get.cancel()
+                    break
+                writer.write(get.result())
+                await writer.drain()
+        finally:
+            self.spectators.discard(spectator)
+            closed.cancel()
+
+    async def _handle(self, reader, writer):
+        try:
+            role = await reader.readline()
+            if role == PUBLISHER:
+                await self._publish(reader)
+            elif role == SPECTATOR:
+                await self._spectate(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def format_board(view):
+    """Text rendering of a spectator view, top row first
+
+    :param view: SpectatorView object
+    :return: string
+    """
+    lines = ["Score {0}   Level {1}".format(view.score, view.level)]
+    for y in reversed(range(view.size)):
+        row = []
+        for x in range(view.size):
+            value = view.cells[x * view.size + y]
+            letter = ALPHABET[value] if value < len(ALPHABET) else "."
+            row.append("[{0}]".format(letter) if view.is_selected(x, y)
+                       else " {0} ".format(letter))
+        lines.append("".join(row))
+    return "\n".join(lines)
+
+
+async def watch(host, port):
+    """Print the board on every event of the relay
+
+    :param host: string relay host
+    :param port: int relay port
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(SPECTATOR)
+    view = SpectatorView()
+    while True:
+        data = await reader.read(4096)
+        if not data:
+            break
+        if view.feed(data):
+            print(format_board(view) + "\n")
+    writer.close()
+
+
+async def serve(args):
+    server = await SpectatorServer(args.host, args.port).start()
+    print("Spectator relay listening on {0}:{1}".format(server.host, server.port))
+    await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meow Letters spectator relay")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--watch", action="store_true",
+                        help="connect as a spectator and print the board")
+    args = parser.parse_args()
+    if args.watch:
+        asyncio.run(watch(args.host, args.port))
+    else:
+        asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
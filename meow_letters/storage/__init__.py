@@ -1 +1,91 @@
-__author__ = 'ana'
+import os
+import threading
+
+
+_store = None
+_highscores = None
+_lock = threading.RLock()
+
+
+def game_store():
+    """Open the local game database, once per process: settings, the saved
+    game and the local highscores, all in meowletters.db. The settings and the
+    saved game of the former json files are imported the first time.
+
+    :return: MeowDatabase object
+    """
+    global _store
+    with _lock:
+        if _store is None:
+            from storage.meowdb import MeowDatabase
+            from meow_letters import PROJECT_PATH
+            _store = MeowDatabase()
+            _store.import_json(os.path.join(PROJECT_PATH, 'data/settings.json'),
+                               os.path.join(PROJECT_PATH, 'data/state.json'))
+        return _store
+
+
+def highscores_database():
+    """Open the highscores backend, once per process. If MEOW_LEADERBOARD is set
+    to 'host:port', scores go to the leaderboard service, otherwise to the local
+    database. The returned object can be used from any thread.
+
+    :return: MeowDatabase or RemoteDatabase object, the local database is
+             the game_store()
+    """
+    global _highscores
+    with _lock:
+        if _highscores is not None:
+            return _highscores
+        address = os.environ.get('MEOW_LEADERBOARD')
+        if address:
+            from storage.meowremote import RemoteDatabase
+            from meow_letters import PROJECT_PATH
+            host, _, port = address.rpartition(':')
+            _highscores = RemoteDatabase(host, int(port), queue_file=os.path.join(
+                PROJECT_PATH, 'data/leaderboard_queue.json'))
+        else:
+            _highscores = game_store()
+        return _highscores
+
+
+def finish_game(points):
+    """Delete the saved game and store the score of the finished game under
+    the configured username. Both happen in one transaction, unless scores go
+    to the leaderboard service.
+
+    :param points: int score
+    """
+    store = game_store()
+    highscores = highscores_database()
+    if highscores is store:
+        store.game_over(store.get_username(), points)
+    else:
+        store.clear_state()
+        highscores.insert_highscore(store.get_username(), points)
+
+
+_analytics = None
+
+
+def analytics_recorder():
+    """Get the per-round analytics recorder, started once per process
+
+    :return: AnalyticsRecorder object
+    """
+    global _analytics
+    with _lock:
+        if _analytics is None:
+            from storage.meowanalytics import AnalyticsStore, AnalyticsRecorder
+            _analytics = AnalyticsRecorder(AnalyticsStore())
+        return _analytics
+
+
+def close_analytics_recorder():
+    """Write the pending analytics records and stop the recorder, if started
+    """
+    global _analytics
+    with _lock:
+        if _analytics is not None:
+            _analytics.close()
+            _analytics = None
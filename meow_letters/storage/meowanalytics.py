@@ -0,0 +1,212 @@
+import os
+import random
+import logging
+import threading
+from timeit import default_timer
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from storage.meowdb import SqliteDatabase, PROJECT_PATH
+
+
+_STOP = object()
+CLOSE_TIMEOUT = 5.
+
+logger = logging.getLogger(__name__)
+
+
+# One row per round, plus aggregates maintained by triggers so the summaries
+# never scan the rounds table.
+ANALYTICS_MIGRATIONS = [
+    ["""CREATE TABLE IF NOT EXISTS rounds (game integer, round integer,
+                                           level integer, chain integer,
+                                           duration_ms integer, penalties integer,
+                                           score integer)""",
+     """CREATE TABLE IF NOT EXISTS round_stats (level integer, chain integer,
+                                                rounds integer not null,
+                                                duration_ms integer not null,
+                                                penalties integer not null,
+                                                primary key (level, chain))""",
+     """CREATE TABLE IF NOT EXISTS games (id integer primary key,
+                                          rounds integer not null,
+                                          max_level integer not null,
+                                          score integer not null)""",
+     """CREATE TRIGGER IF NOT EXISTS rounds_stats_insert AFTER INSERT ON rounds
+        BEGIN
+            INSERT OR IGNORE INTO round_stats VALUES (NEW.level, NEW.chain, 0, 0, 0);
+            UPDATE round_stats SET rounds = rounds + 1,
+                                   duration_ms = duration_ms + NEW.duration_ms,
+                                   penalties = penalties + NEW.penalties
+            WHERE level = NEW.level AND chain = NEW.chain;
+            INSERT OR IGNORE INTO games VALUES (NEW.game, 0, 0, 0);
+            UPDATE games SET rounds = rounds + 1,
+                             max_level = MAX(max_level, NEW.level),
+                             score = MAX(score, NEW.score)
+            WHERE id = NEW.game;
+        END"""],
+]
+
+
+class AnalyticsStore(object):
+    """Per-round game analytics stored in 'analytics.db'
+    """
+    def __init__(self, dbname=None):
+        """Initialize a connection to the analytics database and migrate it
+
+        :param dbname: optional string database filename, i.e. ':memory:'
+        """
+        self.dbname = dbname or os.path.join(PROJECT_PATH, 'analytics.db')
+        self.db = SqliteDatabase(self.dbname, check_same_thread=False)
+        self.db.migrate(ANALYTICS_MIGRATIONS)
+
+    def insert_rounds(self, rounds):
+        """Insert round records in a single transaction
+
+        :param rounds: list of (game, round, level, chain, duration_ms,
+                       penalties, score) tuples
+        :return: the current instance
+        """
+        self.db.executemany("INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?, ?)", rounds)
+        return self
+
+    def chain_lengths(self):
+        """Distribution of chain lengths over all rounds
+
+        :return: list of (chain length, rounds)
+        """
+        self.db.execute("""SELECT chain, SUM(rounds) FROM round_stats
+                           GROUP BY chain ORDER BY chain""")
+        return self.db.fetch('all')
+
+    def levels(self):
+        """Round statistics per level
+
+        :return: list of (level, rounds, mean duration in ms, penalties per round)
+        """
+        self.db.execute("""SELECT level, SUM(rounds),
+                                  SUM(duration_ms) * 1.0 / SUM(rounds),
+                                  SUM(penalties) * 1.0 / SUM(rounds)
+                           FROM round_stats GROUP BY level ORDER BY level""")
+        return self.db.fetch('all')
+
+    def level_progression(self):
+        """Distribution of the highest level reached per game
+
+        :return: list of (level, games)
+        """
+        self.db.execute("""SELECT max_level, COUNT(*) FROM games
+                           GROUP BY max_level ORDER BY max_level""")
+        return self.db.fetch('all')
+
+    def close(self):
+        self.db.close()
+
+
+class AnalyticsRecorder(object):
+    """Collects round records from the game and writes them in batches on a
+    background thread. The pending queue is bounded: if the writer falls behind,
+    new records are dropped and counted instead of growing memory. Batches that
+    fail to be written are logged and counted as dropped too.
+    """
+    def __init__(self, store, batch_size=64, flush_interval=5., max_pending=4096):
+        """AnalyticsRecorder class initializer. Starts the writer thread.
+
+        :param store: AnalyticsStore object, used only from the writer thread
+        :param batch_size: int number of records written per transaction
+        :param flush_interval: float seconds after which a partial batch is written
+        :param max_pending: int maximum number of records waiting to be written
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(max_pending)
+        self.dropped = 0
+        self.game = None
+        self.round = 0
+        self.penalties = 0
+        self.round_start = default_timer()
+        self._thread = threading.Thread(target=self._write)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def start_game(self):
+        """Start recording a new game
+
+        :return: int game id
+        """
+        self.game = random.getrandbits(62)
+        self.round = 0
+        self.start_round()
+        return self.game
+
+    def start_round(self):
+        self.penalties = 0
+        self.round_start = default_timer()
+
+    def penalty(self):
+        """Record a timer penalty in the current round
+        """
+        self.penalties += 1
+
+    def end_round(self, chain, level, score):
+        """Queue the record of the current round and start the next one
+
+        :param chain: int length of the chain played in the round
+        :param level: int level after the round
+        :param score: int score after the round
+        """
+        if self.game is None:
+            self.start_game()
+        duration_ms = int((default_timer() - self.round_start) * 1000)
+        record = (self.game, self.round, level, chain, duration_ms, self.penalties, score)
+        try:
+            self.pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        self.round += 1
+        self.start_round()
+
+    def _write(self):
+        batch = []
+        deadline = default_timer() + self.flush_interval
+        while True:
+            try:
+                record = self.pending.get(timeout=max(deadline - default_timer(), 0))
+            except queue.Empty:
+                record = None
+            stop = record is _STOP
+            if record is not None and not stop:
+                batch.append(record)
+            if batch and (stop or len(batch) >= self.batch_size
+                          or default_timer() >= deadline):
+                try:
+                    self.store.insert_rounds(batch)
+                except Exception:
+                    logger.exception("Failed to write {0} analytics records".format(len(batch)))
+                    self.dropped += len(batch)
+                batch = []
+            if not batch:
+                deadline = default_timer() + self.flush_interval
+            if stop:
+                break
+        try:
+            self.store.close()
+        except Exception:
+            logger.exception("Failed to close the analytics store")
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Write the pending records, stop the writer thread and close the store
+
+        :param timeout: float seconds to wait for the writer
+        :return: True if the writer stopped, False if it's still busy
+        """
+        try:
+            self.pending.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Analytics writer is stuck, {0} records not written".format(
+                self.pending.qsize()))
+            return False
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
@@ -1,20 +1,136 @@
 import os
+import json
+import time
 import sqlite3
+import threading
+from contextlib import contextmanager
 
 
 PROJECT_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..")
 
+# sqlite's default page cache (2 MB) is kept: every pooled connection has its
+# own, and the highscore queries read a few index pages
+PRAGMAS = (("journal_mode", "WAL"),
+           ("synchronous", "NORMAL"))
+STATEMENT_CACHE_SIZE = 64
+MAX_READERS = 4
+FETCH_SIZE = 1000
+
+# Schema migrations, one list of statements per version. The version of a
+# database is kept in its user_version pragma. Never edit an applied migration,
+# append a new one instead.
+#
+# 1. the highscores table, as created by the former one-off script
+# 2. every score is kept. highscore_counts holds the number of hits per
+#    distinct score and is maintained by triggers, so ranking a score reads the
+#    (small) set of distinct scores instead of scanning the history.
+# 3. the settings and the saved game, formerly data/settings.json and
+#    data/state.json. saved_game holds at most one row.
+# 4. the time each score was saved, in seconds since the epoch. Scores saved
+#    before have none.
+HIGHSCORES_MIGRATIONS = [
+    ["""CREATE TABLE IF NOT EXISTS highscores (id integer primary key autoincrement,
+                                               username text, highscore integer)"""],
+    ["CREATE INDEX IF NOT EXISTS highscores_rank ON highscores (highscore DESC, id)",
+     "CREATE INDEX IF NOT EXISTS highscores_user ON highscores (username, highscore DESC)",
+     """CREATE TABLE IF NOT EXISTS highscore_counts (highscore integer primary key,
+                                                     hits integer not null)""",
+     """CREATE TRIGGER IF NOT EXISTS highscores_count_insert AFTER INSERT ON highscores
+        BEGIN
+            INSERT OR IGNORE INTO highscore_counts VALUES (NEW.highscore, 0);
+            UPDATE highscore_counts SET hits = hits + 1 WHERE highscore = NEW.highscore;
+        END""",
+     """CREATE TRIGGER IF NOT EXISTS highscores_count_delete AFTER DELETE ON highscores
+        BEGIN
+            UPDATE highscore_counts SET hits = hits - 1 WHERE highscore = OLD.highscore;
+            DELETE FROM highscore_counts WHERE highscore = OLD.highscore AND hits = 0;
+        END""",
+     """INSERT OR IGNORE INTO highscore_counts
+        SELECT highscore, COUNT(*) FROM highscores GROUP BY highscore"""],
+    ["CREATE TABLE IF NOT EXISTS settings (name text primary key, value text not null)",
+     """CREATE TABLE IF NOT EXISTS saved_game (id integer primary key check (id = 0),
+                                               level integer not null, score integer not null,
+                                               timer real not null, grid text not null)"""],
+    ["ALTER TABLE highscores ADD COLUMN created integer"],
+]
+
+SAVE_STATE = "INSERT OR REPLACE INTO saved_game VALUES (0, ?, ?, ?, ?)"
+INSERT_HIGHSCORE = "INSERT INTO highscores (username, highscore, created) VALUES (?, ?, ?)"
+DEFAULT_USERNAME = "ana"
+
 
 class SqliteDatabase(object):
-    """Wrapper class for working with sqlite databases
+    """Wrapper class for working with sqlite databases. Queries are committed
+    right away unless they run inside a transaction() block.
     """
-    def __init__(self, dbname):
-        """Initializes a connection to the database and creates a cursor to it
+    def __init__(self, dbname, pragmas=PRAGMAS, check_same_thread=True):
+        """Initializes a connection to the database and creates a cursor to it.
+        The connection keeps a bounded cache of prepared statements.
 
         :param dbname: string name of database
+        :param pragmas: iterable of (name, value) pragmas to apply
+        :param check_same_thread: False to allow using the connection from other
+                                  threads than the one which created it
         """
-        self.conn = sqlite3.connect(dbname)
+        self.conn = sqlite3.connect(dbname, isolation_level=None,
+                                    cached_statements=STATEMENT_CACHE_SIZE,
+                                    check_same_thread=check_same_thread)
         self.cursor = self.conn.cursor()
+        self._depth = 0
+        for name, value in pragmas:
+            self.cursor.execute("PRAGMA {0}={1}".format(name, value))
+
+    @contextmanager
+    def transaction(self):
+        """Group queries in a single transaction, committed when the block exits
+        and rolled back if it raises. Nested blocks use savepoints.
+
+        Usage::
+
+            with db.transaction():
+                db.execute(...)
+                db.execute(...)
+        """
+        savepoint = "sp{0}".format(self._depth)
+        self.cursor.execute("SAVEPOINT {0}".format(savepoint) if self._depth else "BEGIN")
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth:
+                self.cursor.execute("ROLLBACK TO {0}".format(savepoint))
+                self.cursor.execute("RELEASE {0}".format(savepoint))
+            else:
+                self.cursor.execute("ROLLBACK")
+            raise
+        self._depth -= 1
+        self.cursor.execute("RELEASE {0}".format(savepoint) if self._depth else "COMMIT")
+
+    @property
+    def version(self):
+        """Schema version of the database
+
+        :return: int version, 0 for a database without migrations
+        """
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self, migrations):
+        """Apply the migrations newer than the schema version, each one in its
+        own transaction together with the version bump
+
+        :param migrations: list of lists of queries, the n-th list migrates to
+                           version n
+        :return: int schema version after migrating
+        """
+        for version, queries in enumerate(migrations, 1):
+            if version <= self.version:
+                continue
+            with self.transaction():
+                for query in queries:
+                    self.cursor.execute(query)
+                self.cursor.execute("PRAGMA user_version={0}".format(version))
+        return self.version
 
     def execute(self, query, params=()):
         """Execute a query
@@ -23,21 +139,22 @@ class SqliteDatabase(object):
         :param params: tuple of parameters
         """
         self.cursor.execute(query, params)
-        self.conn.commit()
 
     def executemany(self, query, values):
-        """Execute many query simultaneously
+        """Execute many query simultaneously, in a single transaction
 
         :param query: string sqlite valid query
         :param values: list of values to fill in the query
         """
-        self.cursor.executemany(query, values)
-        self.conn.commit()
+        with self.transaction():
+            self.cursor.executemany(query, values)
 
-    def fetch(self, type='all'):
-        """Commit transactions
+    def fetch(self, type='all', size=None):
+        """Fetch the results of the last query
 
         :param type: string type of fetch - one, all, many
+        :param size: int number of rows fetched by 'many', defaults to the
+                     cursor arraysize
         :return: fetched data
         """
         if type == 'all':
@@ -45,36 +162,273 @@ class SqliteDatabase(object):
         elif type ==  'one':
             return self.cursor.fetchone()
         elif type == 'many':
-            return self.cursor.fetchmany()
+            return self.cursor.fetchmany(size or self.cursor.arraysize)
         else:
             raise ValueError("Unknown type of fetch - {}".format(type))
 
+    def stream(self, query, params=(), size=FETCH_SIZE):
+        """Execute a query and yield its rows, fetched size rows at a time, so
+        the whole result set is never held in memory. The query runs on a
+        cursor of its own, other queries can run while the rows are consumed.
+
+        :param query: string sqlite valid query
+        :param params: tuple of parameters
+        :param size: int number of rows per fetch
+        :return: generator of rows
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
     def close(self):
         """Close the connection
         """
         self.conn.close()
 
 
+class ConnectionPool(object):
+    """Connections to one sqlite database for use from several threads: a
+    single writer connection, used by one thread at a time, and reader
+    connections borrowed for each read. With WAL, readers don't wait for the
+    writer.
+    """
+    def __init__(self, dbname, pragmas=PRAGMAS, max_readers=MAX_READERS):
+        """ConnectionPool class initializer. Opens the writer connection, reader
+        connections are opened when no idle one is left.
+
+        :param dbname: string name of database. An in-memory database can't be
+                       shared between connections, so all threads use the
+                       writer connection for it.
+        :param pragmas: iterable of (name, value) pragmas to apply
+        :param max_readers: int number of idle reader connections kept open,
+                            readers returned beyond it are closed
+        """
+        self.dbname = dbname
+        self.pragmas = pragmas
+        self.max_readers = max_readers
+        self.shared = dbname == ':memory:'
+        self._writer = SqliteDatabase(dbname, pragmas, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._idle = []
+        self._readers = []
+
+    @contextmanager
+    def writer(self):
+        """Borrow the writer connection. Writes from all threads are serialized.
+
+        Usage::
+
+            with pool.writer() as db:
+                db.execute(...)
+        """
+        with self._lock:
+            yield self._writer
+
+    @contextmanager
+    def reader(self):
+        """Borrow a reader connection, opening one if none is idle
+        """
+        if self.shared:
+            with self._lock:
+                yield self._writer
+            return
+        with self._lock:
+            db = self._idle.pop() if self._idle else None
+        if db is None:
+            db = SqliteDatabase(self.dbname, self.pragmas, check_same_thread=False)
+            with self._lock:
+                self._readers.append(db)
+        try:
+            yield db
+        finally:
+            with self._lock:
+                if db not in self._readers:
+                    # the pool was closed meanwhile
+                    db.close()
+                elif len(self._idle) < self.max_readers:
+                    self._idle.append(db)
+                else:
+                    self._readers.remove(db)
+                    db.close()
+
+    def close(self):
+        """Close every connection of the pool
+        """
+        with self._lock:
+            for db in self._idle:
+                db.close()
+            self._idle = []
+            self._readers = []
+            self._writer.close()
+
+
 class MeowDatabase(object):
-    """Meow Letters game database
+    """Meow Letters game database: settings, the saved game and highscores.
+    Safe to use from several threads.
+
+    Settings and the saved game are read once when the database is opened and
+    kept in memory; writes go through to the database.
     """
-    def __init__(self):
-        """Initialize a connection to 'meowletters.db'
+    def __init__(self, dbname=None):
+        """Initialize a connection pool to 'meowletters.db', migrate its schema
+        to the latest version and load the settings and the saved game
+
+        :param dbname: optional string database filename, i.e. ':memory:'
+        """
+        self.dbname = dbname or os.path.join(PROJECT_PATH, 'meowletters.db')
+        self.pool = ConnectionPool(self.dbname)
+        self.settings = {}
+        self.state = None
+        with self.pool.writer() as db:
+            db.migrate(HIGHSCORES_MIGRATIONS)
+            self.load(db)
+
+    @property
+    def db(self):
+        """The writer connection, for maintenance scripts
+
+        :return: SqliteDatabase object
         """
-        self.dbname = os.path.join(PROJECT_PATH, 'meowletters.db')
-        self.db = SqliteDatabase(self.dbname)
+        return self.pool._writer
 
-    def _sanitize_highscores(self):
-        """Sanitize the highscores table by deleting entries with lower score than
-        the last entry from the top ten hits
+    def close(self):
+        """Close every connection to the database
+        """
+        self.pool.close()
 
+    def load(self, db):
+        """Read the settings and the saved game in a single transaction
+
+        :param db: SqliteDatabase object
         :return: the current instance
         """
-        query = "SELECT highscore FROM highscores ORDER BY highscore DESC LIMIT 10"
-        self.db.execute(query)
-        min_highscore = self.db.fetch('all')[-1][0]
-        query = "DELETE FROM highscores WHERE highscore < {0}".format(min_highscore)
-        self.db.execute(query)
+        with db.transaction():
+            db.execute("SELECT name, value FROM settings")
+            self.settings = dict(db.fetch('all'))
+            db.execute("SELECT level, score, timer, grid FROM saved_game")
+            row = db.fetch('one')
+        self.state = None
+        if row is not None:
+            level, score, timer, grid = row
+            self.state = {"level": level, "score": score, "timer": timer,
+                          "grid": json.loads(grid)}
+        return self
+
+    def import_json(self, settings_filename, state_filename):
+        """Import the settings and the saved game of the former json files, in
+        a single transaction. Nothing is imported once settings are stored.
+
+        :param settings_filename: string path of settings.json
+        :param state_filename: string path of state.json
+        :return: True if the files were imported, False otherwise
+        """
+        if self.settings or not os.path.exists(settings_filename):
+            return False
+        with open(settings_filename) as f:
+            settings = json.load(f)["settings"]
+        state = None
+        if os.path.exists(state_filename) and os.path.getsize(state_filename):
+            with open(state_filename) as f:
+                state = json.load(f)
+        with self.pool.writer() as db:
+            with db.transaction():
+                db.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?)",
+                               settings.items())
+                if state is not None:
+                    db.execute(SAVE_STATE, (state["level"], state["score"],
+                                            state["timer"], json.dumps(state["grid"])))
+            self.load(db)
+        return True
+
+    def get_setting(self, name, default=None):
+        """Get a setting
+
+        :param name: string setting name
+        :param default: value returned if the setting isn't stored
+        :return: string value
+        """
+        return self.settings.get(name, default)
+
+    def set_setting(self, name, value):
+        """Store a setting
+
+        :param name: string setting name
+        :param value: string value
+        :return: the current instance
+        """
+        with self.pool.writer() as db:
+            db.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (name, value))
+            self.settings[name] = value
+        return self
+
+    def get_username(self):
+        """Return username user setting
+
+        :return: string username
+        """
+        return self.get_setting("username", DEFAULT_USERNAME)
+
+    def save_username(self, username):
+        """Save username user setting
+
+        :param username: string username
+        :return: the current instance
+        """
+        return self.set_setting("username", username)
+
+    def save_state(self, level, score, timer, grid):
+        """Save the game in progress, replacing the saved one
+
+        :param level: int current level
+        :param score: int current score
+        :param timer: float seconds left in the current round
+        :param grid: list of lists contains Nones and string letters
+        :return: the current instance
+        """
+        with self.pool.writer() as db:
+            db.execute(SAVE_STATE, (level, score, timer, json.dumps(grid)))
+            self.state = {"level": level, "score": score, "timer": timer, "grid": grid}
+        return self
+
+    def saved_state(self):
+        """Get the saved game
+
+        :return: dict with level, score, timer and grid keys, or None if there
+                 is no saved game
+        """
+        return self.state
+
+    def clear_state(self):
+        """Delete the saved game
+
+        :return: the current instance
+        """
+        with self.pool.writer() as db:
+            db.execute("DELETE FROM saved_game")
+            self.state = None
+        return self
+
+    def game_over(self, username, highscore):
+        """Delete the saved game and insert the highscore, in a single
+        transaction
+
+        :param username: string username
+        :param highscore: int highscore value
+        :return: the current instance
+        """
+        with self.pool.writer() as db:
+            with db.transaction():
+                db.execute("DELETE FROM saved_game")
+                db.execute(INSERT_HIGHSCORE, (username, highscore, int(time.time())))
+            self.state = None
         return self
 
     def insert_highscore(self, username, highscore):
@@ -84,10 +438,20 @@ class MeowDatabase(object):
         :param highscore: int highscore value
         :return: the current instance
         """
-        query = """INSERT INTO highscores VALUES (Null, ?, ?)"""
-        params = (username, highscore)
-        self.db.execute(query, params)
-        self._sanitize_highscores()
+        with self.pool.writer() as db:
+            db.execute(INSERT_HIGHSCORE, (username, highscore, int(time.time())))
+        return self
+
+    def insert_highscores(self, entries):
+        """Insert many highscore entries in a single transaction
+
+        :param entries: iterable of (username, highscore), may be a generator
+        :return: the current instance
+        """
+        created = int(time.time())
+        with self.pool.writer() as db:
+            db.executemany(INSERT_HIGHSCORE, ((username, highscore, created)
+                                              for username, highscore in entries))
         return self
 
     def get_top_highscores(self):
@@ -96,6 +460,137 @@ class MeowDatabase(object):
 
         :return: list of hits containing (username, highscore)
         """
-        query = "SELECT username, highscore FROM highscores ORDER BY highscore DESC LIMIT 10"
-        self.db.execute(query)
-        return self.db.fetch('all')
+        return self.page(0, 10)
+
+    def count(self):
+        """Get the number of stored highscores
+
+        :return: int number of hits
+        """
+        with self.pool.reader() as db:
+            db.execute("SELECT COALESCE(SUM(hits), 0) FROM highscore_counts")
+            return db.fetch('one')[0]
+
+    def rank_of(self, highscore):
+        """Get the rank a score has (or would have) in the highscores. Equal
+        scores share a rank.
+
+        :param highscore: int highscore value
+        :return: int rank, starting at 1
+        """
+        query = "SELECT COALESCE(SUM(hits), 0) + 1 FROM highscore_counts WHERE highscore > ?"
+        with self.pool.reader() as db:
+            db.execute(query, (highscore,))
+            return db.fetch('one')[0]
+
+    def page(self, offset, limit):
+        """Get a page of highscores ordered from the best. The counts table is
+        used to skip whole scores, so deep pages don't walk all previous rows.
+
+        :param offset: int number of hits to skip
+        :param limit: int maximum number of hits to return
+        :return: list of hits containing (username, highscore)
+        """
+        if offset < 0 or limit < 0:
+            raise ValueError("Offset and limit must be positive integers, "
+                             "got <{0}> and <{1}>".format(offset, limit))
+        query = """SELECT username, highscore FROM highscores WHERE highscore <= ?
+                   ORDER BY highscore DESC, id LIMIT ? OFFSET ?"""
+        with self.pool.reader() as db:
+            if offset == 0:
+                db.execute("""SELECT username, highscore FROM highscores
+                              ORDER BY highscore DESC, id LIMIT ?""", (limit,))
+                return db.fetch('all')
+            with db.transaction():
+                db.execute("SELECT highscore, hits FROM highscore_counts ORDER BY highscore DESC")
+                start, skipped = None, 0
+                # the cursor steps through the counts, only the scores before
+                # the page are read
+                for highscore, hits in db.cursor:
+                    if skipped + hits > offset:
+                        start = highscore
+                        break
+                    skipped += hits
+                if start is None:
+                    return []
+                db.execute(query, (start, limit, offset - skipped))
+                return db.fetch('all')
+
+    def user_best(self, username):
+        """Get the best highscore of a user
+
+        :param username: string username
+        :return: int highscore or None if the user has no highscores
+        """
+        query = "SELECT MAX(highscore) FROM highscores WHERE username = ?"
+        with self.pool.reader() as db:
+            db.execute(query, (username,))
+            return db.fetch('one')[0]
+
+    def iter_highscores(self, username=None, since=None, until=None, after=None,
+                        size=FETCH_SIZE):
+        """Stream highscores ordered from the best, like page(). Rows are read
+        in index order, so the database never sorts the result.
+
+        :param username: optional string username to keep
+        :param since: optional int first second of the scores to keep
+        :param until: optional int second after the last scores to keep
+        :param after: optional (highscore, id) of the last row of a previous
+                      export, to resume after it
+        :param size: int number of rows per fetch
+        :return: generator of (id, username, highscore, created), created is
+                 None for scores saved before it was recorded
+        """
+        clauses, params = _filters(username, since, until)
+        if after is not None:
+            highscore, id = after
+            clauses.append("(highscore < ? OR (highscore = ? AND id > ?))")
+            params.extend([highscore, highscore, id])
+        query = """SELECT id, username, highscore, created FROM highscores {0}
+                   ORDER BY highscore DESC, id""".format(_where(clauses))
+        with self.pool.reader() as db:
+            for row in db.stream(query, tuple(params), size):
+                yield row
+
+    def iter_history(self, username=None, since=None, until=None, after=None,
+                     size=FETCH_SIZE):
+        """Stream every saved score, in the order they were saved
+
+        :param username: optional string username to keep
+        :param since: optional int first second of the scores to keep
+        :param until: optional int second after the last scores to keep
+        :param after: optional int id of the last row of a previous export, to
+                      resume after it
+        :param size: int number of rows per fetch
+        :return: generator of (id, username, highscore, created), created is
+                 None for scores saved before it was recorded
+        """
+        # the unary + keeps sqlite off the username index, which would need a
+        # sort of all the user's rows; the table is walked in id order instead
+        clauses, params = _filters(username, since, until, "+username = ?")
+        if after is not None:
+            clauses.append("id > ?")
+            params.append(after)
+        query = """SELECT id, username, highscore, created FROM highscores {0}
+                   ORDER BY id""".format(_where(clauses))
+        with self.pool.reader() as db:
+            for row in db.stream(query, tuple(params), size):
+                yield row
+
+
+def _filters(username, since, until, user_clause="username = ?"):
+    clauses, params = [], []
+    if username is not None:
+        clauses.append(user_clause)
+        params.append(username)
+    if since is not None:
+        clauses.append("created >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created < ?")
+        params.append(until)
+    return clauses, params
+
+
+def _where(clauses):
+    return "WHERE " + " AND ".join(clauses) if clauses else ""
@@ -0,0 +1,142 @@
+import os
+import json
+import socket
+import threading
+
+from storage.meowjson import MeowJson
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class RemoteDatabase(object):
+    """Client of the leaderboard service (see meow_letters/leaderboard.py) with
+    the same interface as MeowDatabase. Submissions are queued and sent in
+    batches over one persistent connection; while the service is unreachable
+    they stay queued, optionally in a json file so they survive restarts.
+    Calls from different threads are serialized.
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=2.,
+                 batch_size=100, queue_file=None):
+        """RemoteDatabase class initializer. Doesn't connect until needed.
+
+        :param host: string service host
+        :param port: int service port
+        :param timeout: float socket timeout in seconds
+        :param batch_size: int maximum number of scores per insert request
+        :param queue_file: optional string filename of the offline queue
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.queue = MeowJson(queue_file) if queue_file else None
+        self.pending = self._load_queue()
+        self.last_top = []
+        self.sock = None
+        self.reader = None
+        self._lock = threading.RLock()
+
+    def _load_queue(self):
+        if self.queue is None or not os.path.exists(self.queue.filename) \
+                or os.path.getsize(self.queue.filename) == 0:
+            return []
+        return self.queue.load()
+
+    def _save_queue(self):
+        if self.queue is not None:
+            self.queue.dumps(self.pending)
+
+    def connect(self):
+        """Open the persistent connection if it isn't open yet
+
+        :return: the current instance
+        """
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), self.timeout)
+            self.reader = self.sock.makefile('rb')
+        return self
+
+    def close(self):
+        """Close the connection. Queued scores are kept.
+        """
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+        self.sock = None
+        self.reader = None
+
+    def _pipeline(self, requests):
+        """Send all requests at once, then read the responses in order
+
+        :param requests: list of request dicts
+        :return: generator of response dicts
+        """
+        self.connect()
+        data = "".join(json.dumps(r) + "\n" for r in requests)
+        self.sock.sendall(data.encode('utf-8'))
+        for _ in requests:
+            line = self.reader.readline()
+            if not line:
+                raise IOError("Connection closed by the leaderboard service")
+            yield json.loads(line.decode('utf-8'))
+
+    def flush(self):
+        """Send the queued scores. Batches the service answered are dropped from
+        the queue, rejected ones included, even if a later batch fails.
+
+        :return: True if the queue is empty afterwards, False otherwise
+        """
+        with self._lock:
+            return self._flush()
+
+    def _flush(self):
+        for attempt in range(2):
+            if not self.pending:
+                return True
+            batches = [self.pending[i:i + self.batch_size]
+                       for i in range(0, len(self.pending), self.batch_size)]
+            requests = [{"op": "insert", "rows": batch} for batch in batches]
+            try:
+                # responses arrive one at a time, so a batch leaves the queue
+                # as soon as it's answered and a later failure can't resend it
+                for response in self._pipeline(requests):
+                    self.pending = self.pending[len(batches.pop(0)):]
+            except (socket.error, IOError, ValueError):
+                self.close()
+            finally:
+                self._save_queue()
+        return not self.pending
+
+    def insert_highscore(self, username, highscore):
+        """Queue a highscore entry and try to submit everything queued
+
+        :param username: string username
+        :param highscore: int highscore value
+        :return: the current instance
+        """
+        with self._lock:
+            self.pending.append([username, int(highscore)])
+            self.flush()
+        return self
+
+    def get_top_highscores(self):
+        """Get top 10 highscores from the service. If it's unreachable, return
+        the last received ones.
+
+        :return: list of hits containing (username, highscore)
+        """
+        with self._lock:
+            self._flush()
+            for attempt in range(2):
+                try:
+                    response = next(self._pipeline([{"op": "top", "limit": 10}]))
+                except (socket.error, IOError, ValueError):
+                    self.close()
+                    continue
+                if not response.get("ok"):
+                    break
+                self.last_top = [tuple(row) for row in response["rows"]]
+                break
+            return self.last_top
@@ -0,0 +1,147 @@
+"""Lazy, page by page access to the highscores, for lists that only show a
+few rows at a time.
+"""
+from collections import OrderedDict
+
+
+PAGE_SIZE = 50
+MAX_PAGES = 8
+
+
+def run_now(func, callback, *args):
+    """Runner calling func and its callback right away, on the calling thread
+    """
+    callback(func(*args))
+
+
+class TopHighscores(object):
+    """Page interface over a backend that only gives the top highscores, like
+    the leaderboard service
+    """
+    def __init__(self, database):
+        self.database = database
+
+    def page(self, offset, limit):
+        return self.database.get_top_highscores()[offset:offset + limit]
+
+    def count(self):
+        return len(self.database.get_top_highscores())
+
+
+class HighscorePager(object):
+    """Cache of the pages of highscores around the visible rows. Pages are
+    fetched through a runner, usually the app's single worker thread, and only
+    the last max_pages used are kept, so any number of highscores can be
+    scrolled through with a constant memory use. Fetches queued for pages the
+    list has scrolled past are skipped when their turn comes.
+    """
+    def __init__(self, source, on_change=None, run=run_now,
+                 page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        """HighscorePager class initializer
+
+        :param source: object with page(offset, limit) and count() methods,
+                       like MeowDatabase or TopHighscores
+        :param on_change: optional callable called without arguments when
+                          the count or a page is loaded
+        :param run: callable run(func, callback, *args) calling
+                    callback(func(*args)), or callback(None) if func failed,
+                    like screens.run_in_background
+        :param page_size: int number of highscores per page
+        :param max_pages: int number of pages kept in memory
+        """
+        if page_size < 1 or max_pages < 2:
+            raise ValueError("A pager needs pages of at least one row and at least "
+                             "two pages, got <{0}> and <{1}>".format(page_size, max_pages))
+        self.source = source
+        self.on_change = on_change
+        self.run = run
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.total = None
+        self.pages = OrderedDict()
+        self.pending = set()
+        self.wanted = frozenset()
+        self.generation = 0
+
+    def reset(self):
+        """Forget the loaded pages, and start loading the count again. Results
+        of fetches started before are ignored.
+
+        :return: the current instance
+        """
+        self.generation += 1
+        self.total = None
+        self.pages.clear()
+        self.pending.clear()
+        self.wanted = frozenset()
+        generation = self.generation
+        self.run(self.source.count, lambda total: self._counted(generation, total))
+        return self
+
+    def get(self, index):
+        """Get a highscore, if its page is loaded
+
+        :param index: int position, 0 for the best highscore
+        :return: tuple (username, highscore) or None
+        """
+        number = index // self.page_size
+        page = self.pages.pop(number, None)
+        if page is None:
+            return None
+        self.pages[number] = page
+        offset = index % self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def prefetch(self, first, last):
+        """Load the pages of a range of rows, plus half a page above and a full
+        page below, where the list is usually scrolled to
+
+        :param first: int index of the first visible row
+        :param last: int index after the last visible row
+        :return: the current instance
+        """
+        if self.total is None:
+            return self
+        start = max(first - self.page_size // 2, 0)
+        stop = min(last + self.page_size, self.total)
+        wanted = list(range(start // self.page_size,
+                            (stop - 1) // self.page_size + 1))[:self.max_pages]
+        self.wanted = frozenset(wanted)
+        for number in wanted:
+            if number not in self.pages and number not in self.pending:
+                self.pending.add(number)
+                generation = self.generation
+                self.run(self._fetch,
+                         lambda rows, number=number: self._loaded(generation, number, rows),
+                         generation, number)
+        return self
+
+    def _fetch(self, generation, number):
+        # runs on the worker: by the time a queued fetch runs, the list may
+        # have been scrolled further or reset
+        if generation != self.generation or number not in self.wanted:
+            return None
+        return self.source.page(number * self.page_size, self.page_size)
+
+    def _counted(self, generation, total):
+        if generation != self.generation or total is None:
+            return
+        self.total = total
+        self._changed()
+
+    def _loaded(self, generation, number, rows):
+        if generation != self.generation:
+            return
+        self.pending.discard(number)
+        if rows is None:
+            # the fetch failed or was skipped, the page is asked again on the
+            # next prefetch
+            return
+        self.pages[number] = rows
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
@@ -0,0 +1,271 @@
+import gc
+import sys
+import json
+from array import array
+from functools import wraps
+from timeit import default_timer
+
+GC_UNAVAILABLE = "not tracked, needs gc.callbacks (Python 3.3+)"
+
+
+def app_module(app):
+    """Get the module defining the class of the running app. main.py runs as
+    __main__, so `import main` would load a second copy of its classes that the
+    app never uses.
+
+    :param app: App object
+    :return: module object
+    """
+    return sys.modules[type(app).__module__]
+
+
+class RingHistogram(object):
+    """Fixed-size ring buffer of samples. Once full, the oldest samples are
+    overwritten, so memory use does not grow with the session length.
+    """
+    def __init__(self, size=512):
+        """RingHistogram class initializer
+
+        :param size: int maximum number of kept samples
+        """
+        if size < 1:
+            raise ValueError("Histogram size must be a positive integer, "
+                             "received <{0}>".format(size))
+        self.size = size
+        self.samples = array('d', [0.0] * size)
+        self.index = 0
+        self.count = 0
+
+    def add(self, value):
+        """Add a sample, overwriting the oldest one if the buffer is full
+
+        :param value: float sample value
+        """
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.size
+        self.count += 1
+
+    def values(self):
+        """Get the kept samples from the oldest to the newest
+
+        :return: list of floats
+        """
+        if self.count < self.size:
+            return list(self.samples[:self.count])
+        return list(self.samples[self.index:]) + list(self.samples[:self.index])
+
+    def percentile(self, p):
+        """Get the p-th percentile of the kept samples
+
+        :param p: float percentile between 0 and 100
+        :return: float sample value or None if there are no samples
+        """
+        values = sorted(self.values())
+        if not values:
+            return None
+        i = int(round(p / 100. * (len(values) - 1)))
+        return values[i]
+
+    def summary(self):
+        """Summarize the kept samples
+
+        :return: dict with total count, min, p50, p95, p99 and max
+        """
+        values = sorted(self.values())
+        if not values:
+            return {"count": self.count}
+        last = len(values) - 1
+        return {"count": self.count,
+                "min": values[0],
+                "p50": values[int(round(.50 * last))],
+                "p95": values[int(round(.95 * last))],
+                "p99": values[int(round(.99 * last))],
+                "max": values[-1]}
+
+
+class Recorder(object):
+    """Collects named samples into ring histograms. Methods are only wrapped by
+    instrument(), so an app that never installs a recorder pays nothing.
+    """
+    def __init__(self, size=512):
+        """Recorder class initializer
+
+        :param size: int number of samples kept per histogram
+        """
+        self.size = size
+        self.histograms = {}
+        self._patched = []
+        self._gc_start = None
+        self.unavailable = {}
+
+    def histogram(self, name):
+        """Get a histogram by name, creating it if needed
+
+        :param name: string metric name
+        :return: RingHistogram object
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = RingHistogram(self.size)
+        return histogram
+
+    def record(self, name, value):
+        """Add a sample to a named histogram
+
+        :param name: string metric name
+        :param value: float sample value
+        """
+        self.histogram(name).add(value)
+
+    def timed(self, func, name):
+        """Wrap a callable to record its duration in seconds
+
+        :param func: callable to time
+        :param name: string metric name
+        :return: the wrapping callable
+        """
+        histogram = self.histogram(name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.add(default_timer() - start)
+        return wrapper
+
+    def instrument(self, cls, method, name=None):
+        """Replace a method of a class by its timed version
+
+        :param cls: class owning the method
+        :param method: string method name
+        :param name: string metric name, defaults to 'Class.method'
+        :return: the current instance
+        """
+        original = cls.__dict__[method]
+        name = name or "{0}.{1}".format(cls.__name__, method)
+        setattr(cls, method, self.timed(original, name))
+        self._patched.append((cls, method, original))
+        return self
+
+    def uninstrument(self):
+        """Restore every method replaced by instrument()
+
+        :return: the current instance
+        """
+        while self._patched:
+            cls, method, original = self._patched.pop()
+            setattr(cls, method, original)
+        self.stop_gc_tracking()
+        return self
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_start = default_timer()
+        elif self._gc_start is not None:
+            self.record("gc.pause", default_timer() - self._gc_start)
+            self._gc_start = None
+
+    def start_gc_tracking(self):
+        """Record garbage collector pauses. Only available where gc.callbacks
+        exists (Python 3.3+), elsewhere gc.pause is reported as unavailable.
+
+        :return: True if tracking started, False otherwise
+        """
+        callbacks = getattr(gc, "callbacks", None)
+        if callbacks is None:
+            self.unavailable["gc.pause"] = GC_UNAVAILABLE
+            return False
+        if self._on_gc not in callbacks:
+            callbacks.append(self._on_gc)
+        return True
+
+    def stop_gc_tracking(self):
+        callbacks = getattr(gc, "callbacks", None)
+        if callbacks is not None and self._on_gc in callbacks:
+            callbacks.remove(self._on_gc)
+
+    def summary(self):
+        """Summarize every histogram
+
+        :return: dict mapping metric names to their summaries
+        """
+        return dict((name, h.summary()) for name, h in self.histograms.items())
+
+    def dump(self, filename):
+        """Write the summaries and the raw samples as json
+
+        :param filename: string path of the output file
+        """
+        data = dict((name, {"summary": h.summary(), "samples": h.values()})
+                    for name, h in self.histograms.items())
+        for name, reason in self.unavailable.items():
+            data[name] = {"unavailable": reason}
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+
+    def format(self):
+        """Format the summaries in milliseconds, one metric per line, for the
+        in-game overlay
+
+        :return: string
+        """
+        lines = []
+        for name, summary in sorted(self.summary().items()):
+            if "p50" not in summary:
+                continue
+            if name.startswith("widgets"):
+                lines.append("{0}: {1:.0f}".format(name, summary["max"]))
+            else:
+                lines.append("{0}: p50 {1:.2f} p99 {2:.2f} max {3:.2f} ms".format(
+                    name, summary["p50"] * 1000, summary["p99"] * 1000,
+                    summary["max"] * 1000))
+        for name, reason in sorted(self.unavailable.items()):
+            lines.append("{0}: {1}".format(name, reason))
+        return "\n".join(lines)
+
+
+def install(app, size=512, overlay=False):
+    """Instrument the running Kivy app: frame time, the game hot paths, the
+    round timer, gc pauses and the number of widgets in the game screen
+
+    :param app: MeowLettersApp object
+    :param size: int number of samples kept per histogram
+    :param overlay: True to show the summaries on top of the window
+    :return: Recorder object
+    """
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    from kivy.uix.label import Label
+    from screens import GameScreen
+
+    main = app_module(app)
+    Game, Timer = main.Game, main.Timer
+    recorder = Recorder(size)
+    for method in ("toggle", "cycle_end", "redraw", "reposition"):
+        recorder.instrument(Game, method)
+    recorder.instrument(GameScreen, "round_end")
+    recorder.instrument(Timer, "update_bar")
+    recorder.start_gc_tracking()
+
+    frames = recorder.histogram("frame")
+    Clock.schedule_interval(lambda dt: frames.add(dt), 0)
+
+    def count_widgets(dt):
+        if app.manager.has_screen('game') and 'game' not in app.manager.factories:
+            game_screen = app.manager.get_screen('game')
+            recorder.record("widgets.game", sum(1 for _ in game_screen.walk()))
+    Clock.schedule_interval(count_widgets, 1)
+
+    if overlay:
+        label = Label(halign="left", valign="top", font_size='10sp',
+                      color=(0, 0, 0, 1), size_hint=(None, None))
+
+        def refresh(dt):
+            label.text = recorder.format()
+            label.size = Window.size
+            label.text_size = Window.size
+        Window.add_widget(label)
+        Clock.schedule_interval(refresh, 1)
+    return recorder
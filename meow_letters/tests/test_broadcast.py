@@ -0,0 +1,177 @@
+import socket
+import threading
+import time
+import unittest
+
+from meow_letters.broadcast import (DeltaEncoder, SpectatorView, SpectatorFeed,
+                                    frame, PUBLISHER)
+
+try:
+    import asyncio
+    from meow_letters import spectator
+except (ImportError, SyntaxError):
+    spectator = None
+
+
+class Board(object):
+    """Same layout as letters.CompactGrid, without the Letter objects"""
+    def __init__(self, size):
+        self.size = size
+        self.cells = bytearray([0xFF]) * (size * size)
+        self.selection = bytearray((size * size + 7) // 8)
+
+    def select(self, i, selected=True):
+        if selected:
+            self.selection[i >> 3] |= 1 << (i & 7)
+        else:
+            self.selection[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestDeltaEncoding(unittest.TestCase):
+    def setUp(self):
+        self.board = Board(5)
+        self.board.cells[0], self.board.cells[7] = 0, 1
+        self.encoder = DeltaEncoder()
+        self.view = SpectatorView()
+
+    def send(self, score=0, level=1):
+        body = self.encoder.encode(self.board, score, level)
+        self.view.feed(frame(body))
+        self.assertEqual(self.view.cells, self.board.cells)
+        self.assertEqual(self.view.selection, self.board.selection)
+        self.assertEqual((self.view.score, self.view.level), (score, level))
+        return body
+
+    def test_snapshot_then_deltas(self):
+        self.assertEqual(self.send()[:1], b'S')
+        self.board.select(0)
+        self.assertEqual(len(self.send()), 3)
+        self.board.select(7)
+        self.send()
+        self.board.cells[0] = self.board.cells[7] = 0xFF
+        self.board.select(0, False)
+        self.board.select(7, False)
+        self.board.cells[12] = 25
+        body = self.send(5, 1)
+        self.assertEqual(len(body), 3 + 3 + 4 + 7)
+        self.assertEqual(self.encoder.encode(self.board, 5, 1), b'')
+
+    def test_partial_messages(self):
+        message = frame(self.encoder.encode(self.board, 0, 1))
+        self.assertEqual(self.view.feed(message[:10]), [])
+        self.assertEqual(len(self.view.feed(message[10:])), 1)
+        self.assertEqual(self.view.cells, self.board.cells)
+
+    def test_reset(self):
+        self.send()
+        self.encoder.reset()
+        self.assertEqual(self.send()[:1], b'S')
+
+
+class TestSpectatorFeedOffline(unittest.TestCase):
+    def test_unreachable_relay(self):
+        feed = SpectatorFeed(port=free_port(), timeout=.5)
+        board = Board(3)
+        feed.publish(board, 0, 1)
+        board.cells[0] = 2
+        feed.publish(board, 0, 1)
+        feed.close()
+        self.assertGreaterEqual(feed.dropped, 1)
+        self.assertTrue(feed.resync)
+
+
+@unittest.skipIf(spectator is None, "the spectator relay needs asyncio")
+class TestSpectatorServer(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = spectator.SpectatorServer(port=0, max_pending=2)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.server.port), 2)
+        sock.sendall(b'SUB\n')
+        return sock
+
+    def receive(self, sock, view, messages):
+        received = 0
+        while received < messages:
+            received += len(view.feed(sock.recv(4096)))
+
+    def wait(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            time.sleep(.01)
+        self.fail("timed out")
+
+    def test_relay(self):
+        first = self.connect()
+        self.wait(lambda: len(self.server.spectators) == 1)
+        feed = SpectatorFeed(port=self.server.port)
+        board = Board(4)
+        board.cells[3] = 4
+        feed.publish(board, 0, 1)
+        board.select(3)
+        feed.publish(board, 0, 1)
+        view = SpectatorView()
+        self.receive(first, view, 2)
+        self.assertTrue(view.is_selected(0, 3))
+
+        late = self.connect()
+        late_view = SpectatorView()
+        self.receive(late, late_view, 1)
+        self.assertEqual(late_view.cells, board.cells)
+        self.assertEqual(late_view.selection, board.selection)
+        feed.close()
+        first.close()
+        late.close()
+        self.wait(lambda: not self.server.spectators)
+
+    def test_malformed_messages_are_skipped(self):
+        publisher = socket.create_connection(('127.0.0.1', self.server.port), 2)
+        board = Board(3)
+        board.cells[0] = 1
+        publisher.sendall(PUBLISHER + frame(b'G') + frame(b'C\x00')
+                          + frame(DeltaEncoder().encode(board, 5, 1)))
+        self.wait(lambda: self.server.published == 1)
+        self.assertEqual(self.server.view.score, 5)
+        publisher.close()
+
+    def test_slow_spectator_is_resynced(self):
+        slow = spectator.Spectator(max_pending=2)
+        self.server.spectators.add(slow)
+        encoder = DeltaEncoder()
+        board = Board(3)
+
+        def publish():
+            for i in range(5):
+                board.cells[i] = i
+                self.server.broadcast(encoder.encode(board, i, 1))
+        self.loop.call_soon_threadsafe(publish)
+        self.wait(lambda: self.server.published == 5)
+        self.assertEqual(slow.resyncs, 2)
+        view = SpectatorView()
+        while not slow.queue.empty():
+            view.feed(slow.queue.get_nowait())
+        self.assertEqual(view.cells, board.cells)
+        self.assertEqual(view.score, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
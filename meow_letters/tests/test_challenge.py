@@ -0,0 +1,83 @@
+import os
+import shutil
+import datetime
+import tempfile
+import threading
+import unittest
+
+from meow_letters.challenge import DailyChallenge, ChallengeCache
+
+
+class TestDailyChallenge(unittest.TestCase):
+    def setUp(self):
+        self.day = datetime.date(2026, 10, 19)
+
+    def test_deterministic(self):
+        first = DailyChallenge.generate(self.day)
+        second = DailyChallenge.generate(self.day)
+        self.assertEqual(first.grid, second.grid)
+        self.assertEqual(first.seeds, second.seeds)
+        self.assertEqual(sum(l is not None for row in first.grid for l in row), 3)
+        other = DailyChallenge.generate(self.day + datetime.timedelta(days=1))
+        self.assertNotEqual(first.seeds, other.seeds)
+
+    def test_same_spawns(self):
+        challenge = DailyChallenge.generate(self.day)
+        grids = []
+        for _ in range(2):
+            letter_grid = challenge.letter_grid()
+            for i in range(1, 4):
+                letter_grid.rng = challenge.round_rng(i)
+                letter_grid.add_random_letters(3)
+            grids.append([[l.letter if l else None for l in row]
+                          for row in letter_grid.grid])
+        self.assertEqual(grids[0], grids[1])
+
+    def test_dumps(self):
+        challenge = DailyChallenge.generate(self.day, rounds=16)
+        data = challenge.dumps()
+        self.assertEqual(len(data), 8 + 4 + 25 + 16 * 4)
+        restored = DailyChallenge.loads(data)
+        self.assertEqual(restored.day, self.day)
+        self.assertEqual(restored.grid, challenge.grid)
+        self.assertEqual(restored.seeds, challenge.seeds)
+        self.assertRaises(ValueError, DailyChallenge.loads, b'XXXX' + data[4:])
+
+    def test_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ChallengeCache(directory)
+            cache.prefetch([self.day]).join()
+            self.assertEqual(cache.get(self.day).seeds,
+                             DailyChallenge.generate(self.day).seeds)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_concurrent_saves(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ChallengeCache(os.path.join(directory, "daily"))
+            challenge = DailyChallenge.generate(self.day)
+            errors = []
+
+            def save():
+                try:
+                    for i in range(20):
+                        cache.save(challenge)
+                except Exception as e:
+                    errors.append(e)
+            threads = [threading.Thread(target=save) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(os.listdir(cache.directory),
+                             [os.path.basename(cache.path(self.day))])
+            self.assertEqual(cache.get(self.day).seeds, challenge.seeds)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
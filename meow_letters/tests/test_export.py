@@ -0,0 +1,113 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from meow_letters import export
+from meow_letters.storage.meowdb import MeowDatabase, INSERT_HIGHSCORE
+
+
+DAY = export.DAY_SECONDS
+START = export.timestamp("2026-01-01")
+SCORES = [("Foo", 50, START), ("Bar", 90, START + DAY), ("Foo", 70, START + 2 * DAY),
+          ('Ba,"z"', 70, START + 3 * DAY), ("Bar", 10, None), ("Foo", 30, START + 5 * DAY)]
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Crashing(object):
+    """Database stopping an export after a number of rows
+    """
+    def __init__(self, database, rows):
+        self.database = database
+        self.rows = rows
+
+    def iter_history(self, *args):
+        for i, row in enumerate(self.database.iter_history(*args)):
+            if i == self.rows:
+                raise Interrupted()
+            yield row
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = MeowDatabase(os.path.join(self.directory, 'test.db'))
+        with self.database.pool.writer() as db:
+            db.executemany(INSERT_HIGHSCORE, SCORES)
+        self.output = os.path.join(self.directory, 'export')
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def read(self, filename=None):
+        with open(filename or self.output, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def test_iter_highscores(self):
+        rows = list(self.database.iter_highscores(size=2))
+        self.assertEqual([r[2] for r in rows], [90, 70, 70, 50, 30, 10])
+        self.assertEqual(list(self.database.iter_highscores(after=(70, rows[1][0]))),
+                         rows[2:])
+        self.assertEqual([r[2] for r in self.database.iter_highscores("Foo")], [70, 50, 30])
+        self.assertEqual([r[2] for r in self.database.iter_highscores(
+            since=START + DAY, until=START + 3 * DAY)], [90, 70])
+
+    def test_iter_history(self):
+        rows = list(self.database.iter_history(size=4))
+        self.assertEqual([(r[1], r[2], r[3]) for r in rows], SCORES)
+        self.assertEqual(list(self.database.iter_history(after=rows[3][0])), rows[4:])
+        self.assertEqual([r[2] for r in self.database.iter_history("Foo", since=START + DAY)],
+                         [70, 30])
+
+    def test_csv(self):
+        self.assertEqual(export.export(self.database, "highscores", self.output, every=2), 6)
+        lines = self.read().split("\r\n")
+        self.assertEqual(lines[0], "id,username,highscore,created")
+        self.assertEqual(lines[1], "2,Bar,90,2026-01-02T00:00:00Z")
+        self.assertEqual(lines[3], '4,"Ba,""z""",70,2026-01-04T00:00:00Z')
+        self.assertEqual(lines[6], "5,Bar,10,")
+        self.assertEqual(lines[7], "")
+        self.assertFalse(os.path.exists(self.output + ".checkpoint"))
+
+    def test_jsonl(self):
+        export.export(self.database, "history", self.output, "jsonl", username="Bar")
+        rows = [json.loads(line) for line in self.read().splitlines()]
+        self.assertEqual(rows, [{"id": 2, "username": "Bar", "highscore": 90,
+                                 "created": "2026-01-02T00:00:00Z"},
+                                {"id": 5, "username": "Bar", "highscore": 10,
+                                 "created": None}])
+
+    def test_resume(self):
+        complete = os.path.join(self.directory, 'complete')
+        export.export(self.database, "history", complete)
+        self.assertRaises(Interrupted, export.export, Crashing(self.database, 5),
+                          "history", self.output, every=2)
+        with open(self.output + ".checkpoint") as f:
+            self.assertEqual(json.load(f)["rows"], 4)
+        self.assertEqual(export.export(self.database, "history", self.output, every=2), 6)
+        self.assertEqual(self.read(), self.read(complete))
+        self.assertFalse(os.path.exists(self.output + ".checkpoint"))
+
+    def test_checkpoint_of_another_export(self):
+        self.assertRaises(Interrupted, export.export, Crashing(self.database, 3),
+                          "history", self.output, every=2)
+        self.assertRaises(ValueError, export.export, self.database, "history",
+                          self.output, "jsonl")
+        self.assertRaises(ValueError, export.export, self.database, "games", self.output)
+
+    def test_main(self):
+        self.database.close()
+        self.assertEqual(export.main(["history", self.output, "--db",
+                                      os.path.join(self.directory, 'test.db'),
+                                      "--since", "2026-01-02", "--until", "2026-01-03"]), 0)
+        self.assertEqual(len(self.read().splitlines()), 3)
+        self.assertRaises(ValueError, export.timestamp, "01/02/2026")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from meow_letters.storage.meowremote import RemoteDatabase
+
+try:
+    import asyncio
+    from meow_letters import leaderboard
+except (ImportError, SyntaxError):
+    leaderboard = None
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class FlakyService(object):
+    """Leaderboard stand-in whose first connection answers one request and
+    hangs up. Later connections answer everything.
+    """
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(1)
+        self.port = self.sock.getsockname()[1]
+        self.inserted = []
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _serve(self):
+        for answers in (1, None):
+            conn, _ = self.sock.accept()
+            reader = conn.makefile('rb')
+            for line in iter(reader.readline, b''):
+                if answers == 0:
+                    continue
+                self.inserted.append(json.loads(line.decode('utf-8'))["rows"])
+                conn.sendall(b'{"ok": true}\n')
+                if answers is not None:
+                    answers -= 1
+                    if answers == 0:
+                        conn.shutdown(socket.SHUT_WR)
+            reader.close()
+            conn.close()
+        self.sock.close()
+
+
+class TestRemoteDatabaseOffline(unittest.TestCase):
+    def setUp(self):
+        fd, self.queue_file = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.queue_file)
+
+    def test_offline_queue(self):
+        db = RemoteDatabase(port=free_port(), timeout=.5, queue_file=self.queue_file)
+        db.insert_highscore("Foo", 10).insert_highscore("Bar", 20)
+        self.assertEqual(db.pending, [["Foo", 10], ["Bar", 20]])
+        self.assertEqual(db.get_top_highscores(), [])
+        restored = RemoteDatabase(port=db.port, queue_file=self.queue_file)
+        self.assertEqual(restored.pending, [["Foo", 10], ["Bar", 20]])
+
+    def test_answered_batches_are_not_resent(self):
+        service = FlakyService()
+        db = RemoteDatabase(port=service.port, batch_size=1)
+        db.pending = [["Foo", 10], ["Bar", 20], ["Baz", 30]]
+        self.assertTrue(db.flush())
+        db.close()
+        service.thread.join(5)
+        self.assertEqual(service.inserted,
+                         [[["Foo", 10]], [["Bar", 20]], [["Baz", 30]]])
+
+
+@unittest.skipIf(leaderboard is None, "the leaderboard service needs asyncio")
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        store = leaderboard.HighscoreStore(':memory:')
+        self.server = leaderboard.LeaderboardServer(store, port=0)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_submit_and_top(self):
+        db = RemoteDatabase(port=self.server.port, batch_size=2)
+        db.pending = [["Foo", 10], ["Bar", 30], ["Baz", 20]]
+        db.insert_highscore("Qux", 5)
+        self.assertEqual(db.pending, [])
+        self.assertEqual(db.get_top_highscores()[:3],
+                         [("Bar", 30), ("Baz", 20), ("Foo", 10)])
+        db.close()
+
+    def test_concurrent_submitters(self):
+        bench = leaderboard.bench('127.0.0.1', self.server.port, clients=200)
+        asyncio.run_coroutine_threadsafe(bench, self.loop).result()
+        self.assertEqual(len(self.server.store.top(1000)), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
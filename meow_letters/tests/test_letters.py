@@ -1,6 +1,8 @@
+import random
 import unittest
 
-from meow_letters.letters import Letter, LetterChain
+from meow_letters.letters import (Letter, LetterChain, LetterGrid, SpawnPool,
+                                  CompactGrid)
 
 
 class TestLetter(unittest.TestCase):
@@ -142,6 +144,122 @@ class TestLetterChain(unittest.TestCase):
         self.chain.chain = [letter_a, letter_a]
         self.assertFalse(self.chain.is_valid())
 
+    def test_can_extend(self):
+        letter_a = Letter("A")
+        self.assertTrue(self.chain.can_extend(letter_a))
+        self.chain.add(letter_a)
+        self.assertFalse(self.chain.can_extend(letter_a))
+        self.assertFalse(self.chain.can_extend(Letter("C")))
+        self.assertFalse(self.chain.can_extend(Letter("A")))
+        self.assertTrue(self.chain.can_extend(Letter("B")))
+        self.chain.chain = [Letter("Z")]
+        self.assertFalse(self.chain.can_extend(Letter("A")))
+
+
+class TestSpawnPool(unittest.TestCase):
+    def grid(self, seed):
+        letter_grid = LetterGrid(5, rng=random.Random(seed)).setup(6)
+        letters = sorted(l for x, y, l in letter_grid.iterate())
+        letter_grid.chain.add(letters[0])
+        return letter_grid
+
+    def board(self, letter_grid):
+        return [[l.letter if l is not None else None for l in row]
+                for row in letter_grid.grid]
+
+    def test_prepared_spawn_matches_cycle_end(self):
+        expected = self.grid(7)
+        expected.rng = random.Random(42)
+        expected.cycle_end(2)
+        letter_grid = self.grid(7)
+        pool = SpawnPool().prepare(letter_grid, 2, random.Random(42))
+        letter_grid.cycle_end(2, pool)
+        self.assertEqual(self.board(letter_grid), self.board(expected))
+        self.assertEqual(letter_grid.chain.length, 0)
+        self.assertIsNone(pool.take(letter_grid, 2))
+
+    def test_stale_spawn_is_ignored(self):
+        letter_grid = self.grid(7)
+        pool = SpawnPool().prepare(letter_grid, 2)
+        self.assertIsNone(pool.take(letter_grid, 3))
+        pool.prepare(letter_grid, 2)
+        letter_grid.chain.clear()
+        self.assertIsNone(pool.take(letter_grid, 2))
+
+    def test_prepared_once(self):
+        letter_grid = self.grid(7)
+        pool = SpawnPool().prepare(letter_grid, 2)
+        prepared = pool.prepared
+        self.assertIs(pool.prepare(letter_grid, 2).prepared, prepared)
+        self.assertIsNot(pool.prepare(letter_grid, 3).prepared, prepared)
+
+    def test_set_grid_discards_the_spawn(self):
+        letter_grid = self.grid(7)
+        pool = SpawnPool().prepare(letter_grid, 2)
+        letter_grid.set_grid([row[:] for row in letter_grid.grid])
+        self.assertFalse(pool.is_ready(letter_grid, 2))
+        self.assertIsNone(pool.take(letter_grid, 2))
+
+    def test_clears_selected_letters_only(self):
+        letter_grid = LetterGrid(2)
+        a, b, other_a = Letter("A"), Letter("B"), Letter("A")
+        letter_grid.set_grid([[other_a, None], [a, b]])
+        letter_grid.chain.add(a).add(b)
+        pool = SpawnPool().prepare(letter_grid, 1)
+        letter_grid.cycle_end(1, pool)
+        self.assertIs(letter_grid[0][0], other_a)
+
+    def test_place_randomly_full_board(self):
+        letter_grid = LetterGrid(2).setup(4)
+        letter_grid.place_randomly([Letter("A")])
+        self.assertTrue(letter_grid.end)
+
+
+class TestCompactGrid(unittest.TestCase):
+    def setUp(self):
+        self.grid = CompactGrid(3)
+        self.grid[0][1] = "B"
+        self.grid[2][2] = Letter("C")
+
+    def test_access(self):
+        self.assertIsNone(self.grid[0][0])
+        self.assertEqual(self.grid[0][1].letter, "B")
+        self.assertEqual(self.grid.get(2, 2), "C")
+        self.assertEqual(list(self.grid.iterate()), [(0, 1, "B"), (2, 2, "C")])
+        self.assertEqual(self.grid.count(), 2)
+        self.assertEqual(len(list(self.grid.iterate_empty())), 7)
+        self.assertRaises(IndexError, lambda: self.grid[3])
+        self.assertRaises(ValueError, self.grid.set, 0, 0, "?")
+        self.assertEqual(len(self.grid.cells), 9)
+
+    def test_selection(self):
+        self.grid[0][1].select()
+        self.assertTrue(self.grid[0][1].is_selected())
+        self.assertFalse(self.grid.is_selected(2, 2))
+        self.grid[0][1] = "A"
+        self.assertFalse(self.grid.is_selected(0, 1))
+
+    def test_snapshot(self):
+        snapshot = self.grid.snapshot()
+        self.grid[0][0] = "Z"
+        self.grid.select(0, 0)
+        self.grid.restore(snapshot)
+        self.assertIsNone(self.grid[0][0])
+        self.assertFalse(self.grid.is_selected(0, 0))
+
+    def test_letter_grid(self):
+        letter_grid = LetterGrid(3)
+        letter_grid.grid[1][1] = Letter("B")
+        letter_grid.grid[0][2] = Letter("A")
+        letter_grid.grid[2][0] = Letter("D")
+        letter_grid.chain.add(letter_grid[1][1]).add(letter_grid[0][2])
+        compact = CompactGrid.from_letter_grid(letter_grid)
+        self.assertTrue(compact.is_selected(1, 1))
+        expanded = compact.to_letter_grid()
+        self.assertEqual([l.letter for l in expanded.chain.chain], ["A", "B"])
+        self.assertEqual([(x, y, l.letter) for x, y, l in expanded.iterate()],
+                         [(0, 2, "A"), (1, 1, "B"), (2, 0, "D")])
+
 
 if __name__ == '__main__':
     unittest.main()
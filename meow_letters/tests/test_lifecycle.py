@@ -0,0 +1,119 @@
+import os
+import imp
+import json
+import random
+import shutil
+import tempfile
+import unittest
+
+from meow_letters import lifecycle, PROJECT_PATH
+from meow_letters.letters import Letter, LetterGrid
+
+try:
+    import kivy
+except ImportError:
+    kivy = None
+
+
+class Board(object):
+    def __init__(self):
+        self.restarts = 0
+
+    def restart(self):
+        self.restarts += 1
+
+
+def play(letter_grid):
+    while list(letter_grid.iterate_empty()):
+        letter_grid.cycle_end(1)
+
+
+class TestLiveObjects(unittest.TestCase):
+    def setUp(self):
+        self.tracker = lifecycle.LiveObjects()
+
+    def tearDown(self):
+        self.tracker.untrack()
+
+    def test_counts_drop_when_freed(self):
+        self.tracker.track(Letter)
+        letters = [Letter("A"), Letter("B")]
+        self.assertEqual(self.tracker.counts()["Letter"], 2)
+        del letters[0]
+        self.assertEqual(self.tracker.counts()["Letter"], 1)
+        self.assertEqual(self.tracker.created["Letter"], 2)
+
+    def test_untrack_restores_the_classes(self):
+        init, restart = Letter.__dict__['__init__'], Board.__dict__['restart']
+        self.tracker.track(Letter).after(Board, "restart", lambda board: None)
+        self.assertIsNot(Letter.__dict__['__init__'], init)
+        self.tracker.untrack()
+        self.assertIs(Letter.__dict__['__init__'], init)
+        self.assertIs(Board.__dict__['restart'], restart)
+        Letter("A")
+        self.assertEqual(self.tracker.created["Letter"], 0)
+
+    def test_after(self):
+        seen = []
+        self.tracker.after(Board, "restart", seen.append)
+        board = Board()
+        board.restart()
+        self.assertEqual(seen, [board])
+        self.assertEqual(board.restarts, 1)
+
+    def test_checkpoints(self):
+        held = []
+        self.tracker.gauge("held", lambda: len(held))
+        self.assertEqual(self.tracker.checkpoint(0), {"held": 0})
+        held.extend([1, 2])
+        self.assertEqual(self.tracker.checkpoint(1), {"held": 2})
+        self.assertEqual(self.tracker.format({"held": 2}), "held: 2 (+2)")
+        self.assertEqual(self.tracker.rising(1), ["held"])
+        self.assertEqual(self.tracker.rising(2), [])
+        self.assertRaises(ValueError, self.tracker.rising, 0)
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "lifecycle.json")
+            self.tracker.dump(filename)
+            with open(filename) as f:
+                self.assertEqual(len(json.load(f)["checkpoints"]), 2)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_soak(self):
+        self.tracker.track(Letter)
+        lifecycle.soak(lambda i: play(LetterGrid(5, random.Random(i)).setup(3)),
+                       12, self.tracker, window=3)
+        self.assertEqual(self.tracker.history[-1][1]["Letter"], 0)
+        self.assertGreater(self.tracker.created["Letter"], 12 * 25)
+
+    def test_soak_finds_leaks(self):
+        self.tracker.track(Letter)
+        kept = []
+
+        def leaky(i):
+            letter_grid = LetterGrid(5, random.Random(i)).setup(3)
+            play(letter_grid)
+            kept.append(letter_grid)
+        self.assertRaises(lifecycle.LeakError, lifecycle.soak, leaky, 12,
+                          self.tracker, window=3)
+        self.assertEqual(len(kept), 6)
+
+
+@unittest.skipIf(kivy is None, "installing on the app needs Kivy")
+class TestInstall(unittest.TestCase):
+    def test_tracks_the_classes_of_the_running_module(self):
+        # main.py runs as __main__, not as the main module
+        main = imp.load_source("__meow_main__", os.path.join(PROJECT_PATH, "main.py"))
+        restart, init = main.Game.__dict__['restart'], main.LetterCell.__dict__['__init__']
+        tracker = lifecycle.install(main.MeowLettersApp())
+        try:
+            self.assertIsNot(main.Game.__dict__['restart'], restart)
+            self.assertIsNot(main.LetterCell.__dict__['__init__'], init)
+        finally:
+            tracker.untrack()
+        self.assertIs(main.Game.__dict__['restart'], restart)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import logging
+import unittest
+
+from meow_letters import log
+
+
+class TestLog(unittest.TestCase):
+    def test_config_loaded_once(self):
+        log.getLogger(__name__)
+        root_handlers = logging.getLogger().handlers[:]
+        log.getLogger(__name__)
+        self.assertEqual(logging.getLogger().handlers, root_handlers)
+        self.assertEqual(len(root_handlers), 1)
+        self.assertIsInstance(root_handlers[0], log.QueueHandler)
+
+    def test_level_override(self):
+        logger = log.getLogger('meow_letters.test_log', logging.ERROR)
+        self.assertEqual(logger.level, logging.ERROR)
+        log.set_level('meow_letters.test_log', 'INFO')
+        self.assertEqual(logger.level, logging.INFO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import logging
+import shutil
+import tempfile
+import threading
+import unittest
+
+from meow_letters.storage.meowanalytics import AnalyticsStore, AnalyticsRecorder
+
+
+class BlockedStore(object):
+    def __init__(self):
+        self.release = threading.Event()
+        self.rounds = 0
+
+    def insert_rounds(self, rounds):
+        self.release.wait()
+        self.rounds += len(rounds)
+
+    def close(self):
+        pass
+
+
+class BrokenStore(BlockedStore):
+    def insert_rounds(self, rounds):
+        raise IOError("disk full")
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dbname = os.path.join(self.directory, 'analytics.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_recorder(self):
+        recorder = AnalyticsRecorder(AnalyticsStore(self.dbname), batch_size=4)
+        for game in range(2):
+            recorder.start_game()
+            recorder.penalty()
+            recorder.end_round(3, 1, 10)
+            recorder.end_round(0, 1, 10)
+            recorder.penalty()
+            recorder.penalty()
+            recorder.end_round(5, 2, 110)
+        recorder.close()
+        self.assertEqual(recorder.dropped, 0)
+
+        store = AnalyticsStore(self.dbname)
+        self.assertEqual(store.chain_lengths(), [(0, 2), (3, 2), (5, 2)])
+        levels = store.levels()
+        self.assertEqual([(l, rounds) for l, rounds, _, _ in levels], [(1, 4), (2, 2)])
+        self.assertEqual(levels[0][3], .5)
+        self.assertEqual(levels[1][3], 2.)
+        self.assertEqual(store.level_progression(), [(2, 2)])
+        store.close()
+
+    def test_bounded_queue(self):
+        store = BlockedStore()
+        recorder = AnalyticsRecorder(store, batch_size=1, max_pending=2)
+        for i in range(100):
+            recorder.end_round(2, 1, 5)
+        self.assertLessEqual(recorder.pending.qsize(), 2)
+        self.assertGreaterEqual(recorder.dropped, 97)
+        store.release.set()
+        recorder.close()
+        self.assertEqual(store.rounds + recorder.dropped, 100)
+
+    def test_write_errors(self):
+        logger = logging.getLogger("meow_letters.storage.meowanalytics")
+        level = logger.level
+        logger.setLevel("CRITICAL")
+        try:
+            recorder = AnalyticsRecorder(BrokenStore(), batch_size=1)
+            for i in range(3):
+                recorder.end_round(2, 1, 5)
+            self.assertTrue(recorder.close())
+        finally:
+            logger.setLevel(level)
+        self.assertEqual(recorder.dropped, 3)
+
+    def test_close_timeout(self):
+        store = BlockedStore()
+        recorder = AnalyticsRecorder(store, batch_size=1, max_pending=1)
+        recorder.end_round(2, 1, 5)
+        recorder.end_round(2, 1, 5)
+        self.assertFalse(recorder.close(timeout=.1))
+        store.release.set()
+        self.assertTrue(recorder.close())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from meow_letters.storage.meowdb import (MeowDatabase, SqliteDatabase,
+                                         HIGHSCORES_MIGRATIONS, DEFAULT_USERNAME,
+                                         MAX_READERS)
+
+
+class TestMeowDatabase(unittest.TestCase):
+    def setUp(self):
+        self.database = MeowDatabase(':memory:')
+        for username, highscore in [("Foo", 50), ("Bar", 90), ("Foo", 70),
+                                    ("Baz", 70), ("Bar", 10), ("Foo", 30)]:
+            self.database.insert_highscore(username, highscore)
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_keeps_history(self):
+        for i in range(20):
+            self.database.insert_highscore("Qux", 100 + i)
+        self.assertEqual(self.database.count(), 26)
+        self.assertEqual(len(self.database.get_top_highscores()), 10)
+        self.assertEqual(self.database.get_top_highscores()[0], ("Qux", 119))
+
+    def test_insert_highscores(self):
+        self.database.insert_highscores(("Gen", i) for i in range(100))
+        self.assertEqual(self.database.count(), 106)
+        self.assertEqual(self.database.user_best("Gen"), 99)
+
+    def test_rank_of(self):
+        self.assertEqual(self.database.rank_of(100), 1)
+        self.assertEqual(self.database.rank_of(90), 1)
+        self.assertEqual(self.database.rank_of(70), 2)
+        self.assertEqual(self.database.rank_of(60), 4)
+        self.assertEqual(self.database.rank_of(0), 7)
+
+    def test_page(self):
+        self.assertEqual(self.database.page(0, 2), [("Bar", 90), ("Foo", 70)])
+        self.assertEqual(self.database.page(2, 2), [("Baz", 70), ("Foo", 50)])
+        self.assertEqual(self.database.page(1, 2), [("Foo", 70), ("Baz", 70)])
+        self.assertEqual(self.database.page(5, 10), [("Bar", 10)])
+        self.assertEqual(self.database.page(6, 10), [])
+        self.assertRaises(ValueError, self.database.page, -1, 10)
+
+    def test_user_best(self):
+        self.assertEqual(self.database.user_best("Foo"), 70)
+        self.assertIsNone(self.database.user_best("Nobody"))
+
+    def test_counts_backfill(self):
+        self.database.db.execute("DROP TABLE highscore_counts")
+        self.database.db.execute("PRAGMA user_version=1")
+        self.assertEqual(self.database.db.migrate(HIGHSCORES_MIGRATIONS[:2]), 2)
+        self.assertEqual(self.database.count(), 6)
+        self.assertEqual(self.database.rank_of(60), 4)
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = MeowDatabase(os.path.join(self.directory, 'test.db'))
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def test_threads(self):
+        errors = []
+
+        def play(i):
+            try:
+                for j in range(20):
+                    self.database.insert_highscore("user{0}".format(i), j)
+                    self.database.get_top_highscores()
+                    self.database.rank_of(j)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=play, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.database.count(), 160)
+        self.assertLessEqual(len(self.database.pool._readers), MAX_READERS)
+
+    def test_readers_are_reused(self):
+        for i in range(20):
+            thread = threading.Thread(target=self.database.count)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(self.database.pool._readers), 1)
+        with self.database.pool.reader() as first:
+            with self.database.pool.reader() as second:
+                self.assertIsNot(first, second)
+        self.assertEqual(len(self.database.pool._readers), 2)
+
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'test.db')
+        self.database = MeowDatabase(self.filename)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        self.database.close()
+        self.database = MeowDatabase(self.filename)
+        return self.database
+
+    def test_settings(self):
+        self.assertEqual(self.database.get_username(), DEFAULT_USERNAME)
+        self.database.save_username("Foo")
+        self.assertEqual(self.reopen().get_username(), "Foo")
+        self.assertIsNone(self.database.get_setting("sound"))
+
+    def test_saved_game(self):
+        grid = [["A", None], [None, "B"]]
+        self.assertIsNone(self.database.saved_state())
+        self.database.save_state(2, 30, 4.5, grid).save_state(3, 40, 2.5, grid)
+        self.assertEqual(self.reopen().saved_state(),
+                         {"level": 3, "score": 40, "timer": 2.5, "grid": grid})
+        self.database.clear_state()
+        self.assertIsNone(self.reopen().saved_state())
+
+    def test_game_over(self):
+        self.database.save_state(2, 30, 4.5, [[None]])
+        self.database.game_over("Foo", 30)
+        self.assertIsNone(self.database.saved_state())
+        self.assertEqual(self.reopen().get_top_highscores(), [("Foo", 30)])
+        self.assertIsNone(self.database.saved_state())
+
+    def test_game_over_is_atomic(self):
+        self.database.save_state(2, 30, 4.5, [[None]])
+        self.database.db.execute("""CREATE TRIGGER no_scores BEFORE INSERT ON highscores
+                                    BEGIN SELECT RAISE(ABORT, 'no scores'); END""")
+        self.assertRaises(sqlite3.DatabaseError, self.database.game_over, "Foo", 30)
+        self.assertIsNotNone(self.database.saved_state())
+        self.assertIsNotNone(self.reopen().saved_state())
+        self.assertEqual(self.database.count(), 0)
+
+    def test_import_json(self):
+        settings = os.path.join(self.directory, 'settings.json')
+        state = os.path.join(self.directory, 'state.json')
+        with open(settings, 'w') as f:
+            json.dump({"settings": {"username": "Bar"}}, f)
+        with open(state, 'w') as f:
+            json.dump({"level": 1, "score": 5, "timer": 6., "grid": [["C"]]}, f)
+        self.assertTrue(self.database.import_json(settings, state))
+        self.assertEqual(self.database.get_username(), "Bar")
+        self.assertEqual(self.database.saved_state()["grid"], [["C"]])
+        self.database.save_username("Baz")
+        self.assertFalse(self.reopen().import_json(settings, state))
+        self.assertEqual(self.database.get_username(), "Baz")
+
+    def test_import_empty_state(self):
+        settings = os.path.join(self.directory, 'settings.json')
+        state = os.path.join(self.directory, 'state.json')
+        with open(settings, 'w') as f:
+            json.dump({"settings": {"username": "Bar"}}, f)
+        open(state, 'w').close()
+        self.assertTrue(self.database.import_json(settings, state))
+        self.assertIsNone(self.database.saved_state())
+        self.assertFalse(self.database.import_json(settings, state))
+
+
+class TestSqliteDatabase(unittest.TestCase):
+    def setUp(self):
+        self.db = SqliteDatabase(':memory:')
+        self.db.migrate([["CREATE TABLE t (x integer)"]])
+
+    def tearDown(self):
+        self.db.close()
+
+    def count(self):
+        self.db.execute("SELECT COUNT(*) FROM t")
+        return self.db.fetch('one')[0]
+
+    def test_migrate(self):
+        self.assertEqual(self.db.version, 1)
+        self.assertEqual(self.db.migrate([["CREATE TABLE t (x integer)"]]), 1)
+        self.assertRaises(sqlite3.OperationalError, self.db.migrate,
+                          [[], ["CREATE TABLE u (x integer)", "INVALID"]])
+        self.assertEqual(self.db.version, 1)
+        self.db.execute("SELECT name FROM sqlite_master WHERE name = 'u'")
+        self.assertIsNone(self.db.fetch('one'))
+
+    def test_transaction(self):
+        with self.db.transaction():
+            self.db.execute("INSERT INTO t VALUES (1)")
+            try:
+                with self.db.transaction():
+                    self.db.execute("INSERT INTO t VALUES (2)")
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.count(), 1)
+        try:
+            with self.db.transaction():
+                self.db.execute("INSERT INTO t VALUES (3)")
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.count(), 1)
+        self.db.executemany("INSERT INTO t VALUES (?)", [(4,), (5,)])
+        self.assertEqual(self.count(), 3)
+
+    def test_stream(self):
+        self.db.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+        rows = []
+        for row in self.db.stream("SELECT x FROM t ORDER BY x", size=2):
+            rows.append(row[0])
+            self.assertEqual(self.count(), 5)
+        self.assertEqual(rows, list(range(5)))
+        self.db.execute("SELECT x FROM t ORDER BY x")
+        self.assertEqual(self.db.fetch('many', 2), [(0,), (1,)])
+        self.assertEqual(self.db.fetch('many'), [(2,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
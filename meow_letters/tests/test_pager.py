@@ -0,0 +1,118 @@
+import unittest
+
+from meow_letters.storage.meowdb import MeowDatabase
+from meow_letters.storage.pager import HighscorePager, TopHighscores
+
+
+class Source(object):
+    def __init__(self, database):
+        self.database = database
+        self.pages = []
+
+    def page(self, offset, limit):
+        self.pages.append(offset)
+        return self.database.page(offset, limit)
+
+    def count(self):
+        return self.database.count()
+
+
+class DeferredRunner(object):
+    """Runs the fetches only when asked, like a worker thread would later"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, func, callback, *args):
+        self.calls.append((func, callback, args))
+
+    def finish(self):
+        calls, self.calls = self.calls, []
+        for func, callback, args in calls:
+            callback(func(*args))
+
+
+class TestHighscorePager(unittest.TestCase):
+    def setUp(self):
+        self.database = MeowDatabase(':memory:')
+        self.database.insert_highscores(("P{0}".format(i), i) for i in range(1000))
+        self.source = Source(self.database)
+        self.changes = []
+        self.pager = HighscorePager(self.source, lambda: self.changes.append(1),
+                                    page_size=20, max_pages=4)
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_loads_pages_around_the_visible_rows(self):
+        self.pager.reset()
+        self.assertEqual(self.pager.total, 1000)
+        self.assertIsNone(self.pager.get(0))
+        self.pager.prefetch(0, 10)
+        self.assertEqual(self.source.pages, [0, 20])
+        self.assertEqual(self.pager.get(0), ("P999", 999))
+        self.assertEqual(self.pager.get(25), ("P974", 974))
+        self.pager.prefetch(505, 515)
+        self.assertEqual(self.source.pages, [0, 20, 480, 500, 520])
+        self.assertEqual(self.pager.get(510), ("P489", 489))
+        self.assertEqual(len(self.pager.pages), 4)
+        self.assertIsNone(self.pager.get(0))
+
+    def test_last_page(self):
+        self.pager.reset().prefetch(995, 1000)
+        self.assertEqual(self.source.pages, [980])
+        self.assertEqual(self.pager.get(999), ("P0", 0))
+        self.assertIsNone(self.pager.get(1000))
+
+    def test_pending_and_stale_fetches(self):
+        runner = DeferredRunner()
+        self.pager.run = runner
+        self.pager.reset()
+        self.pager.prefetch(0, 10)
+        self.assertEqual(len(runner.calls), 1)
+        runner.finish()
+        self.pager.prefetch(0, 10)
+        self.pager.prefetch(0, 10)
+        self.assertEqual(len(runner.calls), 2)
+        self.pager.reset()
+        self.assertIsNone(self.pager.total)
+        runner.finish()
+        self.assertEqual(self.pager.pages, {})
+        self.assertEqual(self.pager.total, 1000)
+
+    def test_skips_pages_scrolled_past(self):
+        runner = DeferredRunner()
+        self.pager.run = runner
+        self.pager.reset()
+        runner.finish()
+        self.pager.prefetch(0, 10)
+        self.pager.prefetch(505, 515)
+        self.assertEqual(len(runner.calls), 5)
+        runner.finish()
+        self.assertEqual(self.source.pages, [480, 500, 520])
+        self.assertEqual(self.pager.pending, set())
+        self.pager.prefetch(0, 10)
+        runner.finish()
+        self.assertEqual(self.pager.get(0), ("P999", 999))
+
+    def test_failed_fetches(self):
+        self.pager.run = lambda func, callback, *args: callback(None)
+        self.pager.reset().prefetch(0, 10)
+        self.assertIsNone(self.pager.total)
+        self.pager.total = 1000
+        self.pager.prefetch(0, 10)
+        self.assertEqual(self.pager.pages, {})
+        self.assertEqual(self.pager.pending, set())
+
+    def test_top_highscores_fallback(self):
+        pager = HighscorePager(TopHighscores(self.database), page_size=4).reset()
+        self.assertEqual(pager.total, 10)
+        pager.prefetch(0, 10)
+        self.assertEqual(pager.get(9), ("P990", 990))
+
+    def test_invalid_sizes(self):
+        self.assertRaises(ValueError, HighscorePager, self.source, page_size=0)
+        self.assertRaises(ValueError, HighscorePager, self.source, max_pages=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import datetime
+import shutil
+import tempfile
+import unittest
+
+from meow_letters import profile
+from meow_letters.letters import LetterGrid, Letter
+from meow_letters.replay import GameRecord, verify
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_chain_cells(self):
+        letter_grid = LetterGrid(5)
+        for (x, y), letter in [((0, 0), "B"), ((1, 1), "D"), ((2, 2), "C"),
+                               ((3, 3), "X"), ((4, 4), "A"), ((4, 0), "C")]:
+            letter_grid.grid[x][y] = Letter(letter)
+        self.assertEqual(profile.chain_cells(letter_grid),
+                         [(4, 4), (0, 0), (2, 2), (1, 1)])
+        self.assertEqual(profile.chain_cells(LetterGrid(5)), [])
+
+    def test_core_games_are_recorded(self):
+        rounds = profile.play_core([profile.SeededPlayer(i) for i in range(2)],
+                                   self.directory)
+        with open(os.path.join(self.directory, "games.jsonl")) as f:
+            records = [GameRecord.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(sum(len(r.rounds) for r in records), rounds)
+        for record in records:
+            self.assertIsNone(verify(record))
+        scripted = profile.play_core([profile.ScriptedPlayer(r) for r in records],
+                                     self.directory)
+        self.assertEqual(scripted, rounds)
+
+    def test_daily_challenge_games(self):
+        player = profile.SeededPlayer(1)
+        player.record = GameRecord(day=datetime.date(2015, 3, 1))
+        rounds = profile.play_core([player], self.directory)
+        with open(os.path.join(self.directory, "games.jsonl")) as f:
+            record = GameRecord.loads(f.readline())
+        self.assertEqual(record.day, datetime.date(2015, 3, 1))
+        self.assertEqual(len(record.rounds), rounds)
+        self.assertIsNone(verify(record))
+
+    def test_subsystems(self):
+        output = os.path.join(self.directory, "profile")
+        self.assertEqual(profile.main(["--games", "2", "--output", output]), 0)
+        stats = profile.pstats.Stats(output + ".pstats")
+        totals = profile.pstats_subsystems(stats, profile.Classifier(profile.overrides()))
+        self.assertTrue(set(["letters", "storage", "timer"]) <= set(totals))
+
+    def test_sampler(self):
+        sampler = profile.Sampler(.0005).start()
+        profile.play_core([profile.SeededPlayer(3)], self.directory)
+        sampler.stop()
+        self.assertTrue(sampler.stacks)
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in sampler.collapsed()))
+        self.assertIn("letters", sampler.subsystems(profile.Classifier()))
+
+
+if __name__ == '__main__':
+    unittest.main()
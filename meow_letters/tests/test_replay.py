@@ -0,0 +1,102 @@
+import datetime
+import unittest
+
+from meow_letters import replay as replay_module
+from meow_letters.replay import GameRecord, replay, verify, verify_many
+from meow_letters.challenge import DailyChallenge
+from meow_letters.level import Level
+from meow_letters.score import Score
+
+
+def play(record):
+    """Play a game until it's over, chaining two letters whenever possible"""
+    letter_grid = record.letter_grid()
+    score, level = Score(), Level()
+    i = 0
+    while not letter_grid.end:
+        letters = dict((l.letter, (x, y)) for x, y, l in letter_grid.iterate())
+        for letter, (x, y) in sorted(letters.items()):
+            following = chr(ord(letter) + 1)
+            if following in letters:
+                for cx, cy in [(x, y), letters[following]]:
+                    record.toggle(cx, cy)
+                    letter_grid.chain.add(letter_grid[cx][cy])
+                break
+        score.update(letter_grid.chain.length)
+        level.set_level(score.points)
+        record.end_round()
+        i += 1
+        letter_grid.rng = record.round_rng(i)
+        letter_grid.cycle_end(level.level)
+    return record.finish(score.points, level.level)
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.record = play(GameRecord(seed=1234))
+
+    def test_verify(self):
+        self.assertIsNone(verify(self.record))
+        self.assertIsNone(verify(GameRecord.loads(self.record.dumps())))
+
+    def test_daily_challenge(self):
+        challenge = DailyChallenge.generate(datetime.date(2015, 3, 1))
+        record = play(GameRecord.new(challenge))
+        self.assertIsNone(verify(GameRecord.loads(record.dumps())))
+
+    def test_challenges_cache(self):
+        first = datetime.date(2015, 3, 1)
+        challenge = replay_module.daily_challenge(first)
+        for i in range(1, replay_module.MAX_CHALLENGES + 2):
+            replay_module.daily_challenge(first + datetime.timedelta(days=i))
+            self.assertIs(replay_module.daily_challenge(first), challenge)
+        self.assertEqual(len(replay_module._challenges), replay_module.MAX_CHALLENGES)
+        self.assertNotIn(first + datetime.timedelta(days=1), replay_module._challenges)
+
+    def test_divergent_score(self):
+        self.record.score += 5
+        self.assertIn("replayed score", verify(self.record))
+
+    def test_unfinished_game(self):
+        self.record.rounds.pop()
+        self.assertIsNotNone(verify(self.record))
+
+    def test_round_after_end(self):
+        self.record.rounds.append([])
+        self.assertIn("after the end", verify(self.record))
+
+    def test_bad_cells(self):
+        self.record.rounds[0] = [1000]
+        self.assertIn("out of the grid", verify(self.record))
+
+    def test_invalid_seed(self):
+        for seed in ["ab", [1], 1.5, True]:
+            self.record.seed = seed
+            with self.assertRaises(replay_module.ReplayError):
+                GameRecord.loads(self.record.dumps())
+
+    def test_invalid_size(self):
+        for size in [replay_module.MAX_SIZE + 1, 10 ** 9, 2, "5"]:
+            self.record.size = size
+            with self.assertRaises(replay_module.ReplayError):
+                GameRecord.loads(self.record.dumps())
+
+    def test_replay(self):
+        points, level, over = replay(self.record)
+        self.assertEqual((points, level), (self.record.score, self.record.level))
+        self.assertTrue(over)
+
+    def test_verify_many(self):
+        lines = [play(GameRecord(seed=seed)).dumps() for seed in range(8)]
+        lines.append(lines[0].replace('"score":', '"score":1'))
+        lines.append("{not json")
+        lines.append(lines[0].replace('"seed":0', '"seed":"ab"'))
+        results = verify_many(lines, processes=2, chunksize=2)
+        self.assertEqual(results[:8], [None] * 8)
+        self.assertIsNotNone(results[8])
+        self.assertIn("Malformed", results[9])
+        self.assertIn("invalid seed", results[10])
+
+
+if __name__ == '__main__':
+    unittest.main()
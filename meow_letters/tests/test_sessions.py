@@ -0,0 +1,174 @@
+import unittest
+
+from meow_letters.replay import verify
+from meow_letters.sessions import (TimerWheel, SessionManager, deep_sizeof,
+                                   COMPLETE, INVALID, SELECTED, UNSELECTED)
+
+try:
+    import asyncio
+    from meow_letters import host
+except (ImportError, SyntaxError):
+    host = None
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self):
+        return self.now
+
+
+class TestTimerWheel(unittest.TestCase):
+    def test_expiry_order(self):
+        wheel = TimerWheel(tick=.1, slots=8, now=0.)
+        wheel.schedule('a', .55).schedule('b', .25).schedule('c', 3.)
+        self.assertEqual(wheel.advance(.2), [])
+        self.assertEqual(wheel.advance(.6), ['b', 'a'])
+        self.assertEqual(len(wheel), 1)
+        # 'c' is more than a turn away, it stays in its slot until its time
+        self.assertEqual(wheel.advance(1.5), [])
+        self.assertEqual(wheel.advance(10.), ['c'])
+
+    def test_reschedule_and_cancel(self):
+        wheel = TimerWheel(tick=.1, slots=8, now=0.)
+        wheel.schedule('a', .3).schedule('b', .3).schedule('a', .9)
+        wheel.cancel('b')
+        self.assertEqual(wheel.advance(.5), [])
+        self.assertEqual(wheel.advance(1.), ['a'])
+        self.assertEqual(wheel.advance(2.), [])
+        self.assertEqual(len(wheel), 0)
+
+    def test_past_deadline(self):
+        wheel = TimerWheel(tick=.1, slots=8, now=5.)
+        wheel.schedule('a', 1.)
+        self.assertEqual(wheel.advance(5.), ['a'])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, TimerWheel, 0)
+        self.assertRaises(ValueError, TimerWheel, .1, 0)
+
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.manager = SessionManager(round_seconds=7, idle_seconds=30,
+                                      clock=self.clock, seed=1)
+
+    def letters(self, session):
+        return dict((l.letter, (x, y)) for x, y, l in session.letter_grid.iterate())
+
+    def test_independent_sessions(self):
+        first, second = self.manager.create(), self.manager.create()
+        self.assertNotEqual(first.record.seed, second.record.seed)
+        self.assertEqual(self.manager.remaining(first), 7)
+        self.assertEqual(len(self.manager.wheel), 4)
+        self.clock.now += 7
+        self.assertEqual(self.manager.advance(), 2)
+        self.assertEqual(len(first.record.rounds), 1)
+        self.assertEqual(self.manager.remaining(second), 7)
+
+    def test_moves(self):
+        session = self.manager.create()
+        (a, cell_a), (b, cell_b) = sorted(self.letters(session).items())[:2]
+        self.assertEqual(self.manager.toggle(session.id, *cell_a), SELECTED)
+        self.assertEqual(self.manager.toggle(session.id, *cell_a), UNSELECTED)
+        if ord(b) != ord(a) + 1:
+            self.manager.toggle(session.id, *cell_a)
+            self.assertEqual(self.manager.toggle(session.id, *cell_b), INVALID)
+            self.assertEqual(self.manager.remaining(session), 6)
+        self.assertRaises(ValueError, self.manager.toggle, session.id, -1, 0)
+        self.assertRaises(ValueError, self.manager.toggle, 1000, 0, 0)
+
+    def test_complete_chain_ends_the_round(self):
+        for _ in range(20):
+            session = self.manager.create()
+            positions = self.letters(session)
+            pairs = [(l, chr(ord(l) + 1)) for l in sorted(positions)
+                     if chr(ord(l) + 1) in positions and chr(ord(l) + 2) not in positions]
+            if pairs:
+                break
+        first, second = pairs[0]
+        self.manager.toggle(session.id, *positions[first])
+        self.assertEqual(self.manager.toggle(session.id, *positions[second]), COMPLETE)
+        self.assertEqual(session.score.points, 5)
+        self.assertEqual(len(session.record.rounds), 1)
+
+    def test_idle_sessions_are_packed(self):
+        self.manager.idle_seconds = 5
+        session = self.manager.create()
+        before = deep_sizeof(session)
+        self.clock.now += 1
+        position = next(iter(self.letters(session).values()))
+        self.manager.toggle(session.id, *position)
+        board = session.board()
+        self.clock.now += 5
+        self.manager.advance()
+        self.assertIsNotNone(session.packed)
+        self.assertIsNone(session.letter_grid)
+        self.assertLess(deep_sizeof(session), before)
+        self.assertEqual(session.board(), board)
+        self.assertEqual(self.manager.stats()["packed"], 1)
+        # the round is paused while packed
+        self.clock.now += 100
+        self.assertEqual(self.manager.advance(), 0)
+        self.assertEqual(self.manager.toggle(session.id, *position), UNSELECTED)
+        self.assertIsNone(session.packed)
+        self.assertEqual(self.manager.remaining(session), 1)
+
+    def test_finished_games_replay(self):
+        # idle sessions are paused, keep them playing
+        self.manager.idle_seconds = 10 ** 6
+        self.manager.finished_seconds = 10 ** 6
+        sessions = [self.manager.create() for _ in range(3)]
+        while not all(s.over for s in sessions):
+            self.clock.now += 7
+            self.manager.advance()
+        for session in sessions:
+            self.assertIsNone(verify(session.record))
+        self.assertEqual(len(self.manager.wheel), 3)
+        self.manager.remove(sessions[0].id)
+        self.assertEqual(len(self.manager), 2)
+        self.assertEqual(len(self.manager.wheel), 2)
+
+    def test_finished_games_are_removed(self):
+        self.manager.finished_seconds = 20
+        session = self.manager.create()
+        while not session.over:
+            self.clock.now += 7
+            self.manager.advance()
+        self.assertEqual(len(self.manager), 1)
+        self.assertEqual(self.manager.get(session.id).score, session.score)
+        self.clock.now += 20
+        self.manager.advance()
+        self.assertEqual(len(self.manager), 0)
+        self.assertEqual(len(self.manager.wheel), 0)
+        self.assertRaises(ValueError, self.manager.get, session.id)
+
+
+@unittest.skipIf(host is None, "the game host needs asyncio")
+class TestGameHost(unittest.TestCase):
+    def test_dispatch(self):
+        game_host = host.GameHost(SessionManager(seed=2))
+        created = game_host.dispatch({"op": "new"})
+        self.assertTrue(created["ok"])
+        self.assertEqual(len(created["board"]), 25)
+        cell = created["board"].index(next(c for c in created["board"] if c != '.'))
+        toggled = game_host.dispatch({"op": "toggle", "session": created["session"],
+                                      "x": cell // 5, "y": cell % 5})
+        self.assertEqual(toggled["event"], SELECTED)
+        self.assertEqual(toggled["selected"], [cell])
+        self.assertEqual(game_host.dispatch({"op": "stats"})["sessions"], 1)
+        self.assertTrue(game_host.dispatch({"op": "close", "session": created["session"]})["ok"])
+        self.assertFalse(game_host.dispatch({"op": "state", "session": created["session"]})["ok"])
+        self.assertFalse(game_host.dispatch({"op": "nope"})["ok"])
+
+    def test_load(self):
+        manager = SessionManager(round_seconds=.2, seed=3)
+        latencies = asyncio.run(host.load(manager, 50, .5, .05, __import__('random').Random(4)))
+        self.assertGreater(len(latencies), 100)
+        self.assertGreater(manager.rounds, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
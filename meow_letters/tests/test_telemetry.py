@@ -0,0 +1,89 @@
+import os
+import imp
+import json
+import shutil
+import tempfile
+import unittest
+
+from meow_letters import telemetry, PROJECT_PATH
+from meow_letters.telemetry import RingHistogram, Recorder
+
+try:
+    import kivy
+except ImportError:
+    kivy = None
+
+
+class Dummy(object):
+    def work(self, n):
+        return n * 2
+
+
+class TestRingHistogram(unittest.TestCase):
+    def test_init(self):
+        self.assertRaises(ValueError, RingHistogram, 0)
+
+    def test_add(self):
+        histogram = RingHistogram(3)
+        self.assertEqual(histogram.values(), [])
+        self.assertIsNone(histogram.percentile(50))
+        for value in (1, 2, 3, 4, 5):
+            histogram.add(value)
+        self.assertEqual(histogram.values(), [3, 4, 5])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.percentile(50), 4)
+        summary = histogram.summary()
+        self.assertEqual(summary["min"], 3)
+        self.assertEqual(summary["max"], 5)
+
+
+class TestRecorder(unittest.TestCase):
+    def test_instrument(self):
+        original = Dummy.__dict__["work"]
+        recorder = Recorder(8)
+        recorder.instrument(Dummy, "work")
+        self.assertEqual(Dummy().work(2), 4)
+        self.assertEqual(recorder.histogram("Dummy.work").count, 1)
+        recorder.uninstrument()
+        self.assertIs(Dummy.__dict__["work"], original)
+
+    def test_gc_unavailable(self):
+        gc = telemetry.gc
+        telemetry.gc = object()
+        try:
+            recorder = Recorder(8)
+            self.assertFalse(recorder.start_gc_tracking())
+        finally:
+            telemetry.gc = gc
+        self.assertIn("gc.pause: not tracked", recorder.format())
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "telemetry.json")
+            recorder.dump(filename)
+            with open(filename) as f:
+                self.assertIn("unavailable", json.load(f)["gc.pause"])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_app_module(self):
+        self.assertIs(telemetry.app_module(Dummy()),
+                      telemetry.sys.modules[__name__])
+
+
+@unittest.skipIf(kivy is None, "installing on the app needs Kivy")
+class TestInstall(unittest.TestCase):
+    def test_instruments_the_classes_of_the_running_module(self):
+        # main.py runs as __main__, not as the main module
+        main = imp.load_source("__meow_main__", os.path.join(PROJECT_PATH, "main.py"))
+        toggle = main.Game.__dict__['toggle']
+        recorder = telemetry.install(main.MeowLettersApp())
+        try:
+            self.assertIsNot(main.Game.__dict__['toggle'], toggle)
+            self.assertIn("Timer.update_bar", recorder.histograms)
+        finally:
+            recorder.uninstrument()
+        self.assertIs(main.Game.__dict__['toggle'], toggle)
+
+
+if __name__ == '__main__':
+    unittest.main()
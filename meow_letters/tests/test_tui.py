@@ -0,0 +1,58 @@
+import random
+import unittest
+
+from meow_letters.letters import Letter
+from meow_letters.tui import TerminalGame
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+class TestTerminalGame(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.game = TerminalGame(size=3, round_seconds=7, clock=self.clock,
+                                 rng=random.Random(3))
+        self.game.letter_grid.create_grid()
+        self.game.letter_grid.grid[0][0] = Letter("A")
+        self.game.letter_grid.grid[1][0] = Letter("B")
+        self.game.letter_grid.grid[2][0] = Letter("D")
+
+    def test_move(self):
+        self.game.move(-1, 1)
+        self.assertEqual(self.game.cursor, [0, 2])
+        self.game.move(2, -1)
+        self.assertEqual(self.game.cursor, [2, 1])
+
+    def test_penalty(self):
+        self.game.cursor = [0, 0]
+        self.game.toggle()
+        self.game.cursor = [2, 0]
+        self.game.toggle()
+        self.assertTrue(self.game.letter_grid.chain.empty)
+        self.assertEqual(self.game.remaining(), 6)
+
+    def test_round(self):
+        self.clock.now = 3
+        self.assertFalse(self.game.update())
+        self.game.cursor = [0, 0]
+        self.game.toggle()
+        self.game.cursor = [1, 0]
+        self.game.toggle()
+        chained = self.game.letter_grid.grid[0][0], self.game.letter_grid.grid[1][0]
+        self.assertEqual(self.game.remaining(), 0)
+        self.assertTrue(self.game.update())
+        self.assertEqual(self.game.score.points, 5)
+        # the spawn may land on the cleared cells, the chained letters are gone
+        board = [id(l) for x, y, l in self.game.letter_grid.iterate()]
+        self.assertFalse(set(board) & set(id(l) for l in chained))
+        self.assertEqual(self.game.remaining(), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import logging
+import threading
+import unittest
+
+from meow_letters.worker import Worker
+
+
+def fail():
+    raise RuntimeError("failed")
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.worker = Worker()
+
+    def tearDown(self):
+        self.worker.close(timeout=5)
+
+    def test_one_thread_in_order(self):
+        seen = []
+        for i in range(20):
+            self.worker.submit(lambda i: (i, threading.current_thread()), seen.append, i)
+        self.assertTrue(self.worker.close(timeout=5))
+        self.assertEqual([i for i, _ in seen], list(range(20)))
+        self.assertEqual(len(set(thread for _, thread in seen)), 1)
+        self.assertIsNot(seen[0][1], threading.current_thread())
+
+    def test_errors_still_call_back(self):
+        seen = []
+        logger = logging.getLogger("meow_letters.worker")
+        level = logger.level
+        logger.setLevel("CRITICAL")
+        try:
+            self.worker.submit(fail, seen.append)
+            self.worker.submit(lambda: 1, seen.append)
+            self.assertTrue(self.worker.close(timeout=5))
+        finally:
+            logger.setLevel(level)
+        self.assertEqual(seen, [None, 1])
+
+    def test_restart_after_close(self):
+        seen = []
+        self.worker.submit(lambda: 1, seen.append)
+        self.worker.close(timeout=5)
+        self.worker.submit(lambda: 2, seen.append)
+        self.worker.close(timeout=5)
+        self.assertEqual(seen, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""Terminal frontend for Meow Letters. Runs the game core without Kivy, for
+thin terminals and SSH sessions.
+
+Usage::
+
+    python -m meow_letters.tui
+
+Arrows or hjkl move the cursor, space or enter selects a letter, r restarts
+and q quits.
+"""
+import os
+import time
+import curses
+
+from meow_letters import setup_path
+if __name__ == '__main__':
+    setup_path()
+
+from constants.misc import GRID_SIZE, ROUND_SECONDS
+from letters import LetterGrid
+from level import Level
+from score import Score
+
+
+KEYS_MOVE = {curses.KEY_LEFT: (-1, 0), ord('h'): (-1, 0),
+             curses.KEY_RIGHT: (1, 0), ord('l'): (1, 0),
+             curses.KEY_UP: (0, 1), ord('k'): (0, 1),
+             curses.KEY_DOWN: (0, -1), ord('j'): (0, -1)}
+KEYS_TOGGLE = (ord(' '), ord('\n'), curses.KEY_ENTER)
+FRAME_SECONDS = .1
+
+
+class TerminalGame(object):
+    """Game rules of the Kivy Game widget on top of a deadline based round
+    timer, with a cursor instead of touches
+    """
+    def __init__(self, size=GRID_SIZE, round_seconds=ROUND_SECONDS, clock=time.time,
+                 rng=None):
+        """TerminalGame class initializer
+
+        :param size: int grid size
+        :param round_seconds: int length of a round
+        :param clock: callable returning the current time in seconds
+        :param rng: optional random.Random object choosing the letters
+        """
+        self.size = size
+        self.round_seconds = round_seconds
+        self.clock = clock
+        self.rng = rng
+        self.score = Score()
+        self.level = Level()
+        self.restart()
+
+    def restart(self):
+        """Start a new game with three random letters on the board
+        """
+        self.score.reset()
+        self.level.reset()
+        self.letter_grid = LetterGrid(self.size, self.rng)
+        self.letter_grid.setup(3)
+        self.cursor = [0, self.size - 1]
+        self.over = False
+        self.deadline = self.clock() + self.round_seconds
+
+    def remaining(self):
+        """Time left in the current round
+
+        :return: float seconds, never negative
+        """
+        return max(self.deadline - self.clock(), 0)
+
+    def move(self, dx, dy):
+        """Move the cursor, staying inside the grid
+
+        :param dx: int horizontal step
+        :param dy: int vertical step, positive is up
+        """
+        self.cursor[0] = min(max(self.cursor[0] + dx, 0), self.size - 1)
+        self.cursor[1] = min(max(self.cursor[1] + dy, 0), self.size - 1)
+
+    def toggle(self):
+        """Select or unselect the letter under the cursor. An invalid chain
+        costs a second, a complete chain ends the round.
+        """
+        x, y = self.cursor
+        letter = self.letter_grid[x][y]
+        if self.over or letter is None:
+            return
+        if letter.is_selected():
+            self.letter_grid.chain.remove(letter)
+        else:
+            self.letter_grid.chain.add(letter)
+            if not self.letter_grid.chain.is_valid():
+                self.deadline -= 1
+                self.letter_grid.chain.clear()
+        if self.letter_grid.is_complete_chain():
+            self.deadline = self.clock()
+
+    def update(self):
+        """End the round if its deadline passed
+
+        :return: True if a round ended, False otherwise
+        """
+        if self.over or self.clock() < self.deadline:
+            return False
+        self.cycle_end()
+        return True
+
+    def cycle_end(self):
+        self.score.update(self.letter_grid.chain.length)
+        self.level.set_level(self.score.points)
+        self.letter_grid.cycle_end(self.level.level)
+        if self.letter_grid.end:
+            self.over = True
+        else:
+            self.deadline = self.clock() + self.round_seconds
+
+
+def save_highscore(points):
+    """Store the score of a finished game under the configured username
+
+    :param points: int score
+    """
+    from storage import finish_game
+    finish_game(points)
+
+
+def draw(screen, game):
+    screen.erase()
+    screen.addstr(0, 0, "Meow Letters   Level {0}   Score {1}".format(
+        game.level.level, game.score.points))
+    width = game.size * 4
+    bar = int(round(width * game.remaining() / game.round_seconds))
+    screen.addstr(1, 0, "#" * bar + "." * (width - bar))
+    for row, y in enumerate(reversed(range(game.size))):
+        for x in range(game.size):
+            letter = game.letter_grid[x][y]
+            text = letter.letter if letter is not None else "."
+            attr = curses.A_REVERSE if letter is not None and letter.is_selected() else 0
+            if [x, y] == game.cursor:
+                text = "[{0}]".format(text)
+                attr |= curses.A_BOLD
+            else:
+                text = " {0} ".format(text)
+            screen.addstr(3 + row, x * 4, text, attr)
+    status = "Game over! r: restart  q: quit" if game.over \
+        else "arrows/hjkl: move  space: select  r: restart  q: quit"
+    screen.addstr(4 + game.size, 0, status)
+    screen.refresh()
+
+
+def main(screen):
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass
+    game = TerminalGame()
+    while True:
+        if game.update() and game.over:
+            save_highscore(game.score.points)
+        draw(screen, game)
+        if game.over:
+            screen.timeout(-1)
+        else:
+            screen.timeout(max(int(min(FRAME_SECONDS, game.remaining()) * 1000), 1))
+        key = screen.getch()
+        if key == ord('q'):
+            break
+        elif key == ord('r'):
+            game.restart()
+        elif key in KEYS_MOVE:
+            game.move(*KEYS_MOVE[key])
+        elif key in KEYS_TOGGLE:
+            game.toggle()
+
+
+def run():
+    curses.wrapper(main)
+
+
+if __name__ == '__main__':
+    run()
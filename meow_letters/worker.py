@@ -0,0 +1,83 @@
+"""One long-lived background thread for the blocking calls of the app -
+database reads and writes, file appends - so they never run on the UI thread
+and never start a thread each.
+"""
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def call_now(func):
+    func()
+
+
+class Worker(object):
+    """Runs submitted calls one at a time, in order, on a single thread started
+    with the first call
+    """
+    def __init__(self, schedule=call_now):
+        """Worker class initializer
+
+        :param schedule: callable schedule(func) calling func() on the thread
+                         that receives the results, i.e. the Kivy main thread.
+                         By default results are delivered on the worker thread.
+        """
+        self.schedule = schedule
+        self.tasks = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func, callback=None, *args):
+        """Queue a call of func(*args). callback(result) is then delivered
+        through schedule. If func raises, the error is logged and callback
+        receives None.
+
+        :param func: callable to run in the background
+        :param callback: optional callable receiving the result
+        :return: the current instance
+        """
+        with self._lock:
+            if self._thread is None:
+                self.tasks = queue.Queue()
+                self._thread = threading.Thread(target=self._run, args=(self.tasks,))
+                self._thread.daemon = True
+                self._thread.start()
+            self.tasks.put((func, callback, args))
+        return self
+
+    def _run(self, tasks):
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                break
+            func, callback, args = task
+            try:
+                result = func(*args)
+            except Exception:
+                logger.exception("Background call to {0!r} failed".format(func))
+                result = None
+            if callback is not None:
+                self.schedule(lambda callback=callback, result=result: callback(result))
+
+    def close(self, timeout=None):
+        """Run the queued calls and stop the thread. A new thread is started if
+        calls are submitted afterwards.
+
+        :param timeout: optional float seconds to wait for the queued calls
+        :return: True if the thread stopped, False if it's still busy
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return True
+            self.tasks.put(_STOP)
+        thread.join(timeout)
+        return not thread.is_alive()